@@ -49,9 +49,16 @@ def main():
                 print()
                 continue
             
-            print("\nThinking...")
-            result = chief.query(query)
-            print(f"\n{result['response']}\n")
+            print()
+            result = {}
+            for event in chief.query_stream(query):
+                if event.get("done"):
+                    result = event
+                else:
+                    print(event["token"], end="", flush=True)
+            if result.get('error'):
+                print(result['response'], end="")
+            print("\n")
             if result.get('relevant_emails_count', 0) > 0:
                 print(f"(Based on {result['relevant_emails_count']} relevant emails)\n")
     
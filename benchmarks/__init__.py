@@ -0,0 +1,5 @@
+"""
+Benchmarks for the AI Chief of Staff on synthetic corpora.
+
+    python -m benchmarks.run --emails 10000 --output results.json
+"""
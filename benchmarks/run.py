@@ -0,0 +1,310 @@
+"""
+Run the benchmark suite on a synthetic corpus and write the results as JSON.
+
+    python -m benchmarks.run --emails 10000 --people 1000 --output results.json
+    python -m benchmarks.run --emails 100000 --compare results.json
+
+Each benchmark builds fresh objects, so cached results from one run do not
+leak into the next. With --compare, timings are checked against an earlier
+results file and slowdowns beyond --threshold are reported.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+from benchmarks.synthetic import SyntheticCorpus, TOPICS
+from src.data_loader import EmailDataLoader
+from src.organizational_intelligence import OrganizationalIntelligence
+from src.graph_backend import InMemoryGraphDB
+from src.graph_analytics import GraphAnalytics
+from src.agents import CriticAgent, CoordinatorAgent
+from src.people_directory import PeopleDirectory
+from src.query_planner import QueryPlanner
+from src.ingest import EmailIngestor, RECORD_FIELDS
+from src.sharding import ShardedCorpus, write_shards
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkRunner:
+    """Time named benchmarks against one loaded corpus."""
+
+    def __init__(self, json_file_path: str, repeat: int = 3):
+        """
+        Initialize the runner.
+
+        Args:
+            json_file_path: Corpus JSON file
+            repeat: Runs per benchmark; the median is reported
+        """
+        self.json_file_path = json_file_path
+        self.repeat = repeat
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.loader = EmailDataLoader(json_file_path)
+
+    def fresh_loader(self) -> EmailDataLoader:
+        """A loader sharing the loaded records but none of the derived caches."""
+        loader = EmailDataLoader(self.json_file_path)
+        loader.restore_state(self.loader.export_state())
+        return loader
+
+    def time(self, name: str, setup: Callable[[], Any], run: Callable[[Any], Any]):
+        """
+        Time run(setup()) `repeat` times; setup is not timed.
+
+        Args:
+            name: Benchmark name
+            setup: Builds the input of each run
+            run: The timed work
+        """
+        timings = []
+        for _ in range(self.repeat):
+            arg = setup()
+            gc.collect()
+            start = time.perf_counter()
+            run(arg)
+            timings.append(time.perf_counter() - start)
+        self.results[name] = {
+            "seconds": round(statistics.median(timings), 6),
+            "min_seconds": round(min(timings), 6),
+            "runs": len(timings)
+        }
+        print(f"  {name:<34} {self.results[name]['seconds'] * 1000:>10.1f} ms")
+
+    def run_all(self, api: bool = True, shards: int = 0) -> Dict[str, Dict[str, Any]]:
+        """
+        Run every benchmark and return the results by name.
+
+        Args:
+            api: Also time API endpoints
+            shards: Also time scatter-gather queries over this many shard workers
+        """
+        self.time("load", lambda: EmailDataLoader(self.json_file_path), lambda loader: loader.load())
+        self.loader.load()
+
+        topics = list(TOPICS)[:3]
+        busiest = self.loader.communication_counts.most_common(1)[0][0]
+
+        self.time("keyword_search", lambda: self.loader,
+                  lambda loader: [loader.get_emails_by_keyword(topic) for topic in topics])
+        self.time("emails_by_sender", lambda: self.loader,
+                  lambda loader: [loader.get_emails_by_sender(busiest) for _ in range(100)])
+        self.time("network_build", lambda: OrganizationalIntelligence(self.fresh_loader()),
+                  lambda org: org.get_communication_network())
+        self.time("top_communicators", lambda: OrganizationalIntelligence(self.fresh_loader()),
+                  lambda org: org.get_top_communicators(20))
+        self.time("topic_clustering", lambda: OrganizationalIntelligence(self.fresh_loader()),
+                  lambda org: org.get_topic_clusters())
+        self.time("insights", lambda: OrganizationalIntelligence(self.fresh_loader()),
+                  lambda org: org.get_organizational_insights())
+        self.time("insights_approximate", lambda: OrganizationalIntelligence(self.fresh_loader()),
+                  lambda org: org.get_organizational_insights(approximate=True))
+        self.time("critic_agent", lambda: CriticAgent(self.fresh_loader()),
+                  lambda critic: (critic.detect_conflicts(), critic.analyze_duplications()))
+        self.time("coordinator_topic", lambda: CoordinatorAgent(self.fresh_loader()),
+                  lambda coordinator: coordinator.get_stakeholders(topic=topics[0]))
+        self.time("coordinator_topic_indexed", self._indexed_coordinator,
+                  lambda coordinator: [coordinator.get_stakeholders(topic=topic) for topic in topics])
+        self.time("coordinator_influence", lambda: CoordinatorAgent(self.fresh_loader()),
+                  lambda coordinator: coordinator.get_stakeholders(topic=topics[0], rank_by="influence"))
+        self.time("graph_load", lambda: self.loader.emails, InMemoryGraphDB.from_emails)
+
+        graph = InMemoryGraphDB.from_emails(self.loader.emails)
+        self.time("graph_data", lambda: graph, lambda g: g.get_graph_data(limit=500))
+        self.time("graph_top_relationships", lambda: graph, lambda g: g.get_top_relationships(limit=50))
+        self.time("person_network", lambda: graph, lambda g: g.get_person_network(busiest, depth=2))
+        self.time("pagerank", lambda: GraphAnalytics(self.fresh_loader()), lambda a: a.get_pagerank())
+        self.time("communities", lambda: GraphAnalytics(self.fresh_loader()), lambda a: a.get_communities())
+        self.time("graph_overview", lambda: GraphAnalytics(self.fresh_loader()),
+                  lambda a: a.get_graph_overview())
+
+        prefix = busiest.split(".")[0][:3]
+        self.time("people_search", lambda: PeopleDirectory(self.fresh_loader()),
+                  lambda d: [d.search(prefix, limit=10) for _ in range(100)])
+        self.time("query_planner", lambda: QueryPlanner(self.loader, OrganizationalIntelligence(self.loader)),
+                  lambda p: p.answer(f"Who emails {busiest} the most?"))
+
+        # New copies of existing emails (the changed subject gives them new ids)
+        batch = [dict({key: email[key] for key in RECORD_FIELDS if key in email},
+                      subject=f"{email.get('subject', '')} (ingested)") for email in self.loader.emails[:1000]]
+        self.time("ingest_1000", self._ingest_setup, lambda ingestor: ingestor.ingest([dict(e) for e in batch]))
+
+        if shards:
+            self._run_sharded(shards, topics[0])
+        if api:
+            self._run_api()
+        return self.results
+
+    def _run_sharded(self, shards: int, topic: str):
+        """Time scatter-gather queries over shard worker processes."""
+        directory = tempfile.mkdtemp(prefix="cos-shards-")
+        write_shards(self.loader, directory, shards)
+        corpus = ShardedCorpus.start(directory)
+        try:
+            self.time("sharded_keyword_search", lambda: corpus, lambda c: c.search(topic))
+            self.time("sharded_top_communicators", lambda: corpus, lambda c: c.get_top_communicators(20))
+            self.time("sharded_network", lambda: corpus, lambda c: c.get_communication_network())
+            self.time("sharded_stakeholders", lambda: corpus, lambda c: c.get_stakeholders(topic))
+            self.time("sharded_sketches", lambda: corpus, lambda c: c.get_sketches().insights())
+        finally:
+            corpus.close()
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    def _indexed_coordinator(self) -> CoordinatorAgent:
+        """A coordinator whose topic index is already built."""
+        coordinator = CoordinatorAgent(self.fresh_loader())
+        coordinator.topic_index.refresh()
+        return coordinator
+
+    def _ingest_setup(self) -> EmailIngestor:
+        """An ingestor over its own loaded store, with the analytics graph built."""
+        loader = EmailDataLoader(self.json_file_path)
+        analytics = GraphAnalytics(loader)
+        analytics.refresh()
+        return EmailIngestor(loader, refresh_graph=analytics.refresh)
+
+    def _run_api(self):
+        """Time API endpoints through the Flask test client, if Flask is installed."""
+        os.environ["JSON_FILE_PATH"] = self.json_file_path
+        os.environ["GRAPH_BACKEND"] = "memory"
+        os.environ["LLM_PROVIDER"] = "fake"
+        os.environ["HTTP_CACHE_SIZE"] = "0"
+        os.environ.pop("STATE_SNAPSHOT_PATH", None)
+        try:
+            from src.api import app
+        except ImportError as e:
+            print(f"  Skipping API benchmarks: {e}")
+            return
+        client = app.test_client()
+        client.get('/api/health')
+        for path in ('/api/insights', '/api/people?q=a&limit=20', '/api/graph?limit=200',
+                     '/api/graph/top-relationships', '/api/analytics/influencers'):
+            name = "api " + path.split('?')[0]
+            self.time(name, lambda: client, lambda c, p=path: c.get(p))
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """
+    Report benchmarks that got slower than the baseline by more than threshold.
+
+    Args:
+        results: Current results by name
+        baseline: Earlier results file contents
+        threshold: Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        Names of regressed benchmarks
+    """
+    regressions = []
+    print()
+    print(f"Compared with {baseline.get('meta', {}).get('git_commit') or 'baseline'}:")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<34} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    """Generate a corpus, run the benchmarks and write the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=10000, help="Emails to generate (default: 10000)")
+    parser.add_argument("--people", type=int, default=None,
+                        help="People in the organization (default: emails / 10, at most 50000)")
+    parser.add_argument("--days", type=int, default=730, help="Date span in days (default: 730)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (default: 3)")
+    parser.add_argument("--corpus", default=None,
+                        help="Corpus file to reuse or create (default: a temporary file)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON file")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default: 0.2)")
+    parser.add_argument("--no-api", action="store_true", help="Skip the API benchmarks")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Also time scatter-gather queries over this many shard workers (default: 0)")
+    args = parser.parse_args()
+
+    people = args.people or max(10, min(50000, args.emails // 10))
+    corpus = SyntheticCorpus(people=people, emails=args.emails, seed=args.seed, days=args.days)
+
+    corpus_path = args.corpus
+    temporary = corpus_path is None
+    if temporary:
+        corpus_path = os.path.join(tempfile.mkdtemp(prefix="cos-bench-"), "emails.json")
+    if not os.path.exists(corpus_path):
+        print(f"Generating {args.emails} emails between {people} people...")
+        start = time.perf_counter()
+        corpus.write_json(corpus_path)
+        print(f"Generated {os.path.getsize(corpus_path) / (1024 * 1024):.1f} MB "
+              f"in {time.perf_counter() - start:.1f}s")
+    print()
+
+    print("Benchmarks (median):")
+    runner = BenchmarkRunner(corpus_path, repeat=args.repeat)
+    try:
+        results = runner.run_all(api=not args.no_api, shards=args.shards)
+    finally:
+        if temporary:
+            os.remove(corpus_path)
+            os.rmdir(os.path.dirname(corpus_path))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "max_rss_mb": _max_rss_mb(),
+            "corpus": corpus.config()
+        },
+        "results": results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print()
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Deterministic synthetic email corpus generator.
+
+Builds an organization of people in departments and writes emails in the
+same JSON format as process_emails.py. Who sends mail follows a power law
+(a few people send most of it), recipients are mostly in the sender's own
+department, subjects and bodies come from a weighted topic mix, and
+timestamps are spread over a configurable date span. The same seed always
+gives the same corpus, so benchmark runs are comparable.
+"""
+import json
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from itertools import accumulate
+from typing import Dict, Any, Iterator, List, Optional
+
+DEPARTMENTS = ["trading", "legal", "finance", "operations", "research", "hr", "it", "risk"]
+
+FIRST_NAMES = ["john", "mary", "james", "patricia", "robert", "jennifer", "michael", "linda",
+               "william", "elizabeth", "david", "barbara", "richard", "susan", "joseph", "jessica",
+               "thomas", "sarah", "charles", "karen", "daniel", "nancy", "mark", "lisa"]
+LAST_NAMES = ["smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis",
+              "wilson", "anderson", "taylor", "thomas", "moore", "jackson", "martin", "lee",
+              "thompson", "white", "harris", "clark", "lewis", "walker", "hall", "allen"]
+
+# Topic name -> (relative weight, vocabulary)
+TOPICS = {
+    "pipeline": (5, ["pipeline", "capacity", "transport", "volumes", "scheduling", "nominations"]),
+    "contract": (4, ["contract", "agreement", "signature", "terms", "amendment", "counterparty"]),
+    "budget": (3, ["budget", "forecast", "expenses", "quarter", "approval", "variance"]),
+    "meeting": (6, ["meeting", "agenda", "conference", "schedule", "attendees", "minutes"]),
+    "trading": (5, ["trading", "positions", "prices", "curve", "desk", "limits"]),
+    "regulatory": (2, ["regulatory", "filing", "commission", "compliance", "tariff", "hearing"]),
+    "hiring": (1, ["hiring", "candidates", "interview", "offer", "analyst", "associate"]),
+    "systems": (2, ["systems", "outage", "database", "upgrade", "password", "server"]),
+}
+FILLER = ["please", "review", "attached", "thanks", "update", "tomorrow", "let", "know",
+          "questions", "discuss", "follow", "up", "today", "call", "need", "before"]
+
+
+class SyntheticCorpus:
+    """Configurable, seeded generator of an organization and its email."""
+
+    def __init__(self, people: int = 1000, emails: int = 10000, seed: int = 42,
+                 power_law_exponent: float = 1.1, local_fraction: float = 0.7,
+                 max_recipients: int = 6, start: Optional[datetime] = None, days: int = 730,
+                 topic_weights: Optional[Dict[str, float]] = None, body_words: int = 60):
+        """
+        Initialize the generator.
+
+        Args:
+            people: Number of people in the organization
+            emails: Number of emails to generate
+            seed: Random seed; the same seed gives the same corpus
+            power_law_exponent: Zipf exponent of sending activity by rank
+            local_fraction: Share of recipients picked from the sender's department
+            max_recipients: Maximum recipients per email
+            start: First possible timestamp (default: 2000-01-01 UTC)
+            days: Length of the date span in days
+            topic_weights: Override the relative weight of each topic
+            body_words: Average number of words per body
+        """
+        self.people_count = people
+        self.email_count = emails
+        self.seed = seed
+        self.power_law_exponent = power_law_exponent
+        self.local_fraction = local_fraction
+        self.max_recipients = max_recipients
+        self.start = start or datetime(2000, 1, 1, tzinfo=timezone.utc)
+        self.days = days
+        self.body_words = body_words
+        self.topics = list(TOPICS)
+        weights = topic_weights or {name: weight for name, (weight, _) in TOPICS.items()}
+        self._topic_cumulative = list(accumulate(weights.get(name, 0) for name in self.topics))
+
+        rng = random.Random(seed)
+        self.people = self._make_people(rng)
+        self.department_of = [i % len(DEPARTMENTS) for i in range(people)]
+        self.members = [[i for i in range(people) if self.department_of[i] == d]
+                        for d in range(len(DEPARTMENTS))]
+
+        # Power-law activity: a random permutation decides who gets which rank
+        ranks = list(range(people))
+        rng.shuffle(ranks)
+        activity = [1.0 / (rank + 1) ** power_law_exponent for rank in ranks]
+        self._cumulative = list(accumulate(activity))
+        self._member_cumulative = [list(accumulate(activity[i] for i in members))
+                                   for members in self.members]
+
+    def _make_people(self, rng: random.Random) -> List[str]:
+        people = []
+        seen = set()
+        for i in range(self.people_count):
+            address = (f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}"
+                       f"@{DEPARTMENTS[i % len(DEPARTMENTS)]}.example.com")
+            if address in seen:
+                address = address.replace("@", f"{i}@", 1)
+            seen.add(address)
+            people.append(address)
+        return people
+
+    @staticmethod
+    def _pick(rng: random.Random, cumulative: List[float]) -> int:
+        return bisect_left(cumulative, rng.random() * cumulative[-1])
+
+    def _recipients(self, rng: random.Random, sender: int) -> List[str]:
+        # Mostly one or two recipients, occasionally a long list
+        count = min(self.max_recipients, 1 + int(rng.expovariate(1.2)))
+        department = self.department_of[sender]
+        chosen = []
+        for _ in range(count * 3):
+            if len(chosen) == count:
+                break
+            if rng.random() < self.local_fraction:
+                members = self.members[department]
+                person = members[self._pick(rng, self._member_cumulative[department])]
+            else:
+                person = self._pick(rng, self._cumulative)
+            if person != sender and person not in chosen:
+                chosen.append(person)
+        return [self.people[i] for i in chosen]
+
+    def emails(self) -> Iterator[Dict[str, Any]]:
+        """Yield the email records, in generation (not time) order."""
+        rng = random.Random(self.seed + 1)
+        span_seconds = self.days * 86400
+        for i in range(self.email_count):
+            sender = self._pick(rng, self._cumulative)
+            topic = self.topics[self._pick(rng, self._topic_cumulative)]
+            vocabulary = TOPICS[topic][1]
+
+            subject = f"{topic.capitalize()} {rng.choice(vocabulary)} {rng.choice(vocabulary)}"
+            if rng.random() < 0.3:
+                subject = "Re: " + subject
+            words = [rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(FILLER)
+                     for _ in range(max(1, int(rng.gauss(self.body_words, self.body_words / 3))))]
+
+            timestamp = self.start + timedelta(seconds=rng.randrange(span_seconds))
+            yield {
+                "sender": self.people[sender],
+                "receiver": self._recipients(rng, sender),
+                "subject": subject,
+                "timestamp": format_datetime(timestamp),
+                "body": " ".join(words).capitalize() + ".",
+                "message_id": f"<{self.seed}.{i}@synthetic.example.com>"
+            }
+
+    def write_json(self, path: str):
+        """
+        Write the corpus as a JSON array, streaming one email at a time.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for i, email in enumerate(self.emails()):
+                if i:
+                    f.write(",\n")
+                f.write(json.dumps(email, ensure_ascii=False))
+            f.write("]\n")
+
+    def config(self) -> Dict[str, Any]:
+        """Parameters that identify this corpus, for benchmark results."""
+        return {
+            "people": self.people_count,
+            "emails": self.email_count,
+            "seed": self.seed,
+            "power_law_exponent": self.power_law_exponent,
+            "local_fraction": self.local_fraction,
+            "max_recipients": self.max_recipients,
+            "start": self.start.isoformat(),
+            "days": self.days,
+            "body_words": self.body_words
+        }
@@ -0,0 +1,39 @@
+"""
+Build the warm-state snapshot the API starts from.
+
+Parses emails.json once, builds the indexes and precomputes graph
+analytics, and writes everything to STATE_SNAPSHOT_PATH. Run it after
+process_emails.py (or as a deploy step) so that API workers start without
+parsing the JSON export.
+"""
+import os
+import time
+from dotenv import load_dotenv
+from src.app_state import AppState
+
+load_dotenv()
+
+
+def main():
+    """Build and write the snapshot."""
+    print("=" * 60)
+    print("Warm-State Snapshot")
+    print("=" * 60)
+    print()
+
+    state = AppState.from_env()
+    if not state.snapshot_path:
+        state.snapshot_path = "state_snapshot.pkl"
+        print("STATE_SNAPSHOT_PATH not set; using state_snapshot.pkl")
+
+    start = time.perf_counter()
+    print(f"Building snapshot from {state.json_file_path}...")
+    report = state.build_snapshot()
+    size_mb = os.path.getsize(report["snapshot"]) / (1024 * 1024)
+    print(f"Snapshot written to {report['snapshot']} ({size_mb:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"{report['emails']} emails, {report['people']} people")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Gunicorn configuration for serving the API in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app) and the email store,
+indexes and analytics graph are loaded there before workers are forked, so
+every worker shares one read-only copy of the data instead of loading its
+own. Settings can be overridden with the environment variables below.
+"""
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 8000)}"
+
+# Processes for CPU-bound work (graph analytics, context building) ...
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# ... and threads per process for requests waiting on the LLM or streaming
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# LLM calls and map-reduce queries can take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth from caches
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """Load the shared data in the master, before any worker is forked."""
+    from src.api import state
+    try:
+        state.preload()
+        server.log.info("Preloaded %s emails (%s)", state.load_info.get("emails"),
+                        state.load_info.get("source"))
+    except Exception as e:
+        # Workers will retry lazily and report the failure per endpoint
+        server.log.warning("Could not preload email data: %s", e)
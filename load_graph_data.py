@@ -39,9 +39,16 @@ def main():
             neo4j.clear_database()
             print("Database cleared")
             print()
+        elif neo4j.is_legacy_graph():
+            print("The existing graph was loaded without email ids; loading on top of it would")
+            print("count its emails twice. Run again and clear the existing data.")
+            neo4j.close()
+            return
         
-        # Load emails into Neo4j
-        neo4j.load_emails(emails)
+        # Load emails into Neo4j; emails already in the graph are skipped
+        neo4j.ensure_schema()
+        result = neo4j.sync(emails)
+        print(f"Applied {result['applied']} new emails")
         print()
         print("=" * 60)
         print("Successfully loaded emails into Neo4j!")
@@ -2,9 +2,8 @@ import csv
 import json
 import sys
 import os
-from email import message_from_string
-from email.utils import parsedate_to_datetime, parseaddr
 from dotenv import load_dotenv
+from src.email_parser import parse_message
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,85 +18,6 @@ except (OverflowError, ValueError):
     except (OverflowError, ValueError):
         pass  # Use default limit
 
-def get_email_body(msg):
-    """
-    Extract body text from email message, handling multipart messages.
-    
-    Args:
-        msg: Email message object
-        
-    Returns:
-        str: Email body text
-    """
-    body = ""
-    
-    if msg.is_multipart():
-        for part in msg.walk():
-            content_type = part.get_content_type()
-            content_disposition = str(part.get("Content-Disposition"))
-            
-            # Skip attachments
-            if "attachment" in content_disposition:
-                continue
-            
-            # Prefer text/plain, fallback to text/html
-            if content_type == "text/plain":
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = payload.decode(charset, errors='ignore')
-                        break
-                except Exception:
-                    pass
-            elif content_type == "text/html" and not body:
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = payload.decode(charset, errors='ignore')
-                except Exception:
-                    pass
-    else:
-        # Single part message
-        try:
-            payload = msg.get_payload(decode=True)
-            if payload:
-                charset = msg.get_content_charset() or 'utf-8'
-                body = payload.decode(charset, errors='ignore')
-        except Exception:
-            pass
-    
-    return body.strip()
-
-
-def parse_email_addresses(address_string):
-    """
-    Parse email addresses from a string, handling multiple recipients.
-    
-    Args:
-        address_string: String containing email addresses
-        
-    Returns:
-        list: List of email addresses
-    """
-    if not address_string:
-        return []
-    
-    addresses = []
-    # Split by comma and parse each address
-    for addr in address_string.split(','):
-        addr = addr.strip()
-        if addr:
-            # Use parseaddr to extract just the email address
-            name, email = parseaddr(addr)
-            if email:
-                addresses.append(email)
-            elif addr:
-                addresses.append(addr)
-    
-    return addresses
-
 
 def parse_emails(csv_file_path, json_file_path):
     """
@@ -121,37 +41,7 @@ def parse_emails(csv_file_path, json_file_path):
                 continue
             
             try:
-                # Parse the raw email message
-                msg = message_from_string(raw_message)
-                
-                # Extract sender
-                from_field = msg.get('From', '').strip()
-                sender = parseaddr(from_field)[1] if from_field else ''
-                if not sender and from_field:
-                    sender = from_field
-                
-                # Extract receiver(s)
-                to_field = msg.get('To', '').strip()
-                receiver = parse_email_addresses(to_field)
-                
-                # Extract subject
-                subject = msg.get('Subject', '').strip()
-                
-                # Extract date/timestamp
-                date_field = msg.get('Date', '').strip()
-                timestamp = date_field  # Keep as string, or convert to ISO format if needed
-                
-                # Extract body
-                body = get_email_body(msg)
-                
-                # Create email object
-                email_obj = {
-                    "sender": sender,
-                    "receiver": receiver,
-                    "subject": subject,
-                    "timestamp": timestamp,
-                    "body": body
-                }
+                email_obj = parse_message(raw_message)
                 
                 emails.append(email_obj)
                 
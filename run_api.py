@@ -1,14 +1,30 @@
 """
 Run the API server.
 """
-from src.api import app
+import argparse
 import os
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the AI Chief of Staff API (development server).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Enable the /api/profile/* endpoints (same as PROFILING_ENABLED=true)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Trace allocations from startup with tracemalloc (same as PROFILING_TRACEMALLOC=true)")
+    args = parser.parse_args()
+    # Set before importing the app, which reads them at import time
+    if args.profile:
+        os.environ["PROFILING_ENABLED"] = "true"
+    if args.trace_memory:
+        os.environ["PROFILING_TRACEMALLOC"] = "true"
+    
+    from src.api import app
+    
     port = int(os.getenv("PORT", 8000))
+    debug = os.getenv("FLASK_DEBUG", "true").lower() == "true"
     print(f"Starting AI Chief of Staff API on http://localhost:{port}")
+    print("Development server; for production use: gunicorn -c gunicorn.conf.py wsgi:app")
     try:
-        app.run(debug=True, host='127.0.0.1', port=port)
+        app.run(debug=debug, host='127.0.0.1', port=port)
     except OSError as e:
         if "address already in use" in str(e).lower() or "access" in str(e).lower():
             print(f"\nError: Port {port} is already in use or access denied.")
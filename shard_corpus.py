@@ -0,0 +1,134 @@
+"""
+Split the email corpus into shards and query it with scatter-gather.
+
+    python shard_corpus.py split --shards 4 --scheme sender --output shards
+    python shard_corpus.py query shards --topic budget
+    python shard_corpus.py serve shards --port 7100        # one server per shard
+    python shard_corpus.py query shards --connect 10.0.0.5:7100,10.0.0.6:7101
+
+split reads JSON_FILE_PATH and writes one JSON file per shard plus a
+manifest. query starts a worker process per shard (or connects to running
+servers) and runs keyword search, top communicators, network aggregation
+and stakeholder queries across them. serve runs the shard servers for
+coordinators on other machines; they share the key in SHARD_AUTHKEY.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from src.data_loader import EmailDataLoader
+from src.sharding import ShardedCorpus, read_manifest, serve_shard, write_shards
+
+load_dotenv()
+
+
+def _authkey() -> bytes:
+    return os.getenv("SHARD_AUTHKEY", "").encode("utf-8")
+
+
+def split(args):
+    """Write the shard files."""
+    json_file_path = os.getenv("JSON_FILE_PATH", "emails.json")
+    print(f"Splitting {json_file_path} into {args.shards} shards by {args.scheme}...")
+    start = time.perf_counter()
+    manifest = write_shards(EmailDataLoader(json_file_path), args.output, args.shards, args.scheme)
+    for shard in manifest["shards"]:
+        print(f"  {shard['file']}: {shard['emails']} emails ({shard['earliest']} - {shard['latest']})")
+    print(f"Wrote {len(manifest['shards'])} shards to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+def serve(args):
+    """Run a server for every shard until interrupted."""
+    if not _authkey():
+        print("Set SHARD_AUTHKEY so that coordinators can authenticate.")
+        sys.exit(1)
+    manifest = read_manifest(args.directory)
+    processes = []
+    for index, shard in enumerate(manifest["shards"]):
+        process = multiprocessing.Process(target=serve_shard, name=shard["file"], args=(
+            os.path.join(args.directory, shard["file"]), (args.host, args.port + index), _authkey()))
+        process.start()
+        processes.append(process)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+def query(args):
+    """Run the scatter-gather queries and print their results and timings."""
+    if args.connect:
+        addresses = []
+        for address in args.connect.split(","):
+            host, _, port = address.strip().rpartition(":")
+            addresses.append((host, int(port)))
+        corpus = ShardedCorpus(addresses, _authkey(), scheme=read_manifest(args.directory).get("scheme"))
+    else:
+        start = time.perf_counter()
+        corpus = ShardedCorpus.start(args.directory)
+        print(f"Started {len(corpus.clients)} shard workers in {time.perf_counter() - start:.1f}s")
+
+    def timed(label, run):
+        start = time.perf_counter()
+        result = run()
+        print(f"\n{label} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return result
+
+    try:
+        stats = timed("Corpus", corpus.get_stats)
+        print(f"  {stats['emails']} emails in {stats['shards']} shards, {stats['unique_senders']} senders, "
+              f"{stats['unique_receivers']} receivers, {stats['earliest']} - {stats['latest']}")
+        for email, count in timed("Top communicators", lambda: corpus.get_top_communicators(10)):
+            print(f"  {email}: {count}")
+        network = timed("Communication network", corpus.get_communication_network)
+        print(f"  {len(network)} senders, {sum(len(r) for r in network.values())} sender-receiver pairs")
+        if args.topic:
+            found = timed(f"Search '{args.topic}'", lambda: corpus.search(args.topic, limit=5))
+            print(f"  {found['total']} emails; most recent:")
+            for email in found["emails"]:
+                print(f"  - {email.get('timestamp', '')}: {email.get('subject', '')}")
+            stakeholders = timed(f"Stakeholders for '{args.topic}'", lambda: corpus.get_stakeholders(args.topic))
+            for stakeholder in stakeholders["stakeholders"]:
+                print(f"  {stakeholder['email']}: {stakeholder['involvement']}")
+    finally:
+        # Servers started by `serve` keep running for other coordinators
+        corpus.close(shutdown=not args.connect)
+
+
+def main():
+    """Parse the command and run it."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = commands.add_parser("split", help="Write shard files from JSON_FILE_PATH")
+    split_parser.add_argument("--shards", type=int, default=os.cpu_count() or 4,
+                              help="Number of shards (default: CPU count)")
+    split_parser.add_argument("--scheme", choices=("sender", "time"), default="sender",
+                              help="Partition by sender hash or by time range (default: sender)")
+    split_parser.add_argument("--output", default="shards", help="Output directory (default: shards)")
+
+    serve_parser = commands.add_parser("serve", help="Serve every shard of a directory")
+    serve_parser.add_argument("directory", help="Directory written by split")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=7100,
+                              help="Port of the first shard; shard i uses port + i (default: 7100)")
+
+    query_parser = commands.add_parser("query", help="Run scatter-gather queries")
+    query_parser.add_argument("directory", help="Directory written by split")
+    query_parser.add_argument("--topic", default=None, help="Topic for keyword search and stakeholders")
+    query_parser.add_argument("--connect", default=None,
+                              help="host:port of running shard servers, comma-separated, in shard order")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Sharded Corpus")
+    print("=" * 60)
+    print()
+    {"split": split, "serve": serve, "query": query}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
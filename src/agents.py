@@ -2,13 +2,16 @@
 Agentic Reasoning Layer for AI Chief of Staff.
 Implements Memory, Critic, and Coordinator agents.
 """
+import heapq
 import json
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
 from src.data_loader import EmailDataLoader
 from src.organizational_intelligence import OrganizationalIntelligence
+from src.graph_analytics import GraphAnalytics
+from src.topic_index import TopicIndex
 
 
 class MemoryAgent:
@@ -207,42 +210,60 @@ class CriticAgent:
 class CoordinatorAgent:
     """Agent responsible for determining relevant stakeholders."""
     
-    def __init__(self, data_loader: EmailDataLoader):
+    def __init__(self, data_loader: EmailDataLoader,
+                 graph_analytics: Optional[GraphAnalytics] = None):
         self.data_loader = data_loader
         self.org_intel = OrganizationalIntelligence(data_loader)
+        self.graph_analytics = graph_analytics or GraphAnalytics(data_loader)
+        self.topic_index = TopicIndex(data_loader)
+    
+    def _scan_involvement(self, topic: str) -> Tuple[Dict[str, int], int]:
+        """Involvement per person from a keyword scan, for topics the index cannot answer."""
+        relevant_emails = self.data_loader.get_emails_by_keyword(topic)
+        involvement = defaultdict(int)
+        for email in relevant_emails:
+            if email.get('sender'):
+                involvement[email['sender']] += 1
+            for receiver in email.get('receiver', []):
+                involvement[receiver] += 1
+        return involvement, len(relevant_emails)
+    
+    def _rank_by_influence(self, stakeholders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attach PageRank influence to stakeholders and sort by it."""
+        pagerank = self.graph_analytics.get_pagerank()
+        for stakeholder in stakeholders:
+            stakeholder["influence"] = pagerank.get(stakeholder["email"], 0.0)
+        return sorted(stakeholders, key=lambda s: s["influence"], reverse=True)
     
     def get_stakeholders(self, topic: Optional[str] = None, 
-                        person: Optional[str] = None) -> Dict[str, Any]:
-        """Determine relevant stakeholders for a topic or person."""
+                        person: Optional[str] = None,
+                        rank_by: str = "count") -> Dict[str, Any]:
+        """
+        Determine relevant stakeholders for a topic or person.
+        
+        Args:
+            topic: Topic keyword or phrase to find stakeholders for
+            person: Email address to find connected stakeholders for
+            rank_by: "count" to rank by email volume, "influence" to rank by
+                weighted PageRank over the communication network
+        """
+        if rank_by == "influence":
+            return self._get_stakeholders_by_influence(topic=topic, person=person)
+        
         if topic:
-            # Find stakeholders for a specific topic
-            relevant_emails = self.data_loader.get_emails_by_keyword(topic)
-            stakeholders = set()
-            
-            for email in relevant_emails:
-                if email.get('sender'):
-                    stakeholders.add(email['sender'])
-                stakeholders.update(email.get('receiver', []))
-            
-            # Rank by involvement
-            involvement = defaultdict(int)
-            for email in relevant_emails:
-                if email.get('sender'):
-                    involvement[email['sender']] += 1
-                for receiver in email.get('receiver', []):
-                    involvement[receiver] += 1
-            
-            ranked_stakeholders = sorted(
-                involvement.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
+            # Rank by involvement: top-k over the topic index's counts
+            indexed = self.topic_index.top_stakeholders(topic, 10)
+            if indexed is not None:
+                ranked_stakeholders, total_emails = indexed
+            else:
+                involvement, total_emails = self._scan_involvement(topic)
+                ranked_stakeholders = heapq.nlargest(10, involvement.items(), key=lambda x: x[1])
             
             return {
                 "topic": topic,
                 "stakeholders": [{"email": email, "involvement": count} 
-                               for email, count in ranked_stakeholders[:10]],
-                "total_emails": len(relevant_emails)
+                               for email, count in ranked_stakeholders],
+                "total_emails": total_emails
             }
         
         elif person:
@@ -268,6 +289,49 @@ class CoordinatorAgent:
                 "total": len(top_communicators)
             }
     
+    def _get_stakeholders_by_influence(self, topic: Optional[str] = None,
+                                       person: Optional[str] = None) -> Dict[str, Any]:
+        """Rank stakeholders by network influence instead of raw email counts."""
+        if topic:
+            involvement, total_emails = (self.topic_index.involvement(topic)
+                                         or self._scan_involvement(topic))
+            
+            ranked = self._rank_by_influence(
+                [{"email": email, "involvement": count} for email, count in involvement.items()]
+            )
+            return {
+                "topic": topic,
+                "rank_by": "influence",
+                "stakeholders": ranked[:10],
+                "total_emails": total_emails
+            }
+        
+        elif person:
+            # Every correspondent, not only the top ones, re-ranked by influence
+            correspondents = self.org_intel.get_correspondents(person)
+            total_communications = (len(self.data_loader.sender_index.get(person.lower(), [])) +
+                                    len(self.data_loader.receiver_index.get(person.lower(), [])))
+            
+            ranked = self._rank_by_influence(
+                [{"email": email, "communications": count} for email, count in correspondents.items()]
+            )
+            return {
+                "person": person,
+                "rank_by": "influence",
+                "stakeholders": ranked[:10],
+                "total_communications": total_communications
+            }
+        
+        else:
+            top_influencers = self.graph_analytics.get_top_influencers(20)
+            return {
+                "type": "all_stakeholders",
+                "rank_by": "influence",
+                "stakeholders": [{"email": email, "influence": score}
+                               for email, score in top_influencers],
+                "total": len(top_influencers)
+            }
+    
     def get_stakeholder_relevance(self, topic: str) -> Dict[str, Any]:
         """Get stakeholder relevance for a specific topic."""
         # Validate topic parameter
@@ -2,13 +2,23 @@
 AI Chief of Staff - Main interface for querying organizational intelligence.
 """
 import os
+import re
 import json
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterator
 from openai import OpenAI
 from dotenv import load_dotenv
 
 from src.data_loader import EmailDataLoader
 from src.organizational_intelligence import OrganizationalIntelligence
+from src.llm_cache import LLMResponseCache
+from src.fake_llm import FakeOpenAI
+from src.async_llm import AsyncLLMClient
+from src.context_builder import ContextBuilder
+from src.summaries import SummaryStore, fingerprint, thread_key
+from src.map_reduce import MapReduceQuery
+from src.query_planner import QueryPlanner
+from src.metrics import span, timed, observe, increment
 
 load_dotenv()
 
@@ -16,25 +26,122 @@ load_dotenv()
 class AICChiefOfStaff:
     """AI Chief of Staff for Organizational Intelligence."""
     
-    def __init__(self, json_file_path: str = "emails.json", api_key: Optional[str] = None):
+    def __init__(self, json_file_path: str = "emails.json", api_key: Optional[str] = None,
+                 cache: Optional[LLMResponseCache] = None, client: Any = None,
+                 data_loader: Optional[EmailDataLoader] = None):
         """
         Initialize the AI Chief of Staff.
         
         Args:
             json_file_path: Path to email JSON file
             api_key: OpenAI API key (if not provided, uses OPENAI_API_KEY env var)
+            cache: LLM response cache (default: configured from LLM_CACHE_* env vars)
+            client: Chat completions client (default: OpenAI, or the local fake
+                when LLM_PROVIDER=fake)
+            data_loader: Already configured loader to share (default: a new
+                loader for json_file_path)
         """
-        self.data_loader = EmailDataLoader(json_file_path)
+        self.data_loader = data_loader or EmailDataLoader(json_file_path)
         self.org_intelligence = OrganizationalIntelligence(self.data_loader)
         
         # Initialize OpenAI client
-        api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY in .env file.")
+        if client is None and os.getenv("LLM_PROVIDER", "openai").lower() == "fake":
+            client = FakeOpenAI()
+        if client is None:
+            api_key = api_key or os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY in .env file.")
+            client = OpenAI(api_key=api_key)
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = client
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.cache = cache or LLMResponseCache.from_env()
+        self.context_builder = ContextBuilder.from_env(model=self.model)
+        self.summary_store = SummaryStore.from_env()
+        # Thread key -> email positions, folded in like the loader indexes
+        self._threads: Dict[str, List[int]] = {}
+        self._threads_epoch = None
+        self._threads_folded = 0
+        self._threads_lock = threading.Lock()
+        self.planner = QueryPlanner(self.data_loader, self.org_intelligence)
+        self.planner_llm_phrasing = os.getenv("PLANNER_LLM_PHRASING", "false").lower() == "true"
+        self._api_key = api_key
+        self._async_llm = None
     
+    @property
+    def async_llm(self) -> AsyncLLMClient:
+        """Shared async client for batch completions, created on first use."""
+        if self._async_llm is None:
+            self._async_llm = AsyncLLMClient.from_env(
+                api_key=self._api_key, model=self.model,
+                fake=isinstance(self.client, FakeOpenAI)
+            )
+        return self._async_llm
+    
+    def _cache_key(self, messages: List[Dict[str, str]], temperature: float,
+                   max_tokens: int) -> str:
+        return self.cache.make_key(self.model, messages, self.data_loader.data_version,
+                                   temperature=temperature, max_tokens=max_tokens)
+    
+    def _complete(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                  max_tokens: int = 2000) -> Tuple[str, bool]:
+        """
+        Run a chat completion, serving repeated prompts from the cache.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the completion
+            
+        Returns:
+            Tuple of (response text, whether it came from the cache)
+        """
+        key = self._cache_key(messages, temperature, max_tokens)
+        cached = self.cache.get(key)
+        increment("llm_cache_lookups", "LLM response cache lookups", hit=str(cached is not None).lower())
+        if cached is not None:
+            return cached, True
+        
+        with span("llm"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            observe("llm_tokens", usage.prompt_tokens, kind="prompt")
+            observe("llm_tokens", usage.completion_tokens, kind="completion")
+        content = response.choices[0].message.content
+        self.cache.set(key, content)
+        return content, False
+    
+    def _stream_completion(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                           max_tokens: int = 2000) -> Iterator[str]:
+        """
+        Run a streaming chat completion, yielding content tokens as they arrive.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the completion
+        """
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+    
+    @timed("context.prepare")
     def _prepare_context(self, query: str) -> str:
         """
         Prepare context about the organization for the AI.
@@ -61,6 +168,7 @@ Top Communicators:
         
         return context
     
+    @timed("retrieval")
     def _get_relevant_emails(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get relevant emails based on query.
@@ -101,37 +209,84 @@ Top Communicators:
         
         return unique_emails
     
-    def query(self, user_query: str, include_emails: bool = True) -> Dict[str, Any]:
+    def _summary_context(self, user_query: str, relevant_emails: List[Dict[str, Any]],
+                         max_threads: int = 3) -> str:
         """
-        Query the AI Chief of Staff.
+        Precomputed summaries of people named in the query and of the threads
+        the relevant emails belong to. Summaries built before the person's or
+        thread's current emails (e.g. before an ingestion) are left out.
+        """
+        sections = []
+        for address in dict.fromkeys(re.findall(r"[\w.+-]+@[\w-]+\.[\w.-]+", user_query)):
+            summary = self._stored_person_summary(address)
+            if summary:
+                sections.append(f"\nPerson {address}:\n{summary}\n")
+        
+        threads = [key for key in dict.fromkeys(thread_key(e.get('subject', ''))
+                                                 for e in relevant_emails) if key]
+        for key in threads[:max_threads]:
+            record = self.summary_store.get("threads", key, fingerprint(self._thread_emails(key)))
+            if record:
+                sections.append(f"\nThread \"{key}\":\n{record['summary']}\n")
+        
+        if not sections:
+            return ""
+        return "\n\nPrecomputed Summaries:\n" + "".join(sections)
+    
+    def _stored_person_summary(self, email_address: str) -> Optional[str]:
+        """Stored summary for a person, if it was built from their current mail."""
+        address = email_address.lower()
+        # Summaries are keyed by lowercased address, like the loader indexes
+        emails = (self.data_loader.get_emails_by_sender(address) +
+                  self.data_loader.get_emails_by_receiver(address))
+        record = self.summary_store.get("people", address, fingerprint(emails))
+        return record["summary"] if record else None
+    
+    def _thread_emails(self, key: str) -> List[Dict[str, Any]]:
+        """Current emails of a thread (as grouped by BatchSummarizer.group_by_thread)."""
+        with self._threads_lock:
+            self.data_loader.load()
+            if self._threads_epoch != self.data_loader.epoch:
+                self._threads = {}
+                self._threads_epoch = self.data_loader.epoch
+                self._threads_folded = 0
+            emails = self.data_loader.emails
+            end = len(emails)
+            for position in range(self._threads_folded, end):
+                email_key = thread_key(emails[position].get('subject', ''))
+                if email_key:
+                    self._threads.setdefault(email_key, []).append(position)
+            self._threads_folded = end
+            return [emails[i] for i in self._threads.get(key, [])]
+    
+    def _build_messages(self, user_query: str,
+                        include_emails: bool = True) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        Build the chat messages for a query.
         
         Args:
             user_query: User's question or request
             include_emails: Whether to include relevant emails in context
             
         Returns:
-            Dictionary with AI response and metadata
+            Tuple of (chat messages, relevant emails used as context)
         """
         # Prepare context
         context = self._prepare_context(user_query)
         
-        # Get relevant emails if requested
+        # Get relevant emails if requested and pack the best snippets into the token budget
         relevant_emails = []
+        email_context = ""
         if include_emails:
-            relevant_emails = self._get_relevant_emails(user_query, limit=5)
+            candidates = self._get_relevant_emails(
+                user_query, limit=int(os.getenv("CONTEXT_CANDIDATES", 30))
+            )
+            with span("context.pack"):
+                snippets, relevant_emails = self.context_builder.build(user_query, candidates)
+            if snippets:
+                email_context = "\n\nRelevant Emails:\n" + snippets
         
-        # Build email context
-        email_context = ""
-        if relevant_emails:
-            email_context = "\n\nRelevant Emails:\n"
-            for i, email in enumerate(relevant_emails[:5], 1):
-                email_context += f"\nEmail {i}:\n"
-                email_context += f"From: {email.get('sender', 'Unknown')}\n"
-                email_context += f"To: {', '.join(email.get('receiver', []))}\n"
-                email_context += f"Subject: {email.get('subject', 'No subject')}\n"
-                email_context += f"Date: {email.get('timestamp', 'Unknown')}\n"
-                body_preview = email.get('body', '')[:500]
-                email_context += f"Body: {body_preview}...\n"
+        summary_context = self._summary_context(user_query, relevant_emails)
         
         # Create prompt
         system_prompt = """You are an AI Chief of Staff for Organizational Intelligence. 
@@ -141,31 +296,53 @@ and help understand patterns, relationships, and dynamics within the organizatio
 You have access to email communications data. Use this information to provide accurate, 
 helpful, and insightful responses. Be concise but thorough."""
         
-        user_prompt = f"""{context}{email_context}
+        user_prompt = f"""{context}{summary_context}{email_context}
 
 User Query: {user_query}
 
 Please provide a comprehensive answer based on the organizational intelligence data available."""
         
-        # Call OpenAI API
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        return messages, relevant_emails
+    
+    def query(self, user_query: str, include_emails: bool = True,
+              mode: str = "standard") -> Dict[str, Any]:
+        """
+        Query the AI Chief of Staff.
+        
+        Args:
+            user_query: User's question or request
+            include_emails: Whether to include relevant emails in context
+            mode: "standard" answers from the best-matching snippets;
+                "map_reduce" summarizes shards of all matching emails in
+                parallel and combines them, for org-wide questions
             
-            ai_response = response.choices[0].message.content
+        Returns:
+            Dictionary with AI response and metadata
+        """
+        if mode == "map_reduce":
+            return self.query_map_reduce(user_query)
+        
+        planned = self._answer_structured(user_query)
+        if planned is not None:
+            return planned
+        
+        messages, relevant_emails = self._build_messages(user_query, include_emails)
+        
+        # Call OpenAI API (or serve an identical earlier prompt from the cache)
+        try:
+            ai_response, cache_hit = self._complete(messages)
             
             return {
                 "query": user_query,
                 "response": ai_response,
                 "relevant_emails_count": len(relevant_emails),
-                "model": self.model
+                "prompt_tokens": sum(self.context_builder.count_tokens(m["content"]) for m in messages),
+                "model": self.model,
+                "cache": dict(self.cache.get_stats(), hit=cache_hit)
             }
         
         except Exception as e:
@@ -175,14 +352,122 @@ Please provide a comprehensive answer based on the organizational intelligence d
                 "error": True
             }
     
-    def get_insights(self) -> Dict[str, Any]:
+    def _answer_structured(self, user_query: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer structured questions exactly from the indexes, without the LLM.
+        
+        With PLANNER_LLM_PHRASING=true the exact result is passed to the LLM
+        only to be phrased; the facts still come from the planner.
+        """
+        with span("planner"):
+            plan = self.planner.answer(user_query)
+        if plan is None:
+            return None
+        
+        response = plan["answer"]
+        if self.planner_llm_phrasing:
+            try:
+                response, _ = self._complete([
+                    {"role": "system", "content": "Rephrase the exact answer below as a short, natural reply. "
+                                                  "Do not change or add any facts or numbers."},
+                    {"role": "user", "content": f"Question: {user_query}\n\nExact answer:\n{plan['answer']}"}
+                ], temperature=0.3, max_tokens=300)
+            except Exception:
+                response = plan["answer"]
+        
+        return {
+            "query": user_query,
+            "response": response,
+            "relevant_emails_count": 0,
+            "planner": {"intent": plan["intent"], "data": plan["data"]},
+            "model": self.model if self.planner_llm_phrasing else None,
+            "prompt_tokens": 0
+        }
+    
+    def query_map_reduce(self, user_query: str) -> Dict[str, Any]:
+        """
+        Answer an org-wide question with map-reduce over all matching emails.
+        
+        Args:
+            user_query: User's question or request
+            
+        Returns:
+            Dictionary with AI response and shard metadata
+        """
+        runner = MapReduceQuery.from_env(self.data_loader, self.async_llm, self.cache,
+                                         self.context_builder, self.model)
+        try:
+            result = runner.run(user_query)
+        except Exception as e:
+            return {
+                "query": user_query,
+                "response": f"Error processing query: {str(e)}",
+                "error": True
+            }
+        
+        result.update({
+            "query": user_query,
+            "mode": "map_reduce",
+            "model": self.model,
+            "cache": self.cache.get_stats()
+        })
+        return result
+    
+    def query_stream(self, user_query: str, include_emails: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Query the AI Chief of Staff, streaming the answer as it is generated.
+        
+        Args:
+            user_query: User's question or request
+            include_emails: Whether to include relevant emails in context
+            
+        Yields:
+            {"token": str} events while the answer streams, then a final
+            {"done": True, ...} event with the same metadata as query()
+        """
+        try:
+            planned = self._answer_structured(user_query)
+            if planned is not None:
+                yield {"token": planned.pop("response")}
+                yield dict(planned, done=True)
+                return
+            
+            messages, relevant_emails = self._build_messages(user_query, include_emails)
+            key = self._cache_key(messages, temperature=0.7, max_tokens=2000)
+            cached = self.cache.get(key)
+            
+            if cached is not None:
+                yield {"token": cached}
+            else:
+                parts = []
+                for token in self._stream_completion(messages):
+                    parts.append(token)
+                    yield {"token": token}
+                self.cache.set(key, "".join(parts))
+        except Exception as e:
+            yield {"done": True, "query": user_query,
+                   "response": f"Error processing query: {str(e)}", "error": True}
+            return
+        
+        yield {
+            "done": True,
+            "query": user_query,
+            "relevant_emails_count": len(relevant_emails),
+            "model": self.model,
+            "cache": dict(self.cache.get_stats(), hit=cached is not None)
+        }
+    
+    def get_insights(self, approximate: bool = False) -> Dict[str, Any]:
         """
         Get organizational insights summary.
         
+        Args:
+            approximate: Use streaming sketches and report their error bounds
+        
         Returns:
             Dictionary with organizational insights
         """
-        return self.org_intelligence.get_organizational_insights()
+        return self.org_intelligence.get_organizational_insights(approximate=approximate)
     
     def analyze_person(self, email_address: str) -> Dict[str, Any]:
         """
@@ -196,12 +481,70 @@ Please provide a comprehensive answer based on the organizational intelligence d
         """
         patterns = self.org_intelligence.get_communication_patterns(email_address)
         
-        # Get AI analysis
-        query = f"Analyze the communication patterns and role of {email_address} in the organization."
-        ai_analysis = self.query(query, include_emails=False)
+        # Use the precomputed summary when it is current, otherwise ask the AI
+        summary = self._stored_person_summary(email_address)
+        if summary is not None:
+            return {
+                "email": email_address,
+                "patterns": patterns,
+                "ai_analysis": summary,
+                "source": "precomputed"
+            }
+        
+        ai_analysis = self.query(self._person_query(email_address), include_emails=False)
         
         return {
             "email": email_address,
             "patterns": patterns,
-            "ai_analysis": ai_analysis.get("response", "")
+            "ai_analysis": ai_analysis.get("response", ""),
+            "source": "live"
         }
+    
+    @staticmethod
+    def _person_query(email_address: str) -> str:
+        return f"Analyze the communication patterns and role of {email_address} in the organization."
+    
+    def analyze_people(self, email_addresses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze several people, running their LLM analyses concurrently.
+        
+        Cached analyses are reused; the rest run in parallel through the
+        async client, within its concurrency and rate limits.
+        
+        Args:
+            email_addresses: Email addresses of the people
+            
+        Returns:
+            List of analyses in the same shape as analyze_person, in input order
+        """
+        results = []
+        pending = []
+        for email_address in email_addresses:
+            result = {
+                "email": email_address,
+                "patterns": self.org_intelligence.get_communication_patterns(email_address),
+                "ai_analysis": self._stored_person_summary(email_address),
+                "source": "precomputed"
+            }
+            if result["ai_analysis"] is None:
+                messages, _ = self._build_messages(self._person_query(email_address), include_emails=False)
+                key = self._cache_key(messages, temperature=0.7, max_tokens=2000)
+                result["ai_analysis"] = self.cache.get(key)
+                result["source"] = "live"
+                if result["ai_analysis"] is None:
+                    pending.append((result, key, messages))
+            results.append(result)
+        
+        if pending:
+            responses = self.async_llm.run(
+                self.async_llm.complete_many([messages for _, _, messages in pending])
+            )
+            for (result, key, _), response in zip(pending, responses):
+                if isinstance(response, Exception):
+                    result["ai_analysis"] = f"Error processing query: {str(response)}"
+                    result["error"] = True
+                else:
+                    result["ai_analysis"] = response
+                    self.cache.set(key, response)
+        
+        return results
@@ -1,14 +1,22 @@
 """
 REST API for AI Chief of Staff.
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+import hmac
+import io
+import json
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
+from werkzeug.local import LocalProxy
 
-from src.ai_chief_of_staff import AICChiefOfStaff
-from src.neo4j_graph import Neo4jGraphDB
-from src.agents import MemoryAgent, CriticAgent, CoordinatorAgent, log_agent_output
+from src.http_cache import ResponseCache, cached_response
+from src.metrics import metrics, observe, start_request, finish_request, server_timing
+from src.profiling import MemoryProfiler, SamplingProfiler, structure_sizes
+from src.tenants import TenantRegistry, TenantPathMiddleware
+from src.agents import log_agent_output
 
 load_dotenv()
 
@@ -18,38 +26,127 @@ static_dir = os.path.join(base_dir, 'static')
 
 app = Flask(__name__, static_folder=static_dir, static_url_path='/static')
 CORS(app)  # Enable CORS for frontend
-
-# Initialize AI Chief of Staff
-json_file = os.getenv("JSON_FILE_PATH", "emails.json")
-chief_of_staff = None
-
-try:
-    chief_of_staff = AICChiefOfStaff(json_file_path=json_file)
-except Exception as e:
-    print(f"Warning: Could not initialize AI Chief of Staff: {e}")
-
-# Initialize Neo4j
-neo4j_db = None
-try:
-    neo4j_db = Neo4jGraphDB()
-    print("Neo4j connection established")
-except Exception as e:
-    print(f"Warning: Could not connect to Neo4j: {e}")
-    print("Graph features will be unavailable")
-
-# Initialize Agents
-memory_agent = None
-critic_agent = None
-coordinator_agent = None
-
-try:
-    if chief_of_staff:
-        memory_agent = MemoryAgent(chief_of_staff.data_loader)
-        critic_agent = CriticAgent(chief_of_staff.data_loader)
-        coordinator_agent = CoordinatorAgent(chief_of_staff.data_loader)
-        print("Agentic reasoning layer initialized")
-except Exception as e:
-    print(f"Warning: Could not initialize agents: {e}")
+# /t/<tenant>/... serves the same routes for that tenant
+app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+
+# One lazily loaded state per tenant; see src/tenants.py and src/app_state.py
+tenants = TenantRegistry.from_env()
+
+
+def _current_state():
+    """The state of the request's tenant, or of the default tenant outside requests."""
+    if has_request_context() and "state" in g:
+        return g.state
+    if tenants.default is None:
+        raise RuntimeError("No default tenant. Set DEFAULT_TENANT.")
+    return tenants.get(tenants.default)
+
+
+state = LocalProxy(_current_state)
+
+# Opt-in profiling; tracing starts before any data is loaded
+profiling_enabled = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+memory_profiler = MemoryProfiler.from_env()
+if os.getenv("PROFILING_TRACEMALLOC", "false").lower() == "true":
+    memory_profiler.start()
+
+# Serialized responses of read-only endpoints, keyed by tenant and data version
+response_cache = ResponseCache.from_env()
+cached = cached_response(response_cache, lambda: (g.tenant, state.data_loader.data_version))
+# Neo4j is also written after the version bump (graph change queue) and by
+# sync_graph.py, so views over graph_db are cached for the in-memory graph only
+cached_graph = cached_response(response_cache, lambda: (g.tenant, state.data_loader.data_version),
+                               enabled=lambda: state.graph_backend == "memory")
+admin_token = os.getenv("ADMIN_TOKEN")
+# Without a token, admin endpoints are refused unless explicitly opened (local development)
+admin_open = os.getenv("ADMIN_OPEN", "false").lower() == "true"
+ingest_max_batch = int(os.getenv("INGEST_MAX_BATCH", 1000))
+analyze_max_batch = int(os.getenv("ANALYZE_MAX_BATCH", 100))
+# Most communities laid out for one overview (the layout is quadratic in them)
+MAX_OVERVIEW_COMMUNITIES = 200
+
+
+def _admin_forbidden():
+    """
+    Error response unless the request carries ADMIN_TOKEN in X-Admin-Token.
+
+    Without ADMIN_TOKEN, admin endpoints are refused unless ADMIN_OPEN=true.
+    """
+    if not admin_token:
+        if admin_open:
+            return None
+        return jsonify({"error": "Admin endpoints are disabled. Set ADMIN_TOKEN (or ADMIN_OPEN=true)."}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token):
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
+
+
+@app.before_request
+def resolve_tenant():
+    """
+    Select the request's tenant from the /t/<tenant> path prefix or the
+    X-Tenant header, falling back to the default tenant.
+    """
+    if request.endpoint == 'static':
+        return None
+    name = (request.environ.get(TenantPathMiddleware.ENVIRON_KEY)
+            or request.headers.get("X-Tenant") or tenants.default)
+    if name is None:
+        return jsonify({"error": "No tenant given. Use the X-Tenant header or a /t/<tenant> path."}), 400
+    if name not in tenants:
+        return jsonify({"error": f"Unknown tenant: {name}"}), 404
+    g.tenant = name
+    g.state = tenants.get(name)
+    tenants.reloader(name).ensure_watching()
+    return None
+
+
+@app.before_request
+def start_timing():
+    """Start collecting this request's spans."""
+    if metrics.enabled:
+        g.metrics_token = start_request()
+        g.request_start = time.perf_counter()
+
+
+@app.after_request
+def vary_by_tenant(response):
+    """
+    Mark responses as depending on the X-Tenant header when it selects the
+    tenant, so browsers and proxies do not reuse one tenant's response for
+    another at the same URL.
+    """
+    header_routed = len(tenants.tenants) > 1 or tenants.default is None
+    if header_routed and TenantPathMiddleware.ENVIRON_KEY not in request.environ:
+        response.vary.add("X-Tenant")
+    return response
+
+
+@app.after_request
+def enforce_tenant_budget(response):
+    """Evict least recently used tenants once loaded tenants exceed the memory budget."""
+    if "tenant" in g:
+        try:
+            tenants.enforce_budget(keep=g.tenant)
+        except Exception as e:
+            print(f"Warning: Could not enforce the tenant memory budget: {e}")
+    return response
+
+
+@app.after_request
+def record_timing(response):
+    """Record request latency and size and add the Server-Timing header."""
+    if not metrics.enabled or "metrics_token" not in g:
+        return response
+    total = time.perf_counter() - g.request_start
+    spans = finish_request(g.pop("metrics_token"))
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    observe("http_request_seconds", total, endpoint=endpoint, method=request.method,
+            status=str(response.status_code))
+    if not response.is_streamed and response.content_length is not None:
+        observe("http_response_bytes", response.content_length, endpoint=endpoint)
+    response.headers["Server-Timing"] = server_timing(spans, total)
+    return response
 
 
 @app.route('/', methods=['GET'])
@@ -62,12 +159,180 @@ def index():
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({"status": "healthy", "initialized": chief_of_staff is not None})
+    return jsonify({
+        "status": "healthy",
+        "initialized": state.is_initialized("chief_of_staff"),
+        "data_loaded": state.data_loader.loaded,
+        "load": state.load_info,
+        "http_cache": response_cache.get_stats(),
+        "data_version": state.data_loader.data_version,
+        "tenant": g.tenant
+    })
+
+
+@app.route('/api/admin/reload', methods=['GET', 'POST'])
+def reload_data():
+    """
+    Reload the email data in the background (POST) or report reload status (GET).
+
+    Requests keep being served from the current data until the reloaded
+    data is ready. Only the request's tenant is reloaded. The X-Admin-Token
+    header must match ADMIN_TOKEN.
+    """
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    reloader = tenants.reloader(g.tenant)
+    if request.method == 'GET':
+        return jsonify(reloader.status())
+    try:
+        data = request.get_json(silent=True) or {}
+        started = reloader.reload(wait=bool(data.get("wait", False)))
+        status = reloader.status()
+        status["started"] = started
+        if not started:
+            return jsonify(status), 409
+        if not data.get("wait"):
+            return jsonify(status), 202
+        return jsonify(status), 500 if status["last_error"] else 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/admin/tenants', methods=['GET'])
+def tenant_stats():
+    """Configured tenants, the loaded ones with their sizes, and evictions."""
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    return jsonify(tenants.get_stats())
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Latency, size and token metrics in the Prometheus text format."""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled. Set METRICS_ENABLED=true."}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Profiling Endpoints (PROFILING_ENABLED=true)
+def _profiling_disabled():
+    return jsonify({"error": "Profiling is disabled. Start the API with --profile "
+                             "or set PROFILING_ENABLED=true."}), 404
+
+
+@app.route('/api/profile/sizes', methods=['GET'])
+def profile_sizes():
+    """Approximate sizes of the loaded records, indexes and caches."""
+    if not profiling_enabled:
+        return _profiling_disabled()
+    
+    try:
+        sample = int(request.args.get('sample', 1000))
+        structures = state.memory_structures() + [
+            ("http_cache", response_cache),
+            ("metrics", metrics)
+        ]
+        return jsonify(structure_sizes(structures, sample=sample))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/profile/memory', methods=['GET'])
+def profile_memory():
+    """Live allocations grouped by module, or a downloadable tracemalloc snapshot."""
+    if not profiling_enabled:
+        return _profiling_disabled()
+    
+    try:
+        if request.args.get('download'):
+            name = f"memory-{int(time.time())}.tracemalloc"
+            # tracemalloc only writes to files: read it back and remove it before sending
+            with tempfile.TemporaryDirectory(prefix="cos-profile-") as directory:
+                with open(memory_profiler.dump(os.path.join(directory, name)), "rb") as f:
+                    data = io.BytesIO(f.read())
+            return send_file(data, as_attachment=True, download_name=name,
+                             mimetype="application/octet-stream")
+        top = int(request.args.get('top', 30))
+        return jsonify(memory_profiler.report(top=top))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/profile/cpu', methods=['GET'])
+def profile_cpu():
+    """Sample all threads for N seconds of live traffic."""
+    if not profiling_enabled:
+        return _profiling_disabled()
+    
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), 300.0)
+        interval = max(float(request.args.get('interval', 0.005)), 0.001)
+        profiler = SamplingProfiler(interval=interval)
+        result = profiler.profile(seconds)
+        if request.args.get('format') == 'collapsed':
+            return Response(
+                profiler.collapsed(result), mimetype="text/plain",
+                headers={"Content-Disposition": f"attachment; filename=cpu-{int(time.time())}.collapsed"}
+            )
+        result.pop("stacks")
+        return jsonify(result)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_emails():
+    """
+    Add emails to the loaded data without a reload.
+
+    Accepts a raw RFC822 message (Content-Type message/rfc822 or text/plain),
+    or JSON: a list of email records, or {"emails": [...], "messages": [...]}
+    with records and raw RFC822 texts. The X-Admin-Token header must
+    match ADMIN_TOKEN.
+    """
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    ingestor = state.ingestor
+    if not ingestor:
+        return jsonify({"error": "Ingestion not available. Check that the email data loads."}), 500
+
+    try:
+        if request.mimetype in ('message/rfc822', 'text/plain'):
+            records, messages = [], [request.get_data(as_text=True)]
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, list):
+                records, messages = data, []
+            elif isinstance(data, dict):
+                records, messages = data.get('emails', []), data.get('messages', [])
+            else:
+                return jsonify({"error": "Expected a JSON list of emails, an object with emails/messages, "
+                                         "or an RFC822 message"}), 400
+            if not isinstance(records, list) or not isinstance(messages, list):
+                return jsonify({"error": "emails and messages must be lists"}), 400
+
+        if len(records) + len(messages) > ingest_max_batch:
+            return jsonify({"error": f"At most {ingest_max_batch} emails per request"}), 413
+
+        result = ingestor.ingest(records, messages)
+        result.update(ingestor.get_stats())
+        status = 400 if result["rejected"] and not result["received"] - len(result["rejected"]) else 200
+        return jsonify(result), status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route('/api/query', methods=['POST'])
 def query():
     """Query the AI Chief of Staff."""
+    chief_of_staff = state.chief_of_staff
     if not chief_of_staff:
         return jsonify({"error": "AI Chief of Staff not initialized"}), 500
     
@@ -78,22 +343,53 @@ def query():
         return jsonify({"error": "Query is required"}), 400
     
     include_emails = data.get('include_emails', True)
+    mode = data.get('mode', 'standard')
     
     try:
-        result = chief_of_staff.query(user_query, include_emails=include_emails)
+        result = chief_of_staff.query(user_query, include_emails=include_emails, mode=mode)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/query/stream', methods=['POST'])
+def query_stream():
+    """Query the AI Chief of Staff, streaming tokens as Server-Sent Events."""
+    chief_of_staff = state.chief_of_staff
+    if not chief_of_staff:
+        return jsonify({"error": "AI Chief of Staff not initialized"}), 500
+    
+    data = request.get_json()
+    user_query = data.get('query', '')
+    
+    if not user_query:
+        return jsonify({"error": "Query is required"}), 400
+    
+    include_emails = data.get('include_emails', True)
+    
+    def generate():
+        for event in chief_of_staff.query_stream(user_query, include_emails=include_emails):
+            name = "done" if event.get("done") else "token"
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/api/insights', methods=['GET'])
+@cached
 def insights():
-    """Get organizational insights."""
+    """Get organizational insights (approximate=true computes them from sketches)."""
+    chief_of_staff = state.chief_of_staff
     if not chief_of_staff:
         return jsonify({"error": "AI Chief of Staff not initialized"}), 500
     
     try:
-        insights_data = chief_of_staff.get_insights()
+        approximate = request.args.get('approximate', 'false').lower() == 'true'
+        insights_data = chief_of_staff.get_insights(approximate=approximate)
         return jsonify(insights_data)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -102,6 +398,7 @@ def insights():
 @app.route('/api/analyze-person', methods=['POST'])
 def analyze_person():
     """Analyze a specific person's communication patterns."""
+    chief_of_staff = state.chief_of_staff
     if not chief_of_staff:
         return jsonify({"error": "AI Chief of Staff not initialized"}), 500
     
@@ -118,39 +415,67 @@ def analyze_person():
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/api/people', methods=['GET'])
-def get_people():
-    """Get list of all people in the organization."""
+@app.route('/api/analyze-people', methods=['POST'])
+def analyze_people():
+    """Analyze several people's communication patterns concurrently."""
+    chief_of_staff = state.chief_of_staff
     if not chief_of_staff:
         return jsonify({"error": "AI Chief of Staff not initialized"}), 500
     
+    data = request.get_json() or {}
+    email_addresses = data.get('emails', [])
+    
+    if not email_addresses or not isinstance(email_addresses, list):
+        return jsonify({"error": "A list of email addresses is required"}), 400
+    if not all(isinstance(address, str) for address in email_addresses):
+        return jsonify({"error": "Email addresses must be strings"}), 400
+    if len(email_addresses) > analyze_max_batch:
+        return jsonify({"error": f"At most {analyze_max_batch} people per request"}), 413
+    
+    try:
+        results = chief_of_staff.analyze_people(email_addresses)
+        return jsonify({"results": results, "count": len(results)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/people', methods=['GET'])
+@cached
+def get_people():
+    """Search people in the organization, one page at a time."""
+    people_directory = state.people_directory
+    if not people_directory:
+        return jsonify({"error": "People directory not initialized"}), 500
+    
     try:
-        senders = chief_of_staff.data_loader.get_all_senders()
-        receivers = chief_of_staff.data_loader.get_all_receivers()
-        all_people = sorted(list(set(senders + receivers)))
-        return jsonify({"people": all_people, "count": len(all_people)})
+        query = request.args.get('q', '')
+        limit = min(int(request.args.get('limit', 50)), 1000)
+        cursor = request.args.get('cursor') or None
+        return jsonify(people_directory.search(query, limit=limit, cursor=cursor))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/api/graph', methods=['GET'])
+@cached_graph
 def get_graph():
     """Get graph data for visualization."""
-    if not neo4j_db:
+    graph_db = state.graph_db
+    if not graph_db:
         return jsonify({
-            "error": "Neo4j not initialized. Please check your .env file has correct NEO4J_URI, NEO4J_USER, and NEO4J_PASSWORD.",
+            "error": "Graph backend not initialized. Please check your .env file has correct NEO4J_URI, NEO4J_USER, and NEO4J_PASSWORD, or set GRAPH_BACKEND=memory.",
             "nodes": [],
             "edges": []
         }), 200
     
     try:
         limit = int(request.args.get('limit', 100))
-        graph_data = neo4j_db.get_graph_data(limit=limit)
+        graph_data = graph_db.get_graph_data(limit=limit)
         
         # Check if database is empty
         if not graph_data.get('nodes') or len(graph_data.get('nodes', [])) == 0:
             return jsonify({
-                "error": "No data in Neo4j. Please run: python load_graph_data.py to load email data.",
+                "error": "No graph data. Please run: python load_graph_data.py to load email data into Neo4j.",
                 "nodes": [],
                 "edges": []
             }), 200
@@ -164,38 +489,127 @@ def get_graph():
         }), 200
 
 
+@app.route('/api/graph/overview', methods=['GET'])
+@cached
+def get_graph_overview():
+    """Get the community-collapsed graph with precomputed layout."""
+    graph_analytics = state.graph_analytics
+    if not graph_analytics:
+        return jsonify({"error": "Graph analytics not initialized"}), 500
+    
+    try:
+        limit = min(int(request.args.get('limit', 50)), MAX_OVERVIEW_COMMUNITIES)
+        return jsonify(graph_analytics.get_graph_overview(limit=limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/graph/community/<int:community>', methods=['GET'])
+@cached
+def expand_community(community):
+    """Expand one community super-node into its members."""
+    graph_analytics = state.graph_analytics
+    if not graph_analytics:
+        return jsonify({"error": "Graph analytics not initialized"}), 500
+    
+    try:
+        limit = int(request.args.get('limit', 200))
+        overview_limit = min(int(request.args.get('overview_limit', 50)), MAX_OVERVIEW_COMMUNITIES)
+        return jsonify(graph_analytics.expand_community(community, limit=limit,
+                                                        overview_limit=overview_limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/graph/person/<email>', methods=['GET'])
 def get_person_network(email):
     """Get communication network for a specific person."""
-    if not neo4j_db:
-        return jsonify({"error": "Neo4j not initialized"}), 500
+    graph_db = state.graph_db
+    if not graph_db:
+        return jsonify({"error": "Graph backend not initialized"}), 500
     
     try:
         depth = int(request.args.get('depth', 2))
-        graph_data = neo4j_db.get_person_network(email, depth=depth)
+        graph_data = graph_db.get_person_network(email, depth=depth)
         return jsonify(graph_data)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/api/graph/top-relationships', methods=['GET'])
+@cached_graph
 def get_top_relationships():
     """Get top communication relationships."""
-    if not neo4j_db:
-        return jsonify({"error": "Neo4j not initialized"}), 500
+    graph_db = state.graph_db
+    if not graph_db:
+        return jsonify({"error": "Graph backend not initialized"}), 500
     
     try:
         limit = int(request.args.get('limit', 20))
-        relationships = neo4j_db.get_top_relationships(limit=limit)
+        relationships = graph_db.get_top_relationships(limit=limit)
         return jsonify({"relationships": relationships})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Graph Analytics Endpoints
+@app.route('/api/analytics/influencers', methods=['GET'])
+def get_influencers():
+    """Get the most influential people by weighted PageRank."""
+    graph_analytics = state.graph_analytics
+    if not graph_analytics:
+        return jsonify({"error": "Graph analytics not initialized"}), 500
+    
+    try:
+        limit = int(request.args.get('limit', 10))
+        influencers = graph_analytics.get_top_influencers(limit)
+        return jsonify({
+            "influencers": [{"email": email, "influence": score} for email, score in influencers],
+            "data_version": state.data_loader.data_version
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/analytics/communities', methods=['GET'])
+def get_communities():
+    """Get detected communities and their most influential members."""
+    graph_analytics = state.graph_analytics
+    if not graph_analytics:
+        return jsonify({"error": "Graph analytics not initialized"}), 500
+    
+    try:
+        limit = int(request.args.get('limit', 10))
+        members = int(request.args.get('members', 5))
+        result = graph_analytics.get_community_summary(top_n=limit, members_per_community=members)
+        result["data_version"] = state.data_loader.data_version
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/analytics/bridges', methods=['GET'])
+def get_bridges():
+    """Get people who bridge separate communities."""
+    graph_analytics = state.graph_analytics
+    if not graph_analytics:
+        return jsonify({"error": "Graph analytics not initialized"}), 500
+    
+    try:
+        limit = int(request.args.get('limit', 10))
+        return jsonify({
+            "bridges": graph_analytics.get_bridges(top_n=limit),
+            "data_version": state.data_loader.data_version
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # Agentic Reasoning Endpoints
 @app.route('/api/agents/memory', methods=['POST'])
 def run_memory_agent():
     """Run Memory Agent to update knowledge."""
+    memory_agent = state.memory_agent
     if not memory_agent:
         return jsonify({"error": "Memory Agent not initialized"}), 500
     
@@ -210,6 +624,7 @@ def run_memory_agent():
 @app.route('/api/agents/critic', methods=['POST'])
 def run_critic_agent():
     """Run Critic Agent to detect conflicts."""
+    critic_agent = state.critic_agent
     if not critic_agent:
         return jsonify({"error": "Critic Agent not initialized"}), 500
     
@@ -230,6 +645,7 @@ def run_critic_agent():
 @app.route('/api/agents/coordinator', methods=['POST'])
 def run_coordinator_agent():
     """Run Coordinator Agent to identify stakeholders."""
+    coordinator_agent = state.coordinator_agent
     if not coordinator_agent:
         return jsonify({"error": "Coordinator Agent not initialized"}), 500
     
@@ -237,13 +653,16 @@ def run_coordinator_agent():
         data = request.get_json() or {}
         topic = data.get('topic')
         person = data.get('person')
+        rank_by = data.get('rank_by', 'count')
         
-        if topic:
+        if topic and rank_by == 'influence':
+            result = coordinator_agent.get_stakeholders(topic=topic, rank_by=rank_by)
+        elif topic:
             result = coordinator_agent.get_stakeholder_relevance(topic)
         elif person:
-            result = coordinator_agent.get_stakeholders(person=person)
+            result = coordinator_agent.get_stakeholders(person=person, rank_by=rank_by)
         else:
-            result = coordinator_agent.get_stakeholders()
+            result = coordinator_agent.get_stakeholders(rank_by=rank_by)
         
         log_agent_output("CoordinatorAgent", result)
         return jsonify(result)
@@ -254,6 +673,7 @@ def run_coordinator_agent():
 @app.route('/api/agents/what-changed', methods=['POST'])
 def get_what_changed():
     """Get 'What Changed Today' summary."""
+    memory_agent = state.memory_agent
     if not memory_agent:
         return jsonify({"error": "Memory Agent not initialized"}), 500
     
@@ -269,4 +689,5 @@ def get_what_changed():
 
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 8000))
-    app.run(debug=True, host='127.0.0.1', port=port)
+    debug = os.getenv("FLASK_DEBUG", "true").lower() == "true"
+    app.run(debug=debug, host='127.0.0.1', port=port)
@@ -0,0 +1,329 @@
+"""
+Lazily initialized application state for the API.
+"""
+import gc
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from src.data_loader import EmailDataLoader
+from src.ai_chief_of_staff import AICChiefOfStaff
+from src.graph_backend import GraphBackend
+from src.graph_analytics import AnalyticsGraphBackend, GraphAnalytics
+from src.agents import MemoryAgent, CriticAgent, CoordinatorAgent
+from src.people_directory import PeopleDirectory
+from src.ingest import EmailIngestor, GraphChangeQueue, IngestJournal
+from src.snapshot import read_snapshot, write_snapshot
+
+
+class AppState:
+    """
+    Holds the data loader and every component the API serves from.
+
+    Nothing is loaded or connected at construction. The email data is
+    loaded on first use, from the warm-state snapshot when a current one
+    exists, and each component (AI Chief of Staff, graph backend, analytics,
+    agents) is built the first time an endpoint needs it. A component that
+    fails to initialize is recorded as unavailable instead of retried on
+    every request.
+    """
+
+    def __init__(self, json_file_path: str = "emails.json",
+                 snapshot_path: Optional[str] = None, graph_backend: str = "neo4j",
+                 journal_path: Optional[str] = None):
+        """
+        Initialize the application state.
+
+        Args:
+            json_file_path: Path to email JSON file
+            snapshot_path: Warm-state snapshot file (None disables snapshots)
+            graph_backend: "neo4j" or "memory"
+            journal_path: Journal of ingested emails, replayed on top of the
+                JSON data (None keeps ingested emails in memory only)
+        """
+        self.json_file_path = json_file_path
+        self.snapshot_path = snapshot_path
+        self.graph_backend = graph_backend.lower()
+        self.journal = IngestJournal(journal_path) if journal_path else None
+        self._journal_offset = 0
+        self.data_loader = EmailDataLoader(json_file_path)
+        self.load_info: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> "AppState":
+        """
+        Build the state from JSON_FILE_PATH, STATE_SNAPSHOT_PATH, GRAPH_BACKEND
+        and INGEST_JOURNAL_PATH.
+
+        Without INGEST_JOURNAL_PATH the journal is kept next to the JSON file,
+        so ingested emails survive reloads and reach every worker.
+        """
+        json_file_path = os.getenv("JSON_FILE_PATH", "emails.json")
+        base = os.path.splitext(json_file_path)[0]
+        return cls(
+            json_file_path=json_file_path,
+            snapshot_path=os.getenv("STATE_SNAPSHOT_PATH") or None,
+            graph_backend=os.getenv("GRAPH_BACKEND", "neo4j"),
+            journal_path=os.getenv("INGEST_JOURNAL_PATH") or f"{base}.journal.jsonl"
+        )
+
+    def reloaded(self) -> "AppState":
+        """
+        A fresh, unloaded state over the same sources.
+
+        Its data version continues from this state's, so results cached
+        under the current version are not served for the reloaded data.
+        """
+        state = AppState(self.json_file_path, self.snapshot_path, self.graph_backend,
+                         self.journal.path if self.journal else None)
+        state.data_loader.data_version = self.data_loader.data_version
+        return state
+
+    def ensure_loaded(self):
+        """
+        Load the email data, restoring the snapshot when it is current.
+
+        A missing or stale snapshot is rebuilt from the JSON file.
+        """
+        if self.data_loader.loaded:
+            return
+        with self._lock:
+            if self.data_loader.loaded:
+                return
+            start = time.perf_counter()
+            state = None
+            if self.snapshot_path:
+                state = read_snapshot(self.snapshot_path, self.json_file_path)
+
+            analytics = GraphAnalytics(self.data_loader)
+            if state is not None:
+                self.data_loader.restore_state(state["loader"])
+                analytics.restore_state(state["analytics"])
+                source = "snapshot"
+            else:
+                self.data_loader.load()
+                source = "json"
+                if self.snapshot_path:
+                    self._write_snapshot(analytics)
+            self._components["graph_analytics"] = analytics
+            replayed = self.replay_journal()
+
+            self.load_info = {
+                "source": source,
+                "emails": len(self.data_loader.emails),
+                "journal_emails": replayed,
+                "seconds": round(time.perf_counter() - start, 3)
+            }
+            print(f"Loaded {self.load_info['emails']} emails from {source} "
+                  f"in {self.load_info['seconds']}s")
+
+    def replay_journal(self) -> int:
+        """
+        Append emails journaled since the last replay to the loaded data.
+
+        Returns:
+            Number of emails added
+        """
+        if self.journal is None:
+            return 0
+        with self._lock:
+            emails, self._journal_offset = self.journal.read(self._journal_offset)
+            added = self.data_loader.append(emails) if emails else []
+            analytics = self._components.get("graph_analytics")
+            if added and analytics is not None:
+                analytics.refresh()
+        return len(added)
+
+    def _write_snapshot(self, analytics: GraphAnalytics):
+        try:
+            write_snapshot(self.snapshot_path, self.json_file_path, {
+                "loader": self.data_loader.export_state(),
+                "analytics": analytics.export_state()
+            })
+        except OSError as e:
+            print(f"Warning: Could not write snapshot {self.snapshot_path}: {e}")
+
+    def build_snapshot(self, precompute: bool = True) -> Dict[str, Any]:
+        """
+        Load the data from JSON and write a fresh snapshot.
+
+        Args:
+            precompute: Also compute influence, communities and the graph
+                overview so they are stored in the snapshot
+
+        Returns:
+            Email count, people count and the snapshot path
+        """
+        if not self.snapshot_path:
+            raise ValueError("No snapshot path configured. Set STATE_SNAPSHOT_PATH.")
+        with self._lock:
+            self.data_loader.load()
+            analytics = self._components.get("graph_analytics") or GraphAnalytics(self.data_loader)
+            self._components["graph_analytics"] = analytics
+            if precompute:
+                analytics.get_pagerank()
+                analytics.get_communities()
+                analytics.get_graph_overview()
+            self._write_snapshot(analytics)
+        return {
+            "emails": len(self.data_loader.emails),
+            "people": len(analytics.graph.people),
+            "snapshot": self.snapshot_path
+        }
+
+    def preload(self):
+        """
+        Load the shared read-only data in a pre-fork server master.
+
+        Only the email store, indexes and analytics graph are built here;
+        components holding sockets or threads (Neo4j driver, LLM clients)
+        are still created lazily in each worker after the fork. The loaded
+        objects are then moved to the permanent GC generation, so collections
+        in the workers do not write to their pages and workers keep sharing
+        them copy-on-write.
+        """
+        self.ensure_loaded()
+        analytics = self.graph_analytics
+        if analytics is not None:
+            # Adjacency is otherwise built lazily, i.e. separately in each worker
+            analytics.graph.build_adjacency()
+        gc.collect()
+        gc.freeze()
+
+    def warm(self):
+        """Load the data and build every component now rather than on first use."""
+        for name in ("chief_of_staff", "graph_db", "memory_agent", "critic_agent", "coordinator_agent"):
+            getattr(self, name)
+        if self.coordinator_agent is not None:
+            self.coordinator_agent.topic_index.refresh()
+
+    def _component(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return a component, building it on first use."""
+        if name in self._components:
+            return self._components[name]
+        with self._lock:
+            if name not in self._components:
+                try:
+                    self.ensure_loaded()
+                    # Loading may itself have provided the component
+                    if name not in self._components:
+                        self._components[name] = factory()
+                except Exception as e:
+                    print(f"Warning: Could not initialize {name}: {e}")
+                    self.errors[name] = str(e)
+                    self._components[name] = None
+            return self._components[name]
+
+    @property
+    def chief_of_staff(self) -> Optional[AICChiefOfStaff]:
+        """AI Chief of Staff sharing this state's data loader."""
+        return self._component("chief_of_staff", lambda: AICChiefOfStaff(
+            json_file_path=self.json_file_path, data_loader=self.data_loader
+        ))
+
+    @property
+    def graph_analytics(self) -> Optional[GraphAnalytics]:
+        """Graph analytics over the loaded emails."""
+        return self._component("graph_analytics", lambda: GraphAnalytics(self.data_loader))
+
+    @property
+    def graph_db(self) -> Optional[GraphBackend]:
+        """Graph backend selected by graph_backend."""
+        def build():
+            if self.graph_backend == "memory":
+                # Serves the analytics graph rather than building a second copy
+                return AnalyticsGraphBackend(self.graph_analytics)
+            from src.neo4j_graph import Neo4jGraphDB
+            return Neo4jGraphDB()
+        return self._component("graph_db", build)
+
+    @property
+    def people_directory(self) -> Optional[PeopleDirectory]:
+        """Searchable directory of people."""
+        return self._component("people_directory", lambda: PeopleDirectory(self.data_loader))
+
+    @property
+    def ingestor(self) -> Optional[EmailIngestor]:
+        """
+        Ingestor appending new emails to this state.
+
+        The analytics graph (which is also the memory graph backend) folds
+        new emails in on every batch; with Neo4j they are queued for it.
+        """
+        def build():
+            graph_queue = None
+            if self.graph_backend != "memory":
+                graph_queue = GraphChangeQueue(lambda emails: self._require("graph_db").write_emails(emails))
+            return EmailIngestor(self.data_loader, refresh_graph=lambda: self.graph_analytics.refresh(),
+                                 graph_queue=graph_queue, journal=self.journal)
+        return self._component("ingestor", build)
+
+    def _require(self, name: str) -> Any:
+        component = getattr(self, name)
+        if component is None:
+            raise RuntimeError(f"{name} is not available: {self.errors.get(name)}")
+        return component
+
+    @property
+    def memory_agent(self) -> Optional[MemoryAgent]:
+        """Memory Agent."""
+        return self._component("memory_agent", lambda: MemoryAgent(self.data_loader))
+
+    @property
+    def critic_agent(self) -> Optional[CriticAgent]:
+        """Critic Agent."""
+        return self._component("critic_agent", lambda: CriticAgent(self.data_loader))
+
+    @property
+    def coordinator_agent(self) -> Optional[CoordinatorAgent]:
+        """Coordinator Agent, ranking by the shared graph analytics."""
+        return self._component("coordinator_agent", lambda: CoordinatorAgent(
+            self.data_loader, self.graph_analytics
+        ))
+
+    def memory_structures(self) -> List[Tuple[str, Any]]:
+        """
+        Named data structures held by the state, for size reports.
+
+        Records come first, so objects shared with later structures (such
+        as components referencing the loader) are attributed to them.
+        """
+        loader = self.data_loader
+        structures = [
+            ("loader.records", loader.emails),
+            ("loader.sender_index", loader.sender_index),
+            ("loader.receiver_index", loader.receiver_index),
+            ("loader.communication_counts", loader.communication_counts),
+        ]
+        analytics = self._components.get("graph_analytics")
+        if analytics is not None and loader.loaded:
+            analytics_state = analytics.export_state()
+            structures.append(("analytics.graph", analytics_state["graph"]))
+            structures.append(("analytics.cache", analytics_state["cache"]))
+        chief_of_staff = self._components.get("chief_of_staff")
+        if chief_of_staff is not None:
+            structures.append(("llm_cache", chief_of_staff.cache))
+            structures.append(("summary_store", chief_of_staff.summary_store))
+        coordinator_agent = self._components.get("coordinator_agent")
+        if coordinator_agent is not None:
+            structures.append(("topic_index", coordinator_agent.topic_index))
+        for name in ("people_directory", "memory_agent", "critic_agent", "coordinator_agent", "chief_of_staff"):
+            structures.append((name, self._components.get(name)))
+        return structures
+
+    def is_initialized(self, name: str) -> bool:
+        """Whether a component was built successfully, without building it."""
+        return self._components.get(name) is not None
+
+    def close(self):
+        """Release resources held by initialized components."""
+        ingestor = self._components.get("ingestor")
+        if ingestor is not None:
+            ingestor.close()
+        graph_db = self._components.get("graph_db")
+        if graph_db is not None:
+            graph_db.close()
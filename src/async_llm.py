@@ -0,0 +1,211 @@
+"""
+Asynchronous, concurrency-limited LLM client for batch workloads.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional, Union
+
+import openai
+
+from src.metrics import span
+
+# Errors worth retrying: throttling, transient server errors and network issues
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter for use inside an event loop."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (default: one second's worth of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available, then take them."""
+        # Requests larger than the bucket would never fit; let them drain it instead
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class AsyncLLMClient:
+    """
+    Run chat completions concurrently within a rate and concurrency budget.
+
+    The client owns a background event loop thread, so synchronous callers
+    (Flask workers, scripts) can submit batches with `run()` while every
+    batch shares one pooled HTTP client, one concurrency semaphore and the
+    same rate limiters.
+    """
+
+    def __init__(self, client: Any, model: str, max_concurrency: int = 8,
+                 requests_per_minute: float = 500, tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 20.0):
+        """
+        Initialize the async LLM client.
+
+        Args:
+            client: Async chat completions client (e.g. openai.AsyncOpenAI)
+            model: Model name
+            max_concurrency: Maximum completions in flight at once
+            requests_per_minute: Request rate limit
+            tokens_per_minute: Optional prompt+completion token rate limit
+            max_retries: Retries for throttled or transient failures
+            base_delay: Initial backoff delay in seconds
+            max_delay: Maximum backoff delay in seconds
+        """
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="async-llm", daemon=True)
+        self._thread.start()
+        self.run(self._init_limits())
+
+    async def _init_limits(self):
+        """Create loop-bound primitives on the client's own event loop."""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._request_bucket = TokenBucket(self.requests_per_minute / 60.0)
+        self._token_bucket = None
+        if self.tokens_per_minute:
+            self._token_bucket = TokenBucket(self.tokens_per_minute / 60.0,
+                                             capacity=self.tokens_per_minute)
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None, model: Optional[str] = None,
+                 fake: bool = False) -> "AsyncLLMClient":
+        """
+        Build a client configured from environment variables.
+
+        Uses a single httpx connection pool sized to LLM_MAX_CONCURRENCY and
+        rate limits from LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE.
+        """
+        max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+        model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+        if fake or os.getenv("LLM_PROVIDER", "openai").lower() == "fake":
+            from src.fake_llm import FakeAsyncOpenAI
+            client = FakeAsyncOpenAI()
+        else:
+            import httpx
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_concurrency,
+                                    max_keepalive_connections=max_concurrency),
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+            client = openai.AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"),
+                                        http_client=http_client, max_retries=0)
+
+        tokens_per_minute = os.getenv("LLM_TOKENS_PER_MINUTE")
+        return cls(
+            client,
+            model,
+            max_concurrency=max_concurrency,
+            requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", 500)),
+            tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None
+        )
+
+    def run(self, coro):
+        """Run a coroutine on the client's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Rough token estimate (4 characters per token) for rate limiting."""
+        return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                       max_tokens: int = 2000) -> str:
+        """
+        Run one chat completion with rate limiting and retries.
+
+        Args:
+            messages: Chat messages to send
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in the completion
+
+        Returns:
+            Completion text
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self._request_bucket.acquire()
+                if self._token_bucket:
+                    await self._token_bucket.acquire(self.estimate_tokens(messages, max_tokens))
+                try:
+                    with span("llm.async"):
+                        response = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens
+                        )
+                    return response.choices[0].message.content
+                except RETRYABLE_ERRORS:
+                    if attempt == self.max_retries:
+                        raise
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def complete_many(self, batch: List[List[Dict[str, str]]], temperature: float = 0.7,
+                            max_tokens: int = 2000) -> List[Union[str, Exception]]:
+        """
+        Run many chat completions concurrently.
+
+        Args:
+            batch: List of message lists, one per completion
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens per completion
+
+        Returns:
+            Completion text or the raised exception, in input order
+        """
+        return await asyncio.gather(
+            *(self.complete(messages, temperature, max_tokens) for messages in batch),
+            return_exceptions=True
+        )
+
+    def close(self):
+        """Close the HTTP client and stop the event loop thread."""
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            self.run(close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
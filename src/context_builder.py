@@ -0,0 +1,199 @@
+"""
+Token-budgeted prompt context assembly for AI Chief of Staff queries.
+"""
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to an approximate count
+    tiktoken = None
+
+# Lines that start quoted or forwarded material in replies
+_ORIGINAL_MESSAGE = re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}", re.IGNORECASE)
+_REPLY_HEADER = re.compile(r"^\s*On .{0,200}wrote:\s*$", re.IGNORECASE)
+_FORWARD_MARKER = re.compile(r"^\s*-{2,}.*Forwarded (by|message).*$", re.IGNORECASE)
+_HEADER_LINE = re.compile(r"^\s*(From|To|Cc|Bcc|Sent|Date|Subject):", re.IGNORECASE)
+_SIGNATURE = re.compile(r"^(--\s*|_{5,}|Sent from my .*)$")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "the a an and or of to in on for with from by is are was were be been what who "
+    "whom which how when where why does did do about this that these those it its "
+    "at as me my our we you your they their them".split()
+)
+
+
+def clean_body(body: str) -> str:
+    """
+    Strip quoted replies, forwarded headers and signatures from an email body.
+
+    Args:
+        body: Raw email body
+
+    Returns:
+        Body text with only the author's own content
+    """
+    lines = []
+    in_forward_header = False
+    seen_header = False
+    forward_lines = 0
+    for line in body.splitlines():
+        if _ORIGINAL_MESSAGE.match(line) or _REPLY_HEADER.match(line) or _SIGNATURE.match(line):
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        if _FORWARD_MARKER.match(line):
+            in_forward_header, seen_header, forward_lines = True, False, 0
+            continue
+        if in_forward_header:
+            # Skip the forwarded block's "X on <date>" line and header fields,
+            # which end at the first blank line after a header field
+            forward_lines += 1
+            if _HEADER_LINE.match(line):
+                seen_header = True
+                continue
+            if not line.strip():
+                if seen_header:
+                    in_forward_header = False
+                continue
+            if not seen_header and forward_lines <= 3:
+                continue
+            in_forward_header = False
+        lines.append(line.rstrip())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def extract_terms(text: str) -> List[str]:
+    """Lowercase content words of a text, without stopwords."""
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+class ContextBuilder:
+    """
+    Pack the most relevant email snippets into a token budget.
+
+    Candidate emails are cleaned, split into paragraphs and scored against
+    the query with a BM25-style weighting. Snippets are added best-first
+    until the budget is spent, then grouped back under their email headers.
+    """
+
+    def __init__(self, token_budget: int = 1500, model: Optional[str] = None,
+                 max_snippet_tokens: int = 300):
+        """
+        Initialize the context builder.
+
+        Args:
+            token_budget: Maximum tokens of email context
+            model: Model name used to pick the tokenizer
+            max_snippet_tokens: Longest single snippet; longer paragraphs are trimmed
+        """
+        self.token_budget = token_budget
+        self.max_snippet_tokens = max_snippet_tokens
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model or "gpt-4o-mini")
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+
+    @classmethod
+    def from_env(cls, model: Optional[str] = None) -> "ContextBuilder":
+        """Build a context builder configured from CONTEXT_TOKEN_BUDGET."""
+        return cls(token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500)), model=model)
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with tiktoken, or estimate them if it is unavailable."""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        # Roughly 4 characters per token for English text
+        return max(1, math.ceil(len(text) / 4)) if text else 0
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens, marking the cut with '...'."""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(text)[:max_tokens]) + "..."
+        return text[:max_tokens * 4] + "..."
+
+    @staticmethod
+    def _header(index: int, email: Dict[str, Any]) -> str:
+        return (f"\nEmail {index}:\n"
+                f"From: {email.get('sender', 'Unknown')}\n"
+                f"To: {', '.join(email.get('receiver', []))}\n"
+                f"Subject: {email.get('subject', 'No subject')}\n"
+                f"Date: {email.get('timestamp', 'Unknown')}\n")
+
+    def build(self, query: str, emails: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Assemble the email context for a query.
+
+        Args:
+            query: User query
+            emails: Candidate emails, best keyword matches first
+
+        Returns:
+            Tuple of (context text, emails that contributed to it)
+        """
+        query_terms = set(extract_terms(query))
+
+        snippets = []  # (email position, paragraph position, text, terms)
+        for position, email in enumerate(emails):
+            body = clean_body(email.get('body', ''))
+            paragraphs = [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]
+            if not paragraphs:
+                paragraphs = [""]
+            subject_terms = extract_terms(email.get('subject', ''))
+            for paragraph_index, paragraph in enumerate(paragraphs):
+                text = self.truncate(paragraph, self.max_snippet_tokens)
+                snippets.append((position, paragraph_index, text, extract_terms(text) + subject_terms))
+
+        if not snippets:
+            return "", []
+
+        # BM25 scoring of snippets against the query terms
+        document_frequency = Counter()
+        for *_, terms in snippets:
+            document_frequency.update(set(terms))
+        average_length = sum(len(terms) for *_, terms in snippets) / len(snippets) or 1.0
+        k1, b = 1.2, 0.75
+
+        def score(snippet) -> float:
+            position, _, _, terms = snippet
+            frequencies = Counter(terms)
+            total = 0.0
+            for term in query_terms:
+                tf = frequencies.get(term, 0)
+                if not tf:
+                    continue
+                idf = math.log(1 + (len(snippets) - document_frequency[term] + 0.5) /
+                               (document_frequency[term] + 0.5))
+                total += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(terms) / average_length))
+            # Earlier candidates are better keyword matches; use that as a tie-breaker
+            return total - position * 1e-6
+
+        selected: Dict[int, List[Tuple[int, str]]] = {}
+        used = 0
+        for snippet in sorted(snippets, key=score, reverse=True):
+            position, paragraph_index, text, _ = snippet
+            cost = self.count_tokens(text)
+            if position not in selected:
+                cost += self.count_tokens(self._header(len(selected) + 1, emails[position]))
+            if used + cost > self.token_budget:
+                continue
+            selected.setdefault(position, []).append((paragraph_index, text))
+            used += cost
+
+        context = ""
+        used_emails = []
+        for index, position in enumerate(sorted(selected), 1):
+            email = emails[position]
+            used_emails.append(email)
+            context += self._header(index, email)
+            body = "\n\n".join(text for _, text in sorted(selected[position]) if text)
+            context += f"Body: {body}\n"
+
+        return context, used_emails
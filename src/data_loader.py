@@ -1,12 +1,40 @@
 """
 Data loader for email data and organizational intelligence.
 """
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from datetime import datetime
 from email.utils import parsedate_to_datetime
 
+from src.metrics import span
+
+
+def get_email_id(email: Dict[str, Any]) -> str:
+    """
+    Get a stable identifier for an email.
+    
+    Uses the Message-ID when the record has one, otherwise a hash of the
+    sender, receivers, subject, timestamp and body.
+    """
+    if email.get('email_id'):
+        return email['email_id']
+    if email.get('message_id'):
+        email_id = email['message_id']
+    else:
+        digest = hashlib.sha1()
+        for part in (email.get('sender', ''), ','.join(email.get('receiver', [])),
+                     email.get('subject', ''), email.get('timestamp', ''), email.get('body', '')):
+            digest.update(str(part).encode('utf-8', errors='ignore'))
+            digest.update(b'\x00')
+        email_id = digest.hexdigest()
+    # Memoize on the record, like parsed_timestamp
+    email['email_id'] = email_id
+    return email_id
+
 
 class EmailDataLoader:
     """Load and manage email data from JSON files."""
@@ -21,6 +49,25 @@ class EmailDataLoader:
         self.json_file_path = json_file_path
         self.emails: List[Dict[str, Any]] = []
         self.loaded = False
+        # Bumped whenever the email store changes; caches key on it
+        self.data_version = 0
+        # Bumped only when the store is replaced (load or restore), not when
+        # emails are appended; consumers that fold appended emails into their
+        # own aggregates rebuild them when it changes
+        self.epoch = 0
+        # Lowercased address -> positions in self.emails
+        self.sender_index: Dict[str, List[int]] = {}
+        self.receiver_index: Dict[str, List[int]] = {}
+        # Sent plus received emails per address
+        self.communication_counts: Counter = Counter()
+        # Distinct addresses as written in the records
+        self.senders: set = set()
+        self.receivers: set = set()
+        # Ids of stored emails, built on the first append
+        self._email_ids: Optional[set] = None
+        # (earliest, latest) parsed timestamp, computed on first use
+        self._date_range: Optional[tuple] = None
+        self._append_lock = threading.Lock()
     
     def load(self) -> List[Dict[str, Any]]:
         """
@@ -35,31 +82,141 @@ class EmailDataLoader:
         if not os.path.exists(self.json_file_path):
             raise FileNotFoundError(f"Email data file not found: {self.json_file_path}")
         
-        with open(self.json_file_path, 'r', encoding='utf-8') as f:
-            self.emails = json.load(f)
+        with span("loader.load"):
+            with open(self.json_file_path, 'r', encoding='utf-8') as f:
+                self.emails = json.load(f)
+            
+            # Parse timestamps to datetime objects for easier querying
+            for email in self.emails:
+                self._parse_timestamp(email)
+            
+            self._build_indexes()
+        self._replaced()
+        return self.emails
+    
+    def _replaced(self):
+        """Mark the store as newly loaded or restored."""
+        self._email_ids = None
+        self._date_range = None
+        self.loaded = True
+        self.epoch += 1
+        self.data_version += 1
+    
+    @staticmethod
+    def _parse_timestamp(email: Dict[str, Any]):
+        if email.get('timestamp'):
+            try:
+                email['parsed_timestamp'] = parsedate_to_datetime(email['timestamp'])
+            except (ValueError, TypeError):
+                email['parsed_timestamp'] = None
+    
+    def _build_indexes(self):
+        """Build the sender and receiver indexes over self.emails."""
+        self.sender_index = {}
+        self.receiver_index = {}
+        self.communication_counts = Counter()
+        self.senders = set()
+        self.receivers = set()
+        for position, email in enumerate(self.emails):
+            self._index_email(position, email)
+    
+    def _index_email(self, position: int, email: Dict[str, Any]):
+        """Add one email to the sender and receiver indexes."""
+        sender = email.get('sender', '')
+        if sender:
+            self.sender_index.setdefault(sender.lower(), []).append(position)
+            self.communication_counts[sender] += 1
+            self.senders.add(sender)
+        receivers = [r for r in email.get('receiver', []) if r]
+        for receiver in dict.fromkeys(r.lower() for r in receivers):
+            self.receiver_index.setdefault(receiver, []).append(position)
+        self.communication_counts.update(receivers)
+        self.receivers.update(receivers)
+    
+    def append(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add emails to the store, updating indexes and aggregates in place.
+        
+        Each email is stored before it is indexed, so readers never find an
+        index position past the end of the store. Emails already stored
+        (same email id) are skipped. The data version is bumped once per
+        call that added anything.
+        
+        Args:
+            records: Email dictionaries in the JSON file's format
+        
+        Returns:
+            The emails that were added
+        """
+        self.load()
+        added = []
+        with self._append_lock:
+            if self._email_ids is None:
+                self._email_ids = {get_email_id(email) for email in self.emails}
+            for email in records:
+                email_id = get_email_id(email)
+                if email_id in self._email_ids:
+                    continue
+                self._email_ids.add(email_id)
+                self._parse_timestamp(email)
+                self.emails.append(email)
+                self._index_email(len(self.emails) - 1, email)
+                timestamp = email.get('parsed_timestamp')
+                if timestamp and self._date_range is not None:
+                    earliest, latest = self._date_range
+                    self._date_range = (min(earliest, timestamp) if earliest else timestamp,
+                                        max(latest, timestamp) if latest else timestamp)
+                added.append(email)
+            if added:
+                self.data_version += 1
+        return added
+    
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Get the loaded records and indexes for a warm-state snapshot.
         
-        # Parse timestamps to datetime objects for easier querying
+        Returns:
+            Dictionary accepted by restore_state()
+        """
+        self.load()
         for email in self.emails:
-            if email.get('timestamp'):
-                try:
-                    email['parsed_timestamp'] = parsedate_to_datetime(email['timestamp'])
-                except (ValueError, TypeError):
-                    email['parsed_timestamp'] = None
+            get_email_id(email)
+        return {
+            "emails": self.emails,
+            "sender_index": self.sender_index,
+            "receiver_index": self.receiver_index,
+            "communication_counts": self.communication_counts,
+            "senders": self.senders,
+            "receivers": self.receivers
+        }
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Restore records and indexes from a warm-state snapshot instead of
+        parsing the JSON file.
         
-        self.loaded = True
-        return self.emails
+        Args:
+            state: Dictionary produced by export_state()
+        """
+        self.emails = state["emails"]
+        self.sender_index = state["sender_index"]
+        self.receiver_index = state["receiver_index"]
+        self.communication_counts = state["communication_counts"]
+        self.senders = state["senders"]
+        self.receivers = state["receivers"]
+        self._replaced()
     
     def get_emails_by_sender(self, sender: str) -> List[Dict[str, Any]]:
         """Get all emails from a specific sender."""
         if not self.loaded:
             self.load()
-        return [e for e in self.emails if e.get('sender', '').lower() == sender.lower()]
+        return [self.emails[i] for i in self.sender_index.get(sender.lower(), [])]
     
     def get_emails_by_receiver(self, receiver: str) -> List[Dict[str, Any]]:
         """Get all emails to a specific receiver."""
         if not self.loaded:
             self.load()
-        return [e for e in self.emails if receiver.lower() in [r.lower() for r in e.get('receiver', [])]]
+        return [self.emails[i] for i in self.receiver_index.get(receiver.lower(), [])]
     
     def get_emails_by_keyword(self, keyword: str, search_fields: List[str] = None) -> List[Dict[str, Any]]:
         """
@@ -94,16 +251,41 @@ class EmailDataLoader:
         """Get list of all unique senders."""
         if not self.loaded:
             self.load()
-        return sorted(list(set(e.get('sender', '') for e in self.emails if e.get('sender'))))
+        with self._append_lock:
+            return sorted(self.senders)
     
     def get_all_receivers(self) -> List[str]:
         """Get list of all unique receivers."""
         if not self.loaded:
             self.load()
-        receivers = set()
-        for email in self.emails:
-            receivers.update(email.get('receiver', []))
-        return sorted(list(receivers))
+        with self._append_lock:
+            return sorted(self.receivers)
+    
+    def get_all_addresses(self) -> set:
+        """Lowercased addresses of everyone who sent or received email."""
+        if not self.loaded:
+            self.load()
+        with self._append_lock:
+            return self.sender_index.keys() | self.receiver_index.keys()
+    
+    def get_top_communicators(self, top_n: int = 10) -> List[Tuple[str, int]]:
+        """
+        Addresses with the most sent plus received emails.
+        
+        The aggregates change in place when emails are appended, so they
+        are read under the same lock as append().
+        """
+        if not self.loaded:
+            self.load()
+        with self._append_lock:
+            return self.communication_counts.most_common(top_n)
+    
+    def get_address_counts(self) -> Tuple[int, int]:
+        """Number of distinct (senders, receivers)."""
+        if not self.loaded:
+            self.load()
+        with self._append_lock:
+            return len(self.senders), len(self.receivers)
     
     def get_email_count(self) -> int:
         """Get total number of emails."""
@@ -116,8 +298,8 @@ class EmailDataLoader:
         if not self.loaded:
             self.load()
         
-        dates = [e.get('parsed_timestamp') for e in self.emails if e.get('parsed_timestamp')]
-        if not dates:
-            return None, None
-        
-        return min(dates), max(dates)
+        if self._date_range is None:
+            dates = [e.get('parsed_timestamp') for e in self.emails if e.get('parsed_timestamp')]
+            # Kept up to date by append() from here on
+            self._date_range = (min(dates), max(dates)) if dates else (None, None)
+        return self._date_range
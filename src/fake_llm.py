@@ -0,0 +1,82 @@
+"""
+Local stand-in for the OpenAI chat completions client.
+
+Mirrors the parts of the `openai.OpenAI` interface the project uses, so the
+API and CLI can run end-to-end without network access or an API key. Select
+it with LLM_PROVIDER=fake.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, List, Iterator
+
+
+class FakeChatCompletions:
+    """Deterministic replacement for `client.chat.completions`."""
+
+    def __init__(self, token_delay: float = 0.0):
+        self.token_delay = token_delay
+        self.calls: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _reply(messages: List[Dict[str, str]]) -> str:
+        """Build a canned reply that echoes the user's query."""
+        prompt = messages[-1]["content"] if messages else ""
+        query = prompt
+        for line in prompt.splitlines():
+            if line.startswith("User Query:"):
+                query = line[len("User Query:"):].strip()
+        return f"[fake response] You asked: {query}"
+
+    def _stream(self, content: str) -> Iterator[SimpleNamespace]:
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            token = word if i == 0 else " " + word
+            yield SimpleNamespace(choices=[
+                SimpleNamespace(delta=SimpleNamespace(content=token), finish_reason=None)
+            ])
+        yield SimpleNamespace(choices=[
+            SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")
+        ])
+
+    def create(self, model: str, messages: List[Dict[str, str]],
+               stream: bool = False, **kwargs):
+        """Return a completion (or chunk iterator when stream=True)."""
+        self.calls.append({"model": model, "messages": messages, "stream": stream, **kwargs})
+        content = self._reply(messages)
+        if stream:
+            return self._stream(content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                     finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=len(content.split()))
+        )
+
+
+class FakeOpenAI:
+    """Drop-in for `openai.OpenAI` that never leaves the process."""
+
+    def __init__(self, token_delay: float = 0.0, **kwargs):
+        self.chat = SimpleNamespace(completions=FakeChatCompletions(token_delay))
+
+
+class FakeAsyncChatCompletions(FakeChatCompletions):
+    """Async variant of FakeChatCompletions."""
+
+    async def create(self, model: str, messages: List[Dict[str, str]],
+                     stream: bool = False, **kwargs):
+        if self.token_delay:
+            await asyncio.sleep(self.token_delay)
+        return FakeChatCompletions.create(self, model, messages, stream=stream, **kwargs)
+
+
+class FakeAsyncOpenAI:
+    """Drop-in for `openai.AsyncOpenAI` that never leaves the process."""
+
+    def __init__(self, token_delay: float = 0.0, **kwargs):
+        self.chat = SimpleNamespace(completions=FakeAsyncChatCompletions(token_delay))
+
+    async def close(self):
+        pass
@@ -0,0 +1,614 @@
+"""
+Graph analytics over the communication network: influence, communities and bridges.
+"""
+import heapq
+import math
+import random
+import threading
+from array import array
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Callable, Iterator
+
+from src.data_loader import EmailDataLoader
+from src.graph_backend import GraphBackend, InMemoryGraphDB
+from src.metrics import span
+
+# Half-width of the square that precomputed layout coordinates fall into
+LAYOUT_EXTENT = 1000.0
+
+
+def _force_layout(node_count: int, edges: List[Tuple[int, int, float]],
+                  iterations: int = 50, seed: int = 42) -> List[Tuple[float, float]]:
+    """
+    Fruchterman-Reingold layout for a small graph.
+
+    Args:
+        node_count: Number of nodes, identified as 0..node_count-1
+        edges: (source, target, weight) tuples
+        iterations: Number of simulation steps
+        seed: Random seed for the initial positions
+
+    Returns:
+        List of (x, y) positions scaled to +/- LAYOUT_EXTENT
+    """
+    if node_count == 0:
+        return []
+    if node_count == 1:
+        return [(0.0, 0.0)]
+
+    rng = random.Random(seed)
+    positions = [[rng.uniform(-1, 1), rng.uniform(-1, 1)] for _ in range(node_count)]
+    k = math.sqrt(4.0 / node_count)
+    max_weight = max((w for _, _, w in edges), default=1.0)
+    temperature = 0.2
+
+    for _ in range(iterations):
+        displacement = [[0.0, 0.0] for _ in range(node_count)]
+        for i in range(node_count):
+            xi, yi = positions[i]
+            for j in range(i + 1, node_count):
+                dx = xi - positions[j][0]
+                dy = yi - positions[j][1]
+                distance = math.hypot(dx, dy) or 1e-6
+                force = k * k / distance
+                displacement[i][0] += dx / distance * force
+                displacement[i][1] += dy / distance * force
+                displacement[j][0] -= dx / distance * force
+                displacement[j][1] -= dy / distance * force
+        for source, target, weight in edges:
+            if source == target:
+                continue
+            dx = positions[source][0] - positions[target][0]
+            dy = positions[source][1] - positions[target][1]
+            distance = math.hypot(dx, dy) or 1e-6
+            force = distance * distance / k * (0.5 + weight / max_weight)
+            displacement[source][0] -= dx / distance * force
+            displacement[source][1] -= dy / distance * force
+            displacement[target][0] += dx / distance * force
+            displacement[target][1] += dy / distance * force
+        for i in range(node_count):
+            dx, dy = displacement[i]
+            length = math.hypot(dx, dy)
+            if length > 0:
+                step = min(length, temperature)
+                positions[i][0] += dx / length * step
+                positions[i][1] += dy / length * step
+        temperature *= 0.95
+
+    extent = max(max(abs(x), abs(y)) for x, y in positions) or 1.0
+    scale = LAYOUT_EXTENT / extent
+    return [(round(x * scale, 1), round(y * scale, 1)) for x, y in positions]
+
+
+class GraphAnalytics:
+    """
+    Compute network-level metrics from the communication graph.
+
+    The graph is held as edge arrays (sender id, receiver id, message count),
+    i.e. a sparse weighted adjacency matrix in coordinate form, and every
+    algorithm iterates over those arrays rather than over email records.
+    Results are cached until the data loader's data version changes.
+
+    New emails are folded into a copy of the graph, which is then published
+    together with an empty result cache by swapping one reference. Readers
+    keep the graph and cache they started with for the whole call, including
+    nested calls (an overview reads communities and PageRank), so ingestion
+    never changes a graph while it is being read.
+    """
+
+    def __init__(self, data_loader: EmailDataLoader, seed: int = 42):
+        """
+        Initialize graph analytics.
+
+        Args:
+            data_loader: EmailDataLoader instance
+            seed: Random seed for sampling and tie-breaking
+        """
+        self.data_loader = data_loader
+        self.seed = seed
+        # Published (graph, result cache), replaced as a whole
+        self._snapshot: Tuple[InMemoryGraphDB, Dict[Any, Any]] = (None, {})
+        self._version = None
+        # Loader epoch the graph was built for and emails folded into it
+        self._epoch = None
+        self._folded = 0
+        self._lock = threading.Lock()
+        # Snapshot pinned by the call running on each thread
+        self._local = threading.local()
+
+    @property
+    def graph(self) -> InMemoryGraphDB:
+        """Communication graph for the current data version (do not modify it)."""
+        with self._pinned() as (graph, _):
+            return graph
+
+    @contextmanager
+    def _pinned(self) -> Iterator[Tuple[InMemoryGraphDB, Dict[Any, Any]]]:
+        """
+        The graph and result cache of one data version, used by every
+        nested call on this thread until the outermost call returns.
+        """
+        snapshot = getattr(self._local, "snapshot", None)
+        if snapshot is not None:
+            yield snapshot
+            return
+        self._sync()
+        snapshot = self._snapshot
+        self._local.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._local.snapshot = None
+
+    def _sync(self):
+        """
+        Bring the graph up to date and drop cached results if the data changed.
+
+        Emails appended to the loader since the last sync are added to the
+        existing graph; the graph is only rebuilt when the store was replaced.
+        """
+        emails = self.data_loader.load()
+        if self._snapshot[0] is not None and self._version == self.data_loader.data_version:
+            return
+        with self._lock:
+            version = self.data_loader.data_version
+            graph = self._snapshot[0]
+            if graph is not None and self._version == version:
+                return
+            end = len(emails)
+            if graph is None or self._epoch != self.data_loader.epoch:
+                with span("analytics.graph_build"):
+                    graph = InMemoryGraphDB.from_emails(emails[:end])
+            else:
+                # Readers of the published graph are not affected
+                with span("analytics.graph_update"):
+                    graph = graph.copy()
+                    graph.load_emails(emails[self._folded:end])
+            self._snapshot = (graph, {})
+            self._epoch = self.data_loader.epoch
+            self._folded = end
+            self._version = version
+
+    def refresh(self):
+        """Fold emails appended to the loader into the graph now rather than on next use."""
+        self._sync()
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Get the graph and cached results for a warm-state snapshot.
+
+        Returns:
+            Dictionary accepted by restore_state()
+        """
+        self._sync()
+        graph, cache = self._snapshot
+        return {"graph": graph, "cache": cache}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Restore the graph and cached results from a warm-state snapshot.
+
+        Must be called after the data loader was restored from the same
+        snapshot, so the results belong to its current data version.
+
+        Args:
+            state: Dictionary produced by export_state()
+        """
+        self._snapshot = (state["graph"], state["cache"])
+        self._epoch = self.data_loader.epoch
+        self._folded = len(self.data_loader.emails)
+        self._version = self.data_loader.data_version
+
+    def _cached(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Return a cached result for the current data version, computing it once."""
+        with self._pinned() as (_, cache):
+            if key not in cache:
+                with span(f"analytics.{key[0] if isinstance(key, tuple) else key}"):
+                    cache[key] = compute()
+            return cache[key]
+
+    def _undirected_weights(self) -> List[Dict[int, int]]:
+        """Per-node neighbour weights with edge direction ignored."""
+        def compute():
+            graph = self.graph
+            weights = [defaultdict(int) for _ in graph.people]
+            for source, target, count in zip(graph.edge_source, graph.edge_target,
+                                             graph.edge_count):
+                if source != target:
+                    weights[source][target] += count
+                    weights[target][source] += count
+            return [dict(w) for w in weights]
+        return self._cached("undirected_weights", compute)
+
+    def get_pagerank(self, damping: float = 0.85, max_iter: int = 100,
+                     tol: float = 1e-8) -> Dict[str, float]:
+        """
+        Weighted PageRank, where edge weight is the number of emails sent.
+
+        Args:
+            damping: Probability of following an edge rather than teleporting
+            max_iter: Maximum number of power iterations
+            tol: L1 convergence threshold
+
+        Returns:
+            Dictionary mapping person -> PageRank score (scores sum to 1)
+        """
+        def compute():
+            graph = self.graph
+            n = len(graph.people)
+            if n == 0:
+                return {}
+
+            out_weight = array('d', [0.0] * n)
+            for source, count in zip(graph.edge_source, graph.edge_count):
+                out_weight[source] += count
+            # Column-normalized transition weight of every edge
+            coefficients = array('d', (count / out_weight[source] for source, count
+                                       in zip(graph.edge_source, graph.edge_count)))
+            dangling = [i for i in range(n) if out_weight[i] == 0]
+
+            rank = array('d', [1.0 / n] * n)
+            for _ in range(max_iter):
+                dangling_mass = sum(rank[i] for i in dangling)
+                base = (1.0 - damping) / n + damping * dangling_mass / n
+                new_rank = array('d', [base] * n)
+                for source, target, coefficient in zip(graph.edge_source, graph.edge_target,
+                                                       coefficients):
+                    new_rank[target] += damping * rank[source] * coefficient
+                delta = sum(abs(a - b) for a, b in zip(new_rank, rank))
+                rank = new_rank
+                if delta < tol:
+                    break
+
+            return {graph.people[i]: rank[i] for i in range(n)}
+        return self._cached(("pagerank", damping, max_iter, tol), compute)
+
+    def get_top_influencers(self, top_n: int = 10) -> List[Tuple[str, float]]:
+        """
+        Get the most influential people by weighted PageRank.
+
+        Args:
+            top_n: Number of people to return
+
+        Returns:
+            List of (email, score) tuples
+        """
+        pagerank = self.get_pagerank()
+        return heapq.nlargest(top_n, pagerank.items(), key=lambda item: item[1])
+
+    def get_betweenness(self, samples: int = 100) -> Dict[str, float]:
+        """
+        Approximate betweenness centrality by sampling source nodes.
+
+        Runs Brandes' accumulation from `samples` random sources over the
+        directed, unweighted graph and rescales by n / samples.
+
+        Args:
+            samples: Number of source nodes to sample
+
+        Returns:
+            Dictionary mapping person -> estimated betweenness
+        """
+        def compute():
+            graph = self.graph
+            n = len(graph.people)
+            if n == 0:
+                return {}
+
+            successors = [[graph.edge_target[e] for e in graph.out_edges(v)]
+                          for v in range(n)]
+            sources = list(range(n))
+            if samples < n:
+                sources = random.Random(self.seed).sample(sources, samples)
+
+            betweenness = [0.0] * n
+            for source in sources:
+                order = []
+                predecessors = defaultdict(list)
+                paths = defaultdict(int)
+                paths[source] = 1
+                distance = {source: 0}
+                queue = deque([source])
+                while queue:
+                    v = queue.popleft()
+                    order.append(v)
+                    for w in successors[v]:
+                        if w not in distance:
+                            distance[w] = distance[v] + 1
+                            queue.append(w)
+                        if distance[w] == distance[v] + 1:
+                            paths[w] += paths[v]
+                            predecessors[w].append(v)
+
+                dependency = defaultdict(float)
+                for w in reversed(order):
+                    for v in predecessors[w]:
+                        dependency[v] += paths[v] / paths[w] * (1.0 + dependency[w])
+                    if w != source:
+                        betweenness[w] += dependency[w]
+
+            scale = n / len(sources)
+            return {graph.people[i]: betweenness[i] * scale for i in range(n)}
+        return self._cached(("betweenness", samples), compute)
+
+    def get_communities(self, max_iter: int = 20) -> Dict[str, int]:
+        """
+        Detect communities with weighted label propagation.
+
+        Each person repeatedly adopts the label carrying the most email
+        volume among their correspondents until labels stop changing.
+        Community ids are numbered by size, largest first.
+
+        Args:
+            max_iter: Maximum number of propagation rounds
+
+        Returns:
+            Dictionary mapping person -> community id
+        """
+        def compute():
+            graph = self.graph
+            n = len(graph.people)
+            neighbours = self._undirected_weights()
+            labels = list(range(n))
+            rng = random.Random(self.seed)
+            order = list(range(n))
+
+            for _ in range(max_iter):
+                rng.shuffle(order)
+                changed = 0
+                for v in order:
+                    if not neighbours[v]:
+                        continue
+                    scores = defaultdict(int)
+                    for w, weight in neighbours[v].items():
+                        scores[labels[w]] += weight
+                    best = max(scores.values())
+                    candidates = [label for label, score in scores.items() if score == best]
+                    if labels[v] in candidates:
+                        continue
+                    labels[v] = min(candidates)
+                    changed += 1
+                if changed == 0:
+                    break
+
+            sizes = defaultdict(int)
+            for label in labels:
+                sizes[label] += 1
+            renumber = {label: i for i, (label, _) in enumerate(
+                sorted(sizes.items(), key=lambda item: (-item[1], item[0])))}
+            return {graph.people[v]: renumber[labels[v]] for v in range(n)}
+        return self._cached(("communities", max_iter), compute)
+
+    def get_community_summary(self, top_n: int = 10,
+                              members_per_community: int = 5) -> Dict[str, Any]:
+        """
+        Summarize the largest communities and their most influential members.
+
+        Args:
+            top_n: Number of communities to describe
+            members_per_community: Number of members to list per community
+
+        Returns:
+            Dictionary with community count and per-community details
+        """
+        with self._pinned():
+            communities = self.get_communities()
+            pagerank = self.get_pagerank()
+
+        members = defaultdict(list)
+        for person, community in communities.items():
+            members[community].append(person)
+
+        summary = []
+        for community in sorted(members)[:top_n]:
+            people = members[community]
+            top_members = heapq.nlargest(members_per_community, people,
+                                         key=lambda p: pagerank.get(p, 0.0))
+            summary.append({
+                "id": community,
+                "size": len(people),
+                "influence": sum(pagerank.get(p, 0.0) for p in people),
+                "top_members": [{"email": p, "influence": pagerank.get(p, 0.0)}
+                                for p in top_members]
+            })
+
+        return {"total_communities": len(members), "communities": summary}
+
+    def get_bridges(self, top_n: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find people who connect otherwise separate communities.
+
+        A bridge talks to members of more than one community; bridges are
+        ranked by approximate betweenness.
+
+        Args:
+            top_n: Number of bridges to return
+
+        Returns:
+            List of bridge dictionaries
+        """
+        with self._pinned() as (graph, _):
+            communities = self.get_communities()
+            betweenness = self.get_betweenness()
+            neighbours = self._undirected_weights()
+
+        bridges = []
+        for v, person in enumerate(graph.people):
+            reached = {communities[graph.people[w]] for w in neighbours[v]}
+            reached.add(communities[person])
+            if len(reached) > 1:
+                bridges.append({
+                    "email": person,
+                    "community": communities[person],
+                    "communities_connected": len(reached),
+                    "betweenness": betweenness.get(person, 0.0)
+                })
+
+        return heapq.nlargest(top_n, bridges, key=lambda b: b["betweenness"])
+
+    def get_graph_overview(self, limit: int = 50) -> Dict[str, Any]:
+        """
+        Community-collapsed view of the network for low zoom levels.
+
+        Each of the `limit` largest communities becomes one super-node with
+        a precomputed position, so the client can render without running a
+        physics simulation. The payload is columnar: node attributes and
+        edge endpoints are parallel arrays indexed by integer ids.
+
+        Args:
+            limit: Maximum number of communities to return
+
+        Returns:
+            Dictionary with columnar "nodes" and "edges" and the number of
+            communities left out
+        """
+        return self._cached(("overview", limit), lambda: self._build_overview(limit))
+
+    def _build_overview(self, limit: int) -> Dict[str, Any]:
+        communities = self.get_communities()
+        pagerank = self.get_pagerank()
+        graph = self.graph
+
+        sizes = defaultdict(int)
+        leaders = {}
+        for person, community in communities.items():
+            sizes[community] += 1
+            if pagerank.get(person, 0.0) > pagerank.get(leaders.get(community), -1.0):
+                leaders[community] = person
+        shown = sorted(sizes)[:limit]
+        shown_set = set(shown)
+
+        weights = defaultdict(int)
+        for source, target, count in zip(graph.edge_source, graph.edge_target,
+                                         graph.edge_count):
+            a = communities[graph.people[source]]
+            b = communities[graph.people[target]]
+            if a != b and a in shown_set and b in shown_set:
+                weights[(a, b)] += count
+
+        position = {community: i for i, community in enumerate(shown)}
+        layout = _force_layout(
+            len(shown),
+            [(position[a], position[b], w) for (a, b), w in weights.items()],
+            seed=self.seed
+        )
+
+        return {
+            "level": "communities",
+            "nodes": {
+                "id": shown,
+                "label": [leaders[c].split('@')[0] for c in shown],
+                "size": [sizes[c] for c in shown],
+                "x": [x for x, _ in layout],
+                "y": [y for _, y in layout]
+            },
+            "edges": {
+                "from": [a for a, _ in weights],
+                "to": [b for _, b in weights],
+                "weight": list(weights.values())
+            },
+            "hidden_communities": len(sizes) - len(shown)
+        }
+
+    def expand_community(self, community: int, limit: int = 200,
+                         overview_limit: int = 50) -> Dict[str, Any]:
+        """
+        Expand one community super-node into its members.
+
+        Members are placed on concentric rings around the community's
+        overview position, most influential first, and only the `limit`
+        most influential members are returned.
+
+        Args:
+            community: Community id from get_graph_overview
+            limit: Maximum number of members to return
+            overview_limit: The `limit` of the overview the community was
+                picked from, whose layout gives the center position
+
+        Returns:
+            Columnar nodes and edges for the community's members
+        """
+        return self._cached(("expand", community, limit, overview_limit),
+                            lambda: self._build_expansion(community, limit, overview_limit))
+
+    def _build_expansion(self, community: int, limit: int, overview_limit: int) -> Dict[str, Any]:
+        communities = self.get_communities()
+        pagerank = self.get_pagerank()
+        graph = self.graph
+
+        overview = self.get_graph_overview(overview_limit)
+        center_x, center_y = 0.0, 0.0
+        if community in overview["nodes"]["id"]:
+            i = overview["nodes"]["id"].index(community)
+            center_x, center_y = overview["nodes"]["x"][i], overview["nodes"]["y"][i]
+
+        members = [graph.person_ids[p] for p, c in communities.items() if c == community]
+        members = heapq.nlargest(limit, members,
+                                 key=lambda v: pagerank.get(graph.people[v], 0.0))
+
+        xs, ys = [], []
+        ring, slot, ring_size = 0, 0, 1
+        for _ in members:
+            radius = ring * 60.0
+            angle = 2 * math.pi * slot / ring_size
+            xs.append(round(center_x + radius * math.cos(angle), 1))
+            ys.append(round(center_y + radius * math.sin(angle), 1))
+            slot += 1
+            if slot == ring_size:
+                ring += 1
+                slot, ring_size = 0, 6 * ring
+
+        edge_ids = graph.edges_between(members)
+        return {
+            "level": "people",
+            "community": community,
+            "nodes": {
+                "id": members,
+                "label": [graph.people[v] for v in members],
+                "influence": [pagerank.get(graph.people[v], 0.0) for v in members],
+                "x": xs,
+                "y": ys
+            },
+            "edges": {
+                "from": [graph.edge_source[e] for e in edge_ids],
+                "to": [graph.edge_target[e] for e in edge_ids],
+                "weight": [graph.edge_count[e] for e in edge_ids]
+            }
+        }
+
+
+class AnalyticsGraphBackend(GraphBackend):
+    """
+    Memory graph backend reading the analytics graph.
+
+    Every call goes to the graph published for the current data version,
+    so the backend follows ingested emails without holding a graph of its
+    own.
+    """
+
+    def __init__(self, analytics: GraphAnalytics):
+        """
+        Initialize the backend.
+
+        Args:
+            analytics: GraphAnalytics whose graph is served
+        """
+        self.analytics = analytics
+
+    def load_emails(self, emails: List[Dict[str, Any]]):
+        """Append emails to the analytics' loader and fold them into the graph."""
+        self.analytics.data_loader.append(emails)
+        self.analytics.refresh()
+
+    def get_graph_data(self, limit: int = 100) -> Dict[str, Any]:
+        """Get the most connected people and the edges between them."""
+        return self.analytics.graph.get_graph_data(limit)
+
+    def get_person_network(self, email: str, depth: int = 2) -> Dict[str, Any]:
+        """Get everyone within `depth` hops of a person, ignoring direction."""
+        return self.analytics.graph.get_person_network(email, depth)
+
+    def get_top_relationships(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the directed pairs with the most communications."""
+        return self.analytics.graph.get_top_relationships(limit)
@@ -0,0 +1,319 @@
+"""
+Graph backends for the communication network visualization.
+
+`GraphBackend` is the interface the API talks to. `Neo4jGraphDB` implements it
+on top of a Neo4j/AuraDB instance; `InMemoryGraphDB` implements it in-process
+from the loaded emails, for deployments without a graph database and as a
+local stand-in for tests and benchmarks.
+"""
+import heapq
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.metrics import timed
+
+# Number of distinct recent subjects kept on each communication edge
+RECENT_SUBJECTS_LIMIT = 3
+
+
+class GraphBackend(ABC):
+    """Interface shared by all communication graph stores."""
+
+    @abstractmethod
+    def load_emails(self, emails: List[Dict[str, Any]]):
+        """
+        Load email data into the graph.
+
+        Args:
+            emails: List of email dictionaries
+        """
+
+    @abstractmethod
+    def get_graph_data(self, limit: int = 100) -> Dict[str, Any]:
+        """
+        Get graph data for visualization.
+
+        Args:
+            limit: Maximum number of nodes to return
+
+        Returns:
+            Dictionary with nodes and edges for visualization
+        """
+
+    @abstractmethod
+    def get_person_network(self, email: str, depth: int = 2) -> Dict[str, Any]:
+        """
+        Get communication network for a specific person.
+
+        Args:
+            email: Person's email address
+            depth: Network depth to explore
+
+        Returns:
+            Dictionary with nodes and edges
+        """
+
+    @abstractmethod
+    def get_top_relationships(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Get top communication relationships.
+
+        Args:
+            limit: Number of top relationships to return
+
+        Returns:
+            List of relationship dictionaries
+        """
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class InMemoryGraphDB(GraphBackend):
+    """
+    In-process communication graph backed by adjacency arrays.
+
+    People are interned to integer ids and every directed sender -> receiver
+    pair is stored once as an edge with the same properties Neo4j keeps on
+    COMMUNICATED_WITH relationships. Compressed adjacency arrays (CSR) are
+    rebuilt lazily after loads, so reads never touch the network.
+    """
+
+    def __init__(self):
+        self.people: List[str] = []
+        self.person_ids: Dict[str, int] = {}
+
+        # Edge storage, indexed by edge id
+        self.edge_ids: Dict[Tuple[int, int], int] = {}
+        self.edge_source = array('l')
+        self.edge_target = array('l')
+        self.edge_count = array('l')
+        self.edge_subject_count = array('l')
+        self.edge_recent_subjects: List[deque] = []
+        self.edge_first_date: List[str] = []
+        self.edge_last_date: List[str] = []
+
+        self._adjacency_dirty = True
+        self._out_offsets = array('l')
+        self._out_edges = array('l')
+        self._in_offsets = array('l')
+        self._in_edges = array('l')
+
+    @classmethod
+    def from_emails(cls, emails: List[Dict[str, Any]]) -> "InMemoryGraphDB":
+        """Build an in-memory graph from a list of email dictionaries."""
+        graph = cls()
+        graph.load_emails(emails)
+        return graph
+
+    def copy(self) -> "InMemoryGraphDB":
+        """
+        A copy to load new emails into while readers keep using this graph.
+
+        Node and edge storage is copied; the adjacency arrays and the
+        recent-subject deques are shared, since they are replaced rather
+        than changed.
+        """
+        graph = InMemoryGraphDB.__new__(InMemoryGraphDB)
+        graph.__dict__.update(self.__dict__)
+        graph.people = list(self.people)
+        graph.person_ids = dict(self.person_ids)
+        graph.edge_ids = dict(self.edge_ids)
+        graph.edge_source = array('l', self.edge_source)
+        graph.edge_target = array('l', self.edge_target)
+        graph.edge_count = array('l', self.edge_count)
+        graph.edge_subject_count = array('l', self.edge_subject_count)
+        graph.edge_recent_subjects = list(self.edge_recent_subjects)
+        graph.edge_first_date = list(self.edge_first_date)
+        graph.edge_last_date = list(self.edge_last_date)
+        return graph
+
+    def _person_id(self, email: str) -> int:
+        """Intern an email address to an integer node id."""
+        person_id = self.person_ids.get(email)
+        if person_id is None:
+            person_id = len(self.people)
+            self.person_ids[email] = person_id
+            self.people.append(email)
+            self._adjacency_dirty = True
+        return person_id
+
+    def create_person(self, email: str, name: Optional[str] = None):
+        """Create a person node if it does not exist yet."""
+        self._person_id(email)
+
+    def create_communication(self, sender: str, receiver: str,
+                             subject: Optional[str] = None,
+                             timestamp: Optional[str] = None,
+                             email_id: Optional[str] = None):
+        """Record one communication from sender to receiver."""
+        source = self._person_id(sender)
+        target = self._person_id(receiver)
+        subject = subject or ""
+        timestamp = timestamp or ""
+
+        edge_id = self.edge_ids.get((source, target))
+        if edge_id is None:
+            edge_id = len(self.edge_source)
+            self.edge_ids[(source, target)] = edge_id
+            self.edge_source.append(source)
+            self.edge_target.append(target)
+            self.edge_count.append(0)
+            self.edge_subject_count.append(0)
+            self.edge_recent_subjects.append(deque(maxlen=RECENT_SUBJECTS_LIMIT))
+            self.edge_first_date.append(timestamp)
+            self.edge_last_date.append(timestamp)
+            self._adjacency_dirty = True
+
+        self.edge_count[edge_id] += 1
+        self.edge_last_date[edge_id] = timestamp
+        if subject:
+            self.edge_subject_count[edge_id] += 1
+            recent = self.edge_recent_subjects[edge_id]
+            if subject not in recent:
+                # Replaced rather than changed, as copies share the deques
+                recent = deque(recent, maxlen=RECENT_SUBJECTS_LIMIT)
+                recent.appendleft(subject)
+                self.edge_recent_subjects[edge_id] = recent
+
+    @timed("memory_graph.load_emails")
+    def load_emails(self, emails: List[Dict[str, Any]]):
+        """
+        Load email data into the in-memory graph.
+
+        Args:
+            emails: List of email dictionaries
+        """
+        for i, email in enumerate(emails):
+            sender = email.get('sender', '').strip()
+            if not sender:
+                continue
+
+            self.create_person(sender)
+
+            for receiver in email.get('receiver', []):
+                if receiver and receiver.strip():
+                    self.create_communication(
+                        sender=sender,
+                        receiver=receiver.strip(),
+                        subject=email.get('subject', ''),
+                        timestamp=email.get('timestamp', ''),
+                        email_id=f"email_{i}"
+                    )
+
+    def _build_csr(self, keys: array) -> Tuple[array, array]:
+        """Build CSR offsets and edge ids grouped by the given endpoint array."""
+        node_count = len(self.people)
+        offsets = array('l', [0] * (node_count + 1))
+        for node in keys:
+            offsets[node + 1] += 1
+        for i in range(node_count):
+            offsets[i + 1] += offsets[i]
+
+        cursor = array('l', offsets[:-1])
+        edges = array('l', [0] * len(keys))
+        for edge_id, node in enumerate(keys):
+            edges[cursor[node]] = edge_id
+            cursor[node] += 1
+        return offsets, edges
+
+    def _ensure_adjacency(self):
+        """Rebuild the compressed adjacency arrays if the graph changed."""
+        if not self._adjacency_dirty:
+            return
+        self._out_offsets, self._out_edges = self._build_csr(self.edge_source)
+        self._in_offsets, self._in_edges = self._build_csr(self.edge_target)
+        self._adjacency_dirty = False
+
+    def build_adjacency(self):
+        """Build the compressed adjacency arrays now rather than on first read."""
+        self._ensure_adjacency()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pickled graphs (warm-state snapshots) carry ready-built adjacency
+        self._ensure_adjacency()
+        return self.__dict__
+
+    def out_edges(self, node: int) -> array:
+        """Edge ids leaving a node."""
+        self._ensure_adjacency()
+        return self._out_edges[self._out_offsets[node]:self._out_offsets[node + 1]]
+
+    def in_edges(self, node: int) -> array:
+        """Edge ids entering a node."""
+        self._ensure_adjacency()
+        return self._in_edges[self._in_offsets[node]:self._in_offsets[node + 1]]
+
+    def degree(self, node: int) -> int:
+        """Number of distinct relationships touching a node (in + out)."""
+        self._ensure_adjacency()
+        return (self._out_offsets[node + 1] - self._out_offsets[node] +
+                self._in_offsets[node + 1] - self._in_offsets[node])
+
+    def edges_between(self, nodes: List[int]) -> List[int]:
+        """Edge ids whose endpoints are both in the given node set."""
+        selected = set(nodes)
+        return [edge_id for node in nodes for edge_id in self.out_edges(node)
+                if self.edge_target[edge_id] in selected]
+
+    @timed("memory_graph.get_graph_data")
+    def get_graph_data(self, limit: int = 100) -> Dict[str, Any]:
+        """Get the most connected people and the edges between them."""
+        self._ensure_adjacency()
+        ranked = heapq.nlargest(limit, range(len(self.people)), key=self.degree)
+        if not ranked:
+            return {"nodes": [], "edges": []}
+
+        nodes = [{"id": self.people[n], "label": self.people[n],
+                  "value": self.degree(n)} for n in ranked]
+
+        edge_ids = sorted(self.edges_between(ranked),
+                          key=lambda e: self.edge_count[e], reverse=True)
+        edges = [{"from": self.people[self.edge_source[e]],
+                  "to": self.people[self.edge_target[e]],
+                  "value": self.edge_count[e],
+                  "last_date": self.edge_last_date[e]} for e in edge_ids]
+
+        return {"nodes": nodes, "edges": edges}
+
+    @timed("memory_graph.get_person_network")
+    def get_person_network(self, email: str, depth: int = 2) -> Dict[str, Any]:
+        """Get everyone within `depth` hops of a person, ignoring direction."""
+        start = self.person_ids.get(email)
+        if start is None:
+            return {"nodes": [], "edges": []}
+
+        seen = {start}
+        frontier = [start]
+        for _ in range(depth):
+            next_frontier = []
+            for node in frontier:
+                neighbours = ([self.edge_target[e] for e in self.out_edges(node)] +
+                              [self.edge_source[e] for e in self.in_edges(node)])
+                for neighbour in neighbours:
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+        members = list(seen)
+        nodes = [{"id": self.people[n], "label": self.people[n]} for n in members]
+        edges = [{"from": self.people[self.edge_source[e]],
+                  "to": self.people[self.edge_target[e]],
+                  "value": self.edge_count[e]} for e in self.edges_between(members)]
+
+        return {"nodes": nodes, "edges": edges}
+
+    @timed("memory_graph.get_top_relationships")
+    def get_top_relationships(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the directed pairs with the most communications."""
+        top = heapq.nlargest(limit, range(len(self.edge_count)),
+                             key=self.edge_count.__getitem__)
+        return [{"sender": self.people[self.edge_source[e]],
+                 "receiver": self.people[self.edge_target[e]],
+                 "count": self.edge_count[e],
+                 "subjects": list(self.edge_recent_subjects[e]),
+                 "subject_count": self.edge_subject_count[e],
+                 "last_date": self.edge_last_date[e]} for e in top]
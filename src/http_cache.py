@@ -0,0 +1,158 @@
+"""
+HTTP response caching for read-only API endpoints.
+
+Responses are cached per endpoint path, query arguments and data version,
+together with an ETag and pre-compressed bodies. A repeat request is answered
+from the cache without calling the view, or with 304 Not Modified when the
+client already holds the same ETag.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized JSON responses."""
+
+    def __init__(self, max_entries: int = 256, max_age: int = 60, compress_min_bytes: int = 1024):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries: Maximum cached responses (0 disables caching)
+            max_age: Seconds clients may reuse a response without revalidating
+            compress_min_bytes: Only compress bodies at least this large
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.compress_min_bytes = compress_min_bytes
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache configured from HTTP_CACHE_SIZE and HTTP_CACHE_MAX_AGE."""
+        return cls(
+            max_entries=int(os.getenv("HTTP_CACHE_SIZE", 256)),
+            max_age=int(os.getenv("HTTP_CACHE_MAX_AGE", 60))
+        )
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Get a cached entry, marking it recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, body: bytes) -> Dict[str, Any]:
+        """
+        Cache a JSON body with its ETag and compressed variants.
+
+        Returns:
+            The cached entry
+        """
+        entry = {
+            "etag": hashlib.sha1(body).hexdigest()[:20],
+            "bodies": {"identity": body}
+        }
+        if len(body) >= self.compress_min_bytes:
+            entry["bodies"]["gzip"] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                entry["bodies"]["br"] = brotli.compress(body, quality=5)
+
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics."""
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
+
+    def respond(self, entry: Dict[str, Any]) -> Response:
+        """Build the response for the current request from a cached entry."""
+        headers = {
+            "ETag": f'"{entry["etag"]}"',
+            "Cache-Control": f"private, max-age={self.max_age}, must-revalidate",
+            "Vary": "Accept-Encoding"
+        }
+        if entry["etag"] in request.if_none_match:
+            self.not_modified += 1
+            return Response(status=304, headers=headers)
+
+        bodies = entry["bodies"]
+        encoding = request.accept_encodings.best_match(
+            [e for e in ("br", "gzip") if e in bodies]
+        ) if len(bodies) > 1 else None
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(bodies[encoding or "identity"], mimetype="application/json", headers=headers)
+
+
+def cached_response(cache: ResponseCache, data_version: Callable[[], Any],
+                    enabled: Optional[Callable[[], bool]] = None):
+    """
+    Decorator caching a read-only JSON view.
+
+    Only successful responses whose body is not an error object are cached.
+
+    Args:
+        cache: Response cache to use
+        data_version: Returns the current data version; part of the cache key
+        enabled: Returns False when the view's data can change without a new
+            data version; the view is then served uncached (None always caches)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if enabled is not None and not enabled():
+                return view(*args, **kwargs)
+            arguments = tuple(sorted(request.args.items(multi=True)))
+            entry = cache.get((request.path, arguments, data_version()))
+            if entry is not None:
+                cache.hits += 1
+                return cache.respond(entry)
+
+            cache.misses += 1
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple) or not isinstance(response, Response):
+                return response
+            payload = response.get_json(silent=True)
+            if response.status_code != 200 or not isinstance(payload, dict) or "error" in payload:
+                return response
+            # The view may have loaded the data, so read the version again
+            entry = cache.put((request.path, arguments, data_version()), response.get_data())
+            return cache.respond(entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,267 @@
+"""
+Real-time ingestion of emails into the loaded store.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, Iterable
+
+from src.data_loader import EmailDataLoader
+from src.email_parser import parse_email_addresses, parse_message
+from src.metrics import span, increment
+
+# Fields of a stored email record; everything else in a request is dropped
+RECORD_FIELDS = ("sender", "receiver", "subject", "timestamp", "body", "message_id")
+
+
+def normalize_record(record: Any) -> Dict[str, Any]:
+    """
+    Validate a JSON email record and bring it into the stored format.
+
+    Args:
+        record: Dictionary with at least a sender and receivers; receivers
+            may be a list or a comma-separated string
+
+    Returns:
+        Email dictionary as stored in the JSON file
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Email record must be an object")
+    sender = record.get("sender")
+    if not sender or not isinstance(sender, str):
+        raise ValueError("Email record needs a sender")
+    receiver = record.get("receiver", [])
+    if isinstance(receiver, str):
+        receiver = parse_email_addresses(receiver)
+    if not isinstance(receiver, list) or not all(isinstance(r, str) for r in receiver):
+        raise ValueError("receiver must be a list of addresses or a comma-separated string")
+
+    email = {
+        "sender": sender.strip(),
+        "receiver": [r.strip() for r in receiver if r.strip()],
+        "subject": str(record.get("subject") or ""),
+        "timestamp": str(record.get("timestamp") or ""),
+        "body": str(record.get("body") or "")
+    }
+    if record.get("message_id"):
+        email["message_id"] = str(record["message_id"])
+    return email
+
+
+class IngestJournal:
+    """
+    Append-only JSON-lines file of ingested emails.
+
+    The JSON export is only rewritten offline, so ingested emails are
+    journaled and replayed on top of it when the state is loaded again (on
+    restart or hot reload).
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the journal.
+
+        Args:
+            path: Journal file path (created on first write)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, emails: List[Dict[str, Any]]):
+        """Append emails to the journal."""
+        lines = "".join(json.dumps({key: email[key] for key in RECORD_FIELDS + ("email_id",) if key in email},
+                                   ensure_ascii=False) + "\n" for email in emails)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def read(self, offset: int = 0) -> tuple:
+        """
+        Read journaled emails.
+
+        Args:
+            offset: Byte offset to start from
+
+        Returns:
+            (emails, offset after the last complete line)
+        """
+        if not os.path.exists(self.path):
+            return [], offset
+        emails = []
+        with self._lock:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Partially written line
+                    offset += len(line)
+                    if line.strip():
+                        emails.append(json.loads(line))
+        return emails, offset
+
+
+class GraphChangeQueue:
+    """
+    Applies ingested emails to a graph backend in background batches.
+
+    Writes to a remote graph database are much slower than the in-memory
+    updates, so ingestion requests only enqueue them. A worker thread
+    applies them in batches and retries a failed batch after a pause.
+    """
+
+    def __init__(self, apply: Callable[[List[Dict[str, Any]]], Any],
+                 batch_size: int = 500, retry_delay: float = 5.0):
+        """
+        Initialize the queue.
+
+        Args:
+            apply: Writes a batch of emails to the graph
+            batch_size: Most emails applied at once
+            retry_delay: Seconds to wait after a failed batch
+        """
+        self.apply = apply
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._pending: deque = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+        self.applied = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def put(self, emails: Iterable[Dict[str, Any]]):
+        """Queue emails for the graph and wake the worker."""
+        with self._condition:
+            self._pending.extend(emails)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="graph-changes", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._busy = True
+            try:
+                with span("ingest.graph_apply"):
+                    self.apply(batch)
+            except Exception as e:
+                with self._condition:
+                    self._pending.extendleft(reversed(batch))
+                    self._busy = False
+                    self.failures += 1
+                    self.last_error = str(e)
+                print(f"Warning: Could not apply {len(batch)} emails to the graph, retrying: {e}")
+                time.sleep(self.retry_delay)
+                continue
+            with self._condition:
+                self._busy = False
+                self.applied += len(batch)
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued email was applied.
+
+        Returns:
+            True if the queue drained within the timeout
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue length and totals."""
+        with self._condition:
+            pending = len(self._pending)
+        return {"pending": pending, "applied": self.applied, "failures": self.failures,
+                "last_error": self.last_error}
+
+
+class EmailIngestor:
+    """
+    Adds new emails to a loaded state without recomputing it.
+
+    Each batch is appended to the data loader, which updates its indexes
+    and aggregates in place. The in-memory analytics graph folds the new
+    emails in immediately, and an optional graph change queue forwards
+    them to an external graph database.
+    """
+
+    def __init__(self, data_loader: EmailDataLoader, refresh_graph: Optional[Callable[[], Any]] = None,
+                 graph_queue: Optional[GraphChangeQueue] = None, journal: Optional[IngestJournal] = None):
+        """
+        Initialize the ingestor.
+
+        Args:
+            data_loader: Loader holding the email store
+            refresh_graph: Folds appended emails into the in-memory graph
+            graph_queue: Queue forwarding new emails to a graph database
+            journal: Journal persisting new emails across restarts
+        """
+        self.data_loader = data_loader
+        self.refresh_graph = refresh_graph
+        self.graph_queue = graph_queue
+        self.journal = journal
+
+    def ingest(self, records: Iterable[Any] = (), messages: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Ingest a batch of JSON records and raw RFC822 messages.
+
+        Invalid items are reported and skipped; the rest of the batch is
+        still ingested.
+
+        Args:
+            records: Email records in the JSON file's format
+            messages: Raw RFC822 message texts
+
+        Returns:
+            Dictionary with counts of received, added and duplicate emails,
+            the rejected items with their errors, and the new data version
+        """
+        emails, rejected = [], []
+        for index, record in enumerate(records):
+            try:
+                emails.append(normalize_record(record))
+            except ValueError as e:
+                rejected.append({"record": index, "error": str(e)})
+        for index, message in enumerate(messages):
+            try:
+                if not isinstance(message, str) or not message.strip():
+                    raise ValueError("Message must be non-empty RFC822 text")
+                emails.append(normalize_record(parse_message(message)))
+            except Exception as e:
+                rejected.append({"message": index, "error": str(e)})
+
+        with span("ingest"):
+            added = self.data_loader.append(emails)
+            if added:
+                if self.journal is not None:
+                    self.journal.write(added)
+                if self.refresh_graph is not None:
+                    self.refresh_graph()
+                if self.graph_queue is not None:
+                    self.graph_queue.put(added)
+        increment("ingested_emails", "Emails added through the ingestion endpoint", len(added))
+
+        return {
+            "received": len(emails) + len(rejected),
+            "added": len(added),
+            "duplicates": len(emails) - len(added),
+            "rejected": rejected,
+            "data_version": self.data_loader.data_version
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Graph queue status."""
+        return {"graph_queue": self.graph_queue.get_stats() if self.graph_queue else None}
+
+    def close(self, timeout: float = 30.0):
+        """Give queued graph changes a chance to be applied."""
+        if self.graph_queue is not None:
+            self.graph_queue.flush(timeout)
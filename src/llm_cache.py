@@ -0,0 +1,182 @@
+"""
+Response cache for LLM completions.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+
+class LLMResponseCache:
+    """
+    Cache LLM responses keyed by model, normalized prompt and data version.
+
+    Entries live in an in-memory LRU with a TTL. When `disk_path` is set,
+    entries are also written to a SQLite file so they survive restarts and
+    are shared between worker processes.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600,
+                 disk_path: Optional[str] = None):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries: Maximum number of in-memory entries (0 disables caching)
+            ttl_seconds: Seconds before an entry expires (0 means never)
+            disk_path: Optional path of a SQLite file for the disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        """Build a cache configured from LLM_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", 1000)),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL", 3600)),
+            disk_path=os.getenv("LLM_CACHE_PATH") or None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection to the disk tier and commit on exit."""
+        conn = sqlite3.connect(self.disk_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def normalize_prompt(text: str) -> str:
+        """Normalize prompt text so trivially different questions share an entry."""
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    def make_key(self, model: str, messages: List[Dict[str, str]],
+                 data_version: Any = None, **params) -> str:
+        """
+        Build a cache key for a completion request.
+
+        Args:
+            model: Model name
+            messages: Chat messages sent to the model
+            data_version: Version of the data the prompt was built from
+            **params: Other request parameters that affect the output
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = {
+            "model": model,
+            "messages": [[m["role"], self.normalize_prompt(m["content"])] for m in messages],
+            "data_version": data_version,
+            "params": params
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response, counting the hit or miss.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row and not self._expired(row[1]):
+                with self._lock:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        """
+        Store a response.
+
+        Args:
+            key: Key from make_key
+            value: Response text
+        """
+        if not self.enabled:
+            return
+
+        created = time.time()
+        with self._lock:
+            self._store(key, value, created)
+
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created)
+                )
+
+    def _store(self, key: str, value: str, created: float):
+        """Insert into the in-memory tier, evicting least recently used entries."""
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM responses")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,213 @@
+"""
+Hierarchical map-reduce answering for organization-wide questions.
+"""
+import os
+from typing import Dict, Any, List
+
+from src.data_loader import EmailDataLoader
+from src.context_builder import ContextBuilder, extract_terms
+from src.llm_cache import LLMResponseCache
+from src.summaries import fingerprint
+from src.metrics import span
+
+MAP_SYSTEM_PROMPT = ("You extract facts from organizational email for an AI Chief of Staff. "
+                     "List only facts, names, dates, decisions and numbers relevant to the focus. "
+                     "Be concise (at most 200 words). Say 'Nothing relevant.' if nothing applies.")
+
+REDUCE_SYSTEM_PROMPT = """You are an AI Chief of Staff for Organizational Intelligence.
+You are given partial findings, each extracted from a different slice of the organization's email.
+Combine them into one accurate, well-organized answer. Be concise but thorough."""
+
+
+class MapReduceQuery:
+    """
+    Answer questions that need more of the corpus than one prompt can hold.
+
+    Candidate emails are ordered by time and split into shards. Each shard
+    is packed into a token budget and summarized in parallel (map) with a
+    focus built from the question's key terms rather than its wording, so
+    similar questions reuse the cached shard summaries. Partial summaries
+    are then combined (reduce), in several rounds if they exceed the budget.
+    The last round is forced, with the findings shortened to fit, after
+    max_rounds or when merging stops shrinking them.
+    """
+
+    def __init__(self, data_loader: EmailDataLoader, async_llm, cache: LLMResponseCache,
+                 context_builder: ContextBuilder, model: str,
+                 shard_size: int = 100, shard_token_budget: int = 3000,
+                 max_candidates: int = 2000, reduce_token_budget: int = 6000,
+                 max_rounds: int = 3):
+        """
+        Initialize the map-reduce query runner.
+
+        Args:
+            data_loader: EmailDataLoader instance
+            async_llm: AsyncLLMClient used for parallel map calls
+            cache: Response cache shared with AICChiefOfStaff
+            context_builder: Token counting and snippet packing
+            model: Model name (part of cache keys)
+            shard_size: Candidate emails per shard
+            shard_token_budget: Token budget of each shard's email context
+            max_candidates: Maximum candidate emails considered
+            reduce_token_budget: Token budget of partial summaries per reduce call
+            max_rounds: Most reduce rounds, including the final answer
+        """
+        self.data_loader = data_loader
+        self.async_llm = async_llm
+        self.cache = cache
+        self.model = model
+        self.shard_size = shard_size
+        self.max_candidates = max_candidates
+        self.reduce_token_budget = reduce_token_budget
+        self.max_rounds = max(1, max_rounds)
+        self.counter = context_builder
+        self.shard_builder = ContextBuilder(token_budget=shard_token_budget, model=model)
+
+    @classmethod
+    def from_env(cls, data_loader: EmailDataLoader, async_llm, cache: LLMResponseCache,
+                 context_builder: ContextBuilder, model: str) -> "MapReduceQuery":
+        """Build a runner configured from MAP_REDUCE_* environment variables."""
+        return cls(
+            data_loader, async_llm, cache, context_builder, model,
+            shard_size=int(os.getenv("MAP_REDUCE_SHARD_SIZE", 100)),
+            shard_token_budget=int(os.getenv("MAP_REDUCE_SHARD_TOKENS", 3000)),
+            max_candidates=int(os.getenv("MAP_REDUCE_MAX_CANDIDATES", 2000)),
+            max_rounds=int(os.getenv("MAP_REDUCE_MAX_ROUNDS", 3))
+        )
+
+    def candidate_emails(self, user_query: str) -> List[Dict[str, Any]]:
+        """
+        Emails matching any key term of the query, or an even sample of the
+        whole corpus when nothing matches, ordered by time.
+        """
+        emails = self.data_loader.load()
+        terms = [t for t in dict.fromkeys(extract_terms(user_query)) if len(t) > 3]
+
+        candidates = []
+        if terms:
+            for email in emails:
+                text = f"{email.get('subject', '')}\n{email.get('body', '')}".lower()
+                if any(term in text for term in terms):
+                    candidates.append(email)
+        if not candidates:
+            candidates = emails
+
+        if len(candidates) > self.max_candidates:
+            stride = len(candidates) / self.max_candidates
+            candidates = [candidates[int(i * stride)] for i in range(self.max_candidates)]
+
+        return sorted(candidates, key=lambda e: e['parsed_timestamp'].timestamp()
+                      if e.get('parsed_timestamp') else 0.0)
+
+    def _complete_cached(self, batch: List[List[Dict[str, str]]], max_tokens: int) -> List[Dict[str, Any]]:
+        """Run completions in parallel, serving cached ones without a call."""
+        results = [None] * len(batch)
+        pending = []
+        for i, messages in enumerate(batch):
+            key = self.cache.make_key(self.model, messages, self.data_loader.data_version,
+                                      temperature=0.2, max_tokens=max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = {"text": cached, "cached": True}
+            else:
+                pending.append((i, key, messages))
+
+        if pending:
+            responses = self.async_llm.run(self.async_llm.complete_many(
+                [messages for _, _, messages in pending], temperature=0.2, max_tokens=max_tokens
+            ))
+            for (i, key, _), response in zip(pending, responses):
+                if isinstance(response, Exception):
+                    results[i] = {"text": "", "cached": False, "error": str(response)}
+                else:
+                    self.cache.set(key, response)
+                    results[i] = {"text": response, "cached": False}
+
+        return results
+
+    def _map(self, focus: str, shards: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        batch = []
+        for shard in shards:
+            context, _ = self.shard_builder.build(focus, shard)
+            batch.append([
+                {"role": "system", "content": MAP_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Focus: {focus}\n\nEmails (shard {fingerprint(shard)[:12]}):\n{context}"}
+            ])
+        return self._complete_cached(batch, max_tokens=400)
+
+    def _reduce(self, user_query: str, partials: List[str]) -> Dict[str, Any]:
+        """Combine partial summaries, in rounds while they exceed the budget."""
+        rounds, previous_groups = 0, None
+        while True:
+            groups, current, used = [], [], 0
+            for partial in partials:
+                cost = self.counter.count_tokens(partial)
+                if current and used + cost > self.reduce_token_budget:
+                    groups.append(current)
+                    current, used = [], 0
+                current.append(partial)
+                used += cost
+            if current:
+                groups.append(current)
+
+            final = len(groups) <= 1
+            stalled = len(groups) >= len(partials) or (previous_groups is not None
+                                                        and len(groups) >= previous_groups)
+            if not final and (rounds + 1 >= self.max_rounds or stalled):
+                # Out of rounds, or merging no longer shrinks the findings: answer
+                # from all of them, each shortened to its share of the budget
+                share = max(1, self.reduce_token_budget // len(partials))
+                groups = [[self.counter.truncate(partial, share) for partial in partials]]
+                final = True
+            batch = []
+            for group in groups:
+                findings = "\n\n".join(f"Finding {i}:\n{text}" for i, text in enumerate(group, 1))
+                instruction = ("Answer the question using these findings." if final else
+                               "Merge these findings into one list of facts relevant to the question.")
+                batch.append([
+                    {"role": "system", "content": REDUCE_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{findings}\n\nQuestion: {user_query}\n\n{instruction}"}
+                ])
+            results = self._complete_cached(batch, max_tokens=2000 if final else 600)
+            rounds += 1
+            if final:
+                result = results[0] if results else {"text": "", "cached": False}
+                result["rounds"] = rounds
+                return result
+            previous_groups = len(groups)
+            partials = [r["text"] for r in results if r["text"]]
+
+    def run(self, user_query: str) -> Dict[str, Any]:
+        """
+        Answer a question with map-reduce over the candidate emails.
+
+        Args:
+            user_query: User's question
+
+        Returns:
+            Dictionary with the answer and shard statistics
+        """
+        candidates = self.candidate_emails(user_query)
+        shards = [candidates[i:i + self.shard_size]
+                  for i in range(0, len(candidates), self.shard_size)]
+        # Similar questions share key terms, and therefore shard prompts
+        focus = ", ".join(sorted(set(extract_terms(user_query)))) or "general organizational activity"
+
+        with span("map_reduce.map"):
+            mapped = self._map(focus, shards)
+        failed = sum(1 for m in mapped if m.get("error"))
+        if shards and failed == len(shards):
+            raise RuntimeError(f"All {failed} map calls failed: {mapped[0]['error']}")
+        partials = [m["text"] for m in mapped
+                    if m["text"] and "nothing relevant" not in m["text"].lower()[:40]]
+        with span("map_reduce.reduce"):
+            reduced = self._reduce(user_query, partials or ["Nothing relevant was found in the emails."])
+
+        return {
+            "response": reduced["text"],
+            "candidate_emails": len(candidates),
+            "shards": len(shards),
+            "cached_shards": sum(1 for m in mapped if m["cached"]),
+            "failed_shards": failed,
+            "reduce_rounds": reduced["rounds"]
+        }
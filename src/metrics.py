@@ -0,0 +1,205 @@
+"""
+Lightweight latency and size instrumentation.
+
+`span("llm")` times a block of work, `timed("graph.get_graph_data")`
+times every call of a function, and `observe(...)` records a value such as a
+payload size or token count. Measurements go into Prometheus-style
+histograms served from /api/metrics. The spans of the current request are
+also collected for its Server-Timing header.
+
+Set METRICS_ENABLED=false to turn all of this into no-ops: `timed` then
+returns the undecorated function, and `span` a shared null context.
+"""
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Dict, List, Optional, Tuple, Callable
+
+# Seconds: sub-millisecond index lookups up to long LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes of response payloads
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Prompt and completion tokens
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# (name, duration in seconds) of the spans of the current request
+_request_spans: contextvars.ContextVar = contextvars.ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # Label values -> [bucket counts..., +Inf count, sum]
+        self.series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, value: float, labels: Tuple[Tuple[str, str], ...]):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-1]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Thread-safe collection of histograms and counters."""
+
+    def __init__(self, enabled: bool = True, prefix: str = "cos"):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled: Whether measurements are recorded at all
+            prefix: Prefix of every metric name
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self._counter_help: Dict[str, str] = {}
+        self.histogram("span_seconds", "Duration of instrumented stages", LATENCY_BUCKETS)
+
+    @classmethod
+    def from_env(cls) -> "MetricsRegistry":
+        """Build a registry enabled unless METRICS_ENABLED=false."""
+        return cls(enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true")
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        """Declare a histogram (idempotent)."""
+        full_name = f"{self.prefix}_{name}"
+        with self._lock:
+            if full_name not in self._histograms:
+                self._histograms[full_name] = Histogram(full_name, help_text, buckets)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value in a declared histogram."""
+        if not self.enabled:
+            return
+        histogram = self._histograms[f"{self.prefix}_{name}"]
+        with self._lock:
+            histogram.observe(value, tuple(sorted(labels.items())))
+
+    def increment(self, name: str, help_text: str = "", amount: float = 1, **labels):
+        """Add to a counter, declaring it on first use."""
+        if not self.enabled:
+            return
+        full_name = f"{self.prefix}_{name}_total"
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(full_name, {})
+            self._counter_help.setdefault(full_name, help_text)
+            series[key] = series.get(key, 0) + amount
+
+    def span(self, name: str):
+        """
+        Context manager timing a stage.
+
+        The duration is recorded in the span histogram and, during a
+        request, reported in its Server-Timing header.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.observe("span_seconds", duration, span=name)
+            spans = _request_spans.get()
+            if spans is not None:
+                spans.append((name, duration))
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Decorator timing every call of a function as a span."""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+            span_name = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self._span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for histogram in self._histograms.values():
+                if histogram.series:
+                    lines.extend(histogram.render())
+            for name, series in self._counters.items():
+                lines.append(f"# HELP {name} {self._counter_help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    label_text = ",".join(f'{key}="{_escape(v)}"' for key, v in labels)
+                    lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def start_request():
+    """Start collecting spans for the current request's Server-Timing header."""
+    return _request_spans.set([])
+
+
+def finish_request(token) -> List[Tuple[str, float]]:
+    """Stop collecting spans for the current request and return them."""
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def server_timing(spans: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Format spans as a Server-Timing header value (durations in milliseconds)."""
+    totals: Dict[str, float] = {}
+    for name, duration in spans:
+        totals[name] = totals.get(name, 0.0) + duration
+    parts = [f"{name.replace(' ', '_')};dur={duration * 1000:.1f}" for name, duration in totals.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# Process-wide registry
+metrics = MetricsRegistry.from_env()
+metrics.histogram("http_request_seconds", "HTTP request latency", LATENCY_BUCKETS)
+metrics.histogram("http_response_bytes", "HTTP response payload size", SIZE_BUCKETS)
+metrics.histogram("llm_tokens", "Tokens per LLM call", TOKEN_BUCKETS)
+
+span = metrics.span
+timed = metrics.timed
+observe = metrics.observe
+increment = metrics.increment
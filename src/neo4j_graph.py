@@ -6,10 +6,50 @@ from neo4j import GraphDatabase
 import os
 from dotenv import load_dotenv
 
+from src.graph_backend import GraphBackend, RECENT_SUBJECTS_LIMIT
+from src.data_loader import get_email_id
+from src.metrics import timed
+
 load_dotenv()
 
+# Creates the Email nodes of a batch that are not in the graph yet and
+# returns their ids; only those emails are counted on relationships. MERGE
+# on the unique id locks it, so concurrent writers cannot both create a node
+_CREATE_NEW_EMAILS = """
+UNWIND $rows AS row
+MERGE (e:Email {id: row.id})
+ON CREATE SET e.sender = row.sender, e.timestamp = row.timestamp, e._created = true
+WITH e, row WHERE e._created
+REMOVE e._created
+RETURN row.id AS id
+"""
+
+# Same relationship update as create_communication, for a batch of emails
+_APPLY_COMMUNICATIONS = """
+UNWIND $rows AS row
+MERGE (s:Person {email: row.sender})
+SET s.name = coalesce(s.name, row.sender), s.updated = datetime()
+WITH s, row
+UNWIND row.receivers AS receiver
+MERGE (r:Person {email: receiver})
+MERGE (s)-[c:COMMUNICATED_WITH]->(r)
+ON CREATE SET c.count = 0, c.subject_count = 0, c.first_date = row.timestamp
+WITH c, row, coalesce(c.recent_subjects, reverse(coalesce(c.subjects, [])))[..$recent_limit] AS recent
+SET c.count = c.count + 1,
+  c.subject_count = coalesce(c.subject_count, 0) + CASE WHEN row.subject = '' THEN 0 ELSE 1 END,
+  c.recent_subjects = CASE WHEN row.subject = '' OR row.subject IN recent THEN recent
+    ELSE ([row.subject] + recent)[..$recent_limit] END,
+  c.last_date = row.timestamp
+REMOVE c.subjects
+"""
+
+_SET_WATERMARK = """
+MERGE (w:SyncState {name: $name})
+SET w.position = $position, w.last_email_id = $last_email_id, w.updated = datetime()
+"""
+
 
-class Neo4jGraphDB:
+class Neo4jGraphDB(GraphBackend):
     """Neo4j graph database for storing and querying communication networks."""
     
     def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, 
@@ -82,56 +122,166 @@ class Neo4jGraphDB:
             )
             
             # Create or update communication relationship
+            # Subjects are kept as a bounded ring of recent distinct subjects
+            # plus a running count, so each write costs the same regardless of
+            # how busy the pair is. Legacy unbounded `subjects` lists are
+            # folded into the ring and dropped on the next write.
             session.run(
                 "MATCH (s:Person {email: $sender}), (r:Person {email: $receiver}) "
                 "MERGE (s)-[c:COMMUNICATED_WITH]->(r) "
-                "ON CREATE SET c.count = 1, c.subjects = CASE WHEN $subject = '' THEN [] ELSE [$subject] END, c.first_date = $timestamp, c.last_date = $timestamp "
-                "ON MATCH SET c.count = c.count + 1, "
-                "  c.subjects = CASE WHEN $subject = '' OR $subject IN c.subjects THEN c.subjects ELSE c.subjects + [$subject] END, "
-                "  c.last_date = $timestamp",
+                "ON CREATE SET c.count = 0, c.subject_count = 0, c.first_date = $timestamp "
+                "WITH c, coalesce(c.recent_subjects, reverse(coalesce(c.subjects, [])))[..$recent_limit] AS recent "
+                "SET c.count = c.count + 1, "
+                "  c.subject_count = coalesce(c.subject_count, 0) + CASE WHEN $subject = '' THEN 0 ELSE 1 END, "
+                "  c.recent_subjects = CASE WHEN $subject = '' OR $subject IN recent THEN recent "
+                "    ELSE ([$subject] + recent)[..$recent_limit] END, "
+                "  c.last_date = $timestamp "
+                "REMOVE c.subjects",
                 sender=sender,
                 receiver=receiver,
                 subject=subject or "",
-                timestamp=timestamp or ""
+                timestamp=timestamp or "",
+                recent_limit=RECENT_SUBJECTS_LIMIT
             )
     
-    def load_emails(self, emails: List[Dict[str, Any]]):
+    def ensure_schema(self):
+        """Create the uniqueness constraints that keep email and person writes idempotent."""
+        with self.driver.session() as session:
+            session.run("CREATE CONSTRAINT email_id IF NOT EXISTS FOR (e:Email) REQUIRE e.id IS UNIQUE")
+            session.run("CREATE CONSTRAINT person_email IF NOT EXISTS FOR (p:Person) REQUIRE p.email IS UNIQUE")
+    
+    def is_legacy_graph(self) -> bool:
         """
-        Load email data into Neo4j graph.
+        Whether the graph holds communication counts without Email nodes.
         
-        Args:
-            emails: List of email dictionaries
+        Graphs loaded before emails were tracked by id cannot tell which
+        emails they already count, so they must be rebuilt once.
         """
-        print(f"Loading {len(emails)} emails into Neo4j...")
-        
-        for i, email in enumerate(emails):
+        with self.driver.session() as session:
+            edges = session.run("MATCH ()-[c:COMMUNICATED_WITH]->() RETURN count(c) AS n").single()["n"]
+            emails = session.run("MATCH (e:Email) RETURN count(e) AS n").single()["n"]
+            return edges > 0 and emails == 0
+    
+    @staticmethod
+    def _email_rows(emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Query parameters for emails with a sender, one row per distinct email id."""
+        rows = {}
+        for email in emails:
             sender = email.get('sender', '').strip()
-            receivers = email.get('receiver', [])
-            subject = email.get('subject', '')
-            timestamp = email.get('timestamp', '')
-            
             if not sender:
                 continue
+            email_id = get_email_id(email)
+            rows.setdefault(email_id, {
+                "id": email_id,
+                "sender": sender,
+                "receivers": [r.strip() for r in email.get('receiver', []) if r and r.strip()],
+                "subject": email.get('subject', '') or "",
+                "timestamp": email.get('timestamp', '') or ""
+            })
+        return list(rows.values())
+    
+    @staticmethod
+    def _apply_batch(tx, rows: List[Dict[str, Any]], watermark: Optional[Dict[str, Any]] = None) -> int:
+        """Apply the emails of a batch not applied before, in one transaction."""
+        new_rows = []
+        if rows:
+            new_ids = {record["id"] for record in tx.run(_CREATE_NEW_EMAILS, rows=rows)}
+            new_rows = [row for row in rows if row["id"] in new_ids]
+        if new_rows:
+            tx.run(_APPLY_COMMUNICATIONS, rows=new_rows, recent_limit=RECENT_SUBJECTS_LIMIT)
+        if watermark:
+            tx.run(_SET_WATERMARK, **watermark)
+        return len(new_rows)
+    
+    @timed("neo4j.write_emails")
+    def write_emails(self, emails: List[Dict[str, Any]], batch_size: int = 500) -> int:
+        """
+        Write emails idempotently, in batches of one transaction each.
+        
+        Every email is recorded as an :Email node keyed by its email id, and
+        relationship counts only include emails whose node was new, so
+        writing the same email twice does not count it twice.
+        
+        Args:
+            emails: List of email dictionaries
+            batch_size: Emails per transaction
             
-            # Create sender node
-            self.create_person(sender)
-            
-            # Create communication relationships
-            for receiver in receivers:
-                if receiver and receiver.strip():
-                    self.create_communication(
-                        sender=sender,
-                        receiver=receiver.strip(),
-                        subject=subject,
-                        timestamp=timestamp,
-                        email_id=f"email_{i}"
-                    )
-            
-            if (i + 1) % 1000 == 0:
-                print(f"Processed {i + 1} emails...")
+        Returns:
+            Number of emails that were not in the graph yet
+        """
+        applied = 0
+        with self.driver.session() as session:
+            for start in range(0, len(emails), batch_size):
+                rows = self._email_rows(emails[start:start + batch_size])
+                if rows:
+                    applied += session.execute_write(self._apply_batch, rows)
+        return applied
+    
+    def get_watermark(self, name: str = "emails") -> Optional[Dict[str, Any]]:
+        """Position and last email id recorded by the last sync, if any."""
+        with self.driver.session() as session:
+            record = session.run(
+                "MATCH (w:SyncState {name: $name}) "
+                "RETURN w.position AS position, w.last_email_id AS last_email_id, toString(w.updated) AS updated",
+                name=name
+            ).single()
+            return dict(record) if record else None
+    
+    @timed("neo4j.sync")
+    def sync(self, emails: List[Dict[str, Any]], name: str = "emails", batch_size: int = 500) -> Dict[str, Any]:
+        """
+        Apply the emails added since the last sync.
+        
+        The watermark (how many emails of the list were applied and the id of
+        the last one) is stored in the graph and advanced in the same
+        transaction as each batch, so an interrupted sync resumes where it
+        stopped. If the email at the watermark is no longer the recorded one
+        (the source was rebuilt or reordered), all emails are checked again;
+        their ids keep that from counting anything twice.
         
-        print("Finished loading emails into Neo4j")
+        Args:
+            emails: All emails of the source, oldest first
+            name: Watermark name, one per source
+            batch_size: Emails per transaction
+            
+        Returns:
+            Dictionary with the start position, new watermark position,
+            number of emails applied, and whether a full rescan was needed
+        """
+        watermark = self.get_watermark(name)
+        start, rescanned = 0, False
+        if watermark and watermark["position"]:
+            position = watermark["position"]
+            if position <= len(emails) and get_email_id(emails[position - 1]) == watermark["last_email_id"]:
+                start = position
+            else:
+                rescanned = True
+        
+        applied = 0
+        with self.driver.session() as session:
+            for begin in range(start, len(emails), batch_size):
+                end = min(begin + batch_size, len(emails))
+                rows = self._email_rows(emails[begin:end])
+                applied += session.execute_write(self._apply_batch, rows, {
+                    "name": name, "position": end, "last_email_id": get_email_id(emails[end - 1])
+                })
+        return {"start": start, "position": len(emails), "applied": applied, "rescanned": rescanned}
+    
+    @timed("neo4j.load_emails")
+    def load_emails(self, emails: List[Dict[str, Any]]):
+        """
+        Load email data into Neo4j graph.
+        
+        Emails already in the graph are skipped; see write_emails().
+        
+        Args:
+            emails: List of email dictionaries
+        """
+        print(f"Loading {len(emails)} emails into Neo4j...")
+        applied = self.write_emails(emails)
+        print(f"Finished loading emails into Neo4j ({applied} new)")
     
+    @timed("neo4j.get_graph_data")
     def get_graph_data(self, limit: int = 100) -> Dict[str, Any]:
         """
         Get graph data for visualization.
@@ -169,18 +319,18 @@ class Neo4jGraphDB:
             MATCH (s:Person)-[c:COMMUNICATED_WITH]->(r:Person)
             WHERE s.email IN $node_ids AND r.email IN $node_ids
             RETURN s.email as from, r.email as to, c.count as value, 
-                   c.subjects as subjects, c.last_date as last_date
+                   c.last_date as last_date
             ORDER BY c.count DESC
             """
             
             edges_result = session.run(edges_query, node_ids=node_ids)
             edges = [{"from": record["from"], "to": record["to"], 
                      "value": record["value"], 
-                     "subjects": record["subjects"][:3] if record["subjects"] else [],
                      "last_date": record["last_date"]} for record in edges_result]
             
             return {"nodes": nodes, "edges": edges}
     
+    @timed("neo4j.get_person_network")
     def get_person_network(self, email: str, depth: int = 2) -> Dict[str, Any]:
         """
         Get communication network for a specific person.
@@ -221,6 +371,7 @@ class Neo4jGraphDB:
             
             return {"nodes": nodes, "edges": edges}
     
+    @timed("neo4j.get_top_relationships")
     def get_top_relationships(self, limit: int = 20) -> List[Dict[str, Any]]:
         """
         Get top communication relationships.
@@ -235,12 +386,14 @@ class Neo4jGraphDB:
             query = """
             MATCH (s:Person)-[c:COMMUNICATED_WITH]->(r:Person)
             RETURN s.email as sender, r.email as receiver, c.count as count,
-                   c.subjects as subjects, c.last_date as last_date
+                   coalesce(c.recent_subjects, reverse(coalesce(c.subjects, []))[..$recent_limit]) as subjects,
+                   c.subject_count as subject_count, c.last_date as last_date
             ORDER BY c.count DESC
             LIMIT $limit
             """
             
-            result = session.run(query, limit=limit)
+            result = session.run(query, limit=limit, recent_limit=RECENT_SUBJECTS_LIMIT)
             return [{"sender": record["sender"], "receiver": record["receiver"],
-                    "count": record["count"], "subjects": record["subjects"],
+                    "count": record["count"], "subjects": record["subjects"] or [],
+                    "subject_count": record["subject_count"] or 0,
                     "last_date": record["last_date"]} for record in result]
@@ -1,10 +1,12 @@
 """
 Organizational Intelligence module for analyzing email communications.
 """
+import threading
 from typing import List, Dict, Any, Tuple
 from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 from src.data_loader import EmailDataLoader
+from src.sketches import EmailSketches
 
 
 class OrganizationalIntelligence:
@@ -19,17 +21,29 @@ class OrganizationalIntelligence:
         """
         self.data_loader = data_loader
         self.data_loader.load()
+        # Sender -> receiver counts, with the loader epoch and number of
+        # emails they cover; appended emails are folded in on the next call
+        self._network = defaultdict(lambda: defaultdict(int))
+        self._network_epoch = None
+        self._network_folded = 0
+        self._network_lock = threading.Lock()
+        # Sketches for the approximate mode, folded in the same way
+        self._sketches = None
+        self._sketches_epoch = None
+        self._sketches_folded = 0
+        self._sketches_lock = threading.Lock()
     
-    def get_communication_network(self) -> Dict[str, Dict[str, int]]:
-        """
-        Build communication network graph.
-        
-        Returns:
-            Dictionary mapping sender -> {receiver: count}
-        """
-        network = defaultdict(lambda: defaultdict(int))
-        
-        for email in self.data_loader.emails:
+    def _fold_network(self) -> Dict[str, Dict[str, int]]:
+        """Bring the network up to date with the loaded emails; call with _network_lock held."""
+        emails = self.data_loader.emails
+        if self._network_epoch != self.data_loader.epoch:
+            self._network = defaultdict(lambda: defaultdict(int))
+            self._network_epoch = self.data_loader.epoch
+            self._network_folded = 0
+        end = len(emails)
+        network = self._network
+        
+        for email in emails[self._network_folded:end]:
             sender = email.get('sender', '')
             receivers = email.get('receiver', [])
             
@@ -37,37 +51,82 @@ class OrganizationalIntelligence:
                 for receiver in receivers:
                     if receiver:
                         network[sender][receiver] += 1
+        self._network_folded = end
+        return network
+    
+    def get_communication_network(self) -> Dict[str, Dict[str, int]]:
+        """
+        Build communication network graph.
         
-        return dict(network)
+        Returns:
+            Dictionary mapping sender -> {receiver: count}. It is a copy,
+            so callers cannot change the maintained network.
+        """
+        with self._network_lock:
+            return {sender: dict(receivers) for sender, receivers in self._fold_network().items()}
+    
+    def _fold_sketches(self) -> EmailSketches:
+        """Bring the sketches up to date with the loaded emails; call with _sketches_lock held."""
+        emails = self.data_loader.emails
+        if self._sketches_epoch != self.data_loader.epoch:
+            self._sketches = EmailSketches.from_env()
+            self._sketches_epoch = self.data_loader.epoch
+            self._sketches_folded = 0
+        end = len(emails)
+        for email in emails[self._sketches_folded:end]:
+            self._sketches.update(email)
+        self._sketches_folded = end
+        return self._sketches
     
-    def get_top_communicators(self, top_n: int = 10) -> List[Tuple[str, int]]:
+    def get_sketches(self) -> EmailSketches:
+        """
+        Sketches of the loaded emails, for the approximate mode or to merge
+        with those of other shards.
+        
+        Returns:
+            EmailSketches covering every loaded email
+        """
+        with self._sketches_lock:
+            return self._fold_sketches()
+    
+    def get_top_communicators(self, top_n: int = 10, approximate: bool = False) -> List[Tuple[str, int]]:
         """
         Get top communicators by email count.
         
         Args:
             top_n: Number of top communicators to return
+            approximate: Use the heavy-hitter sketch instead of exact counts
             
         Returns:
             List of (email, count) tuples
         """
-        sender_counts = Counter()
-        receiver_counts = Counter()
+        if approximate:
+            with self._sketches_lock:
+                return [(email, count) for email, count, _ in self._fold_sketches().communicators.top(top_n)]
+        # Sender and receiver counts, maintained by the loader's indexes
+        return self.data_loader.get_top_communicators(top_n)
+    
+    def get_correspondents(self, person: str) -> Counter:
+        """
+        Everyone a person emailed or received email from.
         
-        for email in self.data_loader.emails:
-            sender = email.get('sender', '')
-            receivers = email.get('receiver', [])
-            
-            if sender:
-                sender_counts[sender] += 1
+        Args:
+            person: Email address of the person
             
-            for receiver in receivers:
+        Returns:
+            Counter of correspondent -> emails exchanged with the person
+        """
+        correspondents = Counter()
+        for email in self.data_loader.get_emails_by_sender(person):
+            for receiver in email.get('receiver', []):
                 if receiver:
-                    receiver_counts[receiver] += 1
-        
-        # Combine sender and receiver counts
-        all_counts = sender_counts + receiver_counts
+                    correspondents[receiver] += 1
         
-        return all_counts.most_common(top_n)
+        for email in self.data_loader.get_emails_by_receiver(person):
+            sender = email.get('sender', '')
+            if sender:
+                correspondents[sender] += 1
+        return correspondents
     
     def get_communication_patterns(self, person: str) -> Dict[str, Any]:
         """
@@ -83,16 +142,7 @@ class OrganizationalIntelligence:
         received = self.data_loader.get_emails_by_receiver(person)
         
         # Get most frequent correspondents
-        correspondents = Counter()
-        for email in sent:
-            for receiver in email.get('receiver', []):
-                if receiver:
-                    correspondents[receiver] += 1
-        
-        for email in received:
-            sender = email.get('sender', '')
-            if sender:
-                correspondents[sender] += 1
+        correspondents = self.get_correspondents(person)
         
         # Get time-based patterns
         sent_times = [e.get('parsed_timestamp') for e in sent if e.get('parsed_timestamp')]
@@ -139,23 +189,32 @@ class OrganizationalIntelligence:
         
         return clusters
     
-    def get_organizational_insights(self) -> Dict[str, Any]:
+    def get_organizational_insights(self, approximate: bool = False) -> Dict[str, Any]:
         """
         Generate high-level organizational insights.
         
+        Args:
+            approximate: Compute them from sketches, with error bounds
+        
         Returns:
             Dictionary with various organizational metrics
         """
+        if approximate:
+            with self._sketches_lock:
+                return self._fold_sketches().insights(10)
+        
         emails = self.data_loader.emails
         
         # Basic statistics
         total_emails = len(emails)
-        unique_senders = len(self.data_loader.get_all_senders())
-        unique_receivers = len(self.data_loader.get_all_receivers())
+        unique_senders, unique_receivers = self.data_loader.get_address_counts()
         
         # Communication volume over time
         date_range = self.data_loader.get_date_range()
         
+        with self._network_lock:
+            network_size = len(self._fold_network())
+        
         # Average response time (if we can determine threads)
         # This is a simplified version
         
@@ -168,5 +227,5 @@ class OrganizationalIntelligence:
                 'latest': date_range[1].isoformat() if date_range[1] else None
             },
             'top_communicators': self.get_top_communicators(10),
-            'communication_network_size': len(self.get_communication_network())
+            'communication_network_size': network_size
         }
@@ -0,0 +1,122 @@
+"""
+Searchable directory of everyone in the email data.
+"""
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.data_loader import EmailDataLoader
+
+_TOKEN_SPLIT = re.compile(r"[.@_\-+']+")
+
+# Sorts after every character that can appear in an address
+_PREFIX_END = "\uffff"
+
+
+class PeopleDirectory:
+    """
+    Sorted, prefix-searchable list of addresses with per-person counts.
+
+    Addresses are kept in one sorted array, so a prefix search is a pair of
+    binary searches and a page is a slice. Name parts ("smith" in
+    john.smith@enron.com) are kept in a second sorted array of (token,
+    position) pairs so type-ahead also matches surnames and domains. The
+    directory is rebuilt when the data changes in a way that adds addresses.
+    """
+
+    def __init__(self, data_loader: EmailDataLoader):
+        """
+        Initialize the people directory.
+
+        Args:
+            data_loader: EmailDataLoader instance (with sender/receiver indexes)
+        """
+        self.data_loader = data_loader
+        self._version = None
+        self._lock = threading.Lock()
+        self.addresses: List[str] = []
+        self._tokens: List[Tuple[str, int]] = []
+
+    def _shape(self) -> Tuple[int, int, int]:
+        """
+        Changes whenever the set of addresses may have changed.
+
+        Index keys are only ever added, so appended emails that introduce no
+        new address leave the arrays valid; counts are read live from the
+        loader's indexes.
+        """
+        loader = self.data_loader
+        return loader.epoch, len(loader.sender_index), len(loader.receiver_index)
+
+    def _sync(self):
+        """Rebuild the arrays if the set of addresses changed."""
+        self.data_loader.load()
+        if self._version == self._shape():
+            return
+        with self._lock:
+            shape = self._shape()
+            if self._version == shape:
+                return
+            addresses = sorted(self.data_loader.get_all_addresses())
+            tokens = []
+            for position, address in enumerate(addresses):
+                parts = _TOKEN_SPLIT.split(address) + [address.partition("@")[2]]
+                for token in dict.fromkeys(t for t in parts if t):
+                    tokens.append((token, position))
+            tokens.sort()
+            self.addresses, self._tokens = addresses, tokens
+            self._version = shape
+
+    def _entry(self, address: str) -> Dict[str, Any]:
+        sent = len(self.data_loader.sender_index.get(address, ()))
+        received = len(self.data_loader.receiver_index.get(address, ()))
+        return {"email": address, "sent": sent, "received": received, "total": sent + received}
+
+    def _prefix_range(self, keys: List[Any], prefix: Any, end: Any) -> Tuple[int, int]:
+        return bisect_left(keys, prefix), bisect_right(keys, end)
+
+    def _matches(self, query: str) -> List[int]:
+        """Sorted positions of addresses matching the query by address or name-part prefix."""
+        start, stop = self._prefix_range(self.addresses, query, query + _PREFIX_END)
+        positions = set(range(start, stop))
+        start, stop = self._prefix_range(self._tokens, (query,), (query + _PREFIX_END,))
+        positions.update(position for _, position in self._tokens[start:stop])
+        return sorted(positions)
+
+    def search(self, query: str = "", limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Search people by address or name-part prefix, one page at a time.
+
+        Args:
+            query: Prefix to match (empty lists everyone)
+            limit: Maximum people per page
+            cursor: The "next_cursor" of the previous page
+
+        Returns:
+            Dictionary with the page of people (address and sent/received
+            counts, in address order), the total number of matches and the
+            cursor of the next page (None on the last page)
+        """
+        self._sync()
+        addresses = self.addresses
+        query = query.strip().lower()
+        limit = max(1, limit)
+
+        if not query:
+            start = bisect_right(addresses, cursor) if cursor else 0
+            page = addresses[start:start + limit]
+            total = len(addresses)
+            has_more = start + limit < len(addresses)
+        else:
+            matches = self._matches(query)
+            start = bisect_right(matches, bisect_right(addresses, cursor) - 1) if cursor else 0
+            page = [addresses[i] for i in matches[start:start + limit]]
+            total = len(matches)
+            has_more = start + limit < len(matches)
+
+        return {
+            "people": [self._entry(address) for address in page],
+            "count": total,
+            "next_cursor": page[-1] if has_more and page else None
+        }
@@ -0,0 +1,310 @@
+"""
+Opt-in memory and CPU profiling of a running process.
+
+- `MemoryProfiler` wraps tracemalloc: allocations are grouped by the project
+  module that made them, and snapshots can be dumped to a file that
+  `tracemalloc.Snapshot.load()` reads back.
+- `SamplingProfiler` samples the stacks of all threads with
+  sys._current_frames() for a fixed time, so the live traffic of the other
+  threads is profiled. Stacks are written in the collapsed format
+  (`frame;frame;frame count`) that flame graph tools read.
+- `structure_sizes()` reports the approximate size of every cache and
+  index held by the API state.
+
+Nothing is traced or sampled unless profiling is enabled.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from types import ModuleType, FunctionType, BuiltinFunctionType, MethodType
+from typing import Dict, Any, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Immutable scalars: measured without identity tracking
+_SCALARS = (int, float, bool, type(None), complex)
+
+# Objects never worth descending into when estimating sizes
+_OPAQUE = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType,
+           type(threading.Lock()), type(threading.RLock()), threading.Thread)
+
+
+def _module_name(filename: str) -> str:
+    """Short module name for a source file (project files relative to the root)."""
+    if filename.startswith(PROJECT_ROOT):
+        return os.path.relpath(filename, PROJECT_ROOT).replace(os.sep, "/")
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        position = filename.find(marker)
+        if position != -1:
+            return filename[position + len(marker):].split(os.sep, 1)[-1].replace(os.sep, "/")
+    return os.path.basename(filename)
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots grouped by the project module that allocated."""
+
+    def __init__(self, frames: int = 16):
+        """
+        Initialize the memory profiler.
+
+        Args:
+            frames: Stack frames stored per allocation; more frames attribute
+                allocations made inside the standard library (e.g. json) to
+                the project code that called it
+        """
+        self.frames = frames
+
+    @classmethod
+    def from_env(cls) -> "MemoryProfiler":
+        """Build a profiler with PROFILING_TRACEMALLOC_FRAMES frames per allocation."""
+        return cls(frames=int(os.getenv("PROFILING_TRACEMALLOC_FRAMES", 16)))
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Start tracing allocations (only allocations made afterwards are seen)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        """Stop tracing and free the tracing data."""
+        tracemalloc.stop()
+
+    @staticmethod
+    def _owner(traceback: tracemalloc.Traceback) -> str:
+        """The innermost project frame of an allocation, or its innermost frame."""
+        for frame in reversed(traceback):  # Tracebacks run from the oldest call
+            if frame.filename.startswith(PROJECT_ROOT):
+                return _module_name(frame.filename)
+        return _module_name(traceback[-1].filename)
+
+    def report(self, top: int = 30) -> Dict[str, Any]:
+        """
+        Summarize live allocations.
+
+        Args:
+            top: Number of modules and lines to list
+
+        Returns:
+            Dictionary with traced totals, allocations grouped by project
+            module and the largest allocating lines
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not running. Start the API with --trace-memory "
+                               "or set PROFILING_TRACEMALLOC=true.")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        by_module: Dict[str, List[int]] = {}
+        for stat in snapshot.statistics("traceback"):
+            totals = by_module.setdefault(self._owner(stat.traceback), [0, 0])
+            totals[0] += stat.size
+            totals[1] += stat.count
+
+        current, peak = tracemalloc.get_traced_memory()
+        modules = sorted(by_module.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            "traced_mb": round(current / 1048576, 2),
+            "peak_traced_mb": round(peak / 1048576, 2),
+            "frames": tracemalloc.get_traceback_limit(),
+            "by_module": [{"module": module, "size_mb": round(size / 1048576, 3), "blocks": count}
+                          for module, (size, count) in modules],
+            "top_lines": [{
+                "line": f"{_module_name(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_mb": round(stat.size / 1048576, 3),
+                "blocks": stat.count
+            } for stat in snapshot.statistics("lineno")[:top]]
+        }
+
+    def dump(self, path: str) -> str:
+        """
+        Write a tracemalloc snapshot file.
+
+        Args:
+            path: Output path
+
+        Returns:
+            The path written
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not running.")
+        tracemalloc.take_snapshot().dump(path)
+        return path
+
+
+class SamplingProfiler:
+    """Statistical CPU profiler over the stacks of all threads."""
+
+    # One profile at a time per process
+    _running = threading.Lock()
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        """
+        Initialize the sampling profiler.
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Deepest stack recorded per sample
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({_module_name(code.co_filename)}:{code.co_firstlineno})"
+
+    def _stack(self, frame) -> Tuple[str, ...]:
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._frame_label(frame))
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+    def profile(self, seconds: float) -> Dict[str, Any]:
+        """
+        Sample every other thread for a number of seconds.
+
+        Args:
+            seconds: How long to sample
+
+        Returns:
+            Dictionary with the sample count, collapsed stacks and the
+            functions with the most samples on top of the stack (self) and
+            anywhere in it (total)
+        """
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A CPU profile is already running.")
+        try:
+            own = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    stack = self._stack(frame)
+                    if stack:
+                        stacks[stack] += 1
+                samples += 1
+                time.sleep(self.interval)
+        finally:
+            self._running.release()
+
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+        return {
+            "seconds": seconds,
+            "interval": self.interval,
+            "samples": samples,
+            "stacks": stacks,
+            "top_self": self_counts.most_common(30),
+            "top_total": total_counts.most_common(30)
+        }
+
+    @staticmethod
+    def collapsed(result: Dict[str, Any]) -> str:
+        """Collapsed stack lines (`frame;frame count`) for flame graph tools."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in
+                       sorted(result["stacks"].items(), key=lambda item: item[1], reverse=True))
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None, sample: int = 1000, _depth: int = 0) -> int:
+    """
+    Approximate memory used by an object and everything it references.
+
+    Objects in `seen` are not counted again, so measuring several structures
+    with one set attributes shared objects to the first. Containers larger
+    than `sample` are estimated from evenly spaced items.
+
+    Args:
+        obj: Object to measure
+        seen: Ids of objects already counted
+        sample: Largest container measured item by item
+
+    Returns:
+        Size in bytes
+    """
+    if isinstance(obj, _SCALARS):
+        return sys.getsizeof(obj)
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, _OPAQUE) or _depth > 40:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        items = obj.items()
+        if len(obj) > sample:
+            items = list(items)
+            step = len(items) / sample
+            chosen = [items[int(i * step)] for i in range(sample)]
+            measured = sum(deep_sizeof(k, seen, sample, _depth + 1) + deep_sizeof(v, seen, sample, _depth + 1)
+                           for k, v in chosen)
+            return size + int(measured * len(obj) / max(1, len(chosen)))
+        return size + sum(deep_sizeof(k, seen, sample, _depth + 1) + deep_sizeof(v, seen, sample, _depth + 1)
+                          for k, v in items)
+
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        if len(obj) > sample:
+            values = list(obj) if not isinstance(obj, (list, tuple)) else obj
+            step = len(values) / sample
+            chosen = [values[int(i * step)] for i in range(sample)]
+            measured = sum(deep_sizeof(item, seen, sample, _depth + 1) for item in chosen)
+            return size + int(measured * len(values) / sample)
+        return size + sum(deep_sizeof(item, seen, sample, _depth + 1) for item in obj)
+
+    if hasattr(obj, "__dict__") and not isinstance(obj, (str, bytes, bytearray)):
+        size += deep_sizeof(vars(obj), seen, sample, _depth + 1)
+    return size
+
+
+def structure_sizes(structures: List[Tuple[str, Any]], sample: int = 1000) -> Dict[str, Any]:
+    """
+    Approximate sizes of named structures, counting shared objects once.
+
+    Args:
+        structures: (name, object) pairs, measured in order
+        sample: Largest container measured item by item
+
+    Returns:
+        Dictionary with each structure's size and item count, and the
+        process's resident memory where available
+    """
+    seen: set = set()
+    report = []
+    for name, obj in structures:
+        if obj is None:
+            continue
+        start = time.perf_counter()
+        size = deep_sizeof(obj, seen, sample)
+        report.append({
+            "name": name,
+            "size_mb": round(size / 1048576, 3),
+            "items": len(obj) if hasattr(obj, "__len__") else None,
+            "seconds": round(time.perf_counter() - start, 3)
+        })
+    return {"structures": report, "rss_mb": process_rss_mb(), "sample": sample}
+
+
+def process_rss_mb() -> Optional[float]:
+    """Current resident set size of this process, where the platform exposes it."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
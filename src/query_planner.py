@@ -0,0 +1,250 @@
+"""
+Query planner that answers structured questions directly from the data.
+
+Questions such as "who emails X the most" or "how many emails did Y send
+in May" have exact answers in the loader indexes and organizational
+analytics. The planner recognizes them and answers without an LLM call;
+anything it does not recognize falls through to the AI.
+"""
+import calendar
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from src.data_loader import EmailDataLoader
+from src.organizational_intelligence import OrganizationalIntelligence
+
+# An email address, or a one- or two-word name that is not one of the
+# surrounding question words
+_NAME_STOPWORDS = r"(?!(?:the|most|to|in|during|send|sent|write|written|receive|received|get|got|e-?mail|message|contact)\b)"
+_ADDRESS = (r"(?P<{name}>[\w.+'-]+@[\w-]+(?:\.[\w-]+)+|" + _NAME_STOPWORDS + r"[a-z][\w.'-]*"
+            r"(?: " + _NAME_STOPWORDS + r"[a-z][\w.'-]*)?)")
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_PERIOD = re.compile(
+    r"\b(?:in|during)\s+(?:(?P<month>" + "|".join(sorted(_MONTHS, key=len, reverse=True)) +
+    r")\b\.?(?:\s+(?P<month_year>\d{4}))?|(?P<year>\d{4}))\b",
+    re.IGNORECASE
+)
+
+
+def _person(name: str) -> str:
+    return _ADDRESS.format(name=name)
+
+
+def _question(body: str, period: bool = True) -> re.Pattern:
+    """
+    A pattern for a whole question: the body, then optionally a period
+    ("in May 2001") and trailing punctuation. Questions with anything else
+    (a topic, a reason) are left to the AI.
+    """
+    tail = r"(?:\s+" + _PERIOD.pattern + r")?" if period else ""
+    return re.compile(r"\s*" + body + tail + r"\s*[?.!]*\s*", re.IGNORECASE)
+
+
+class QueryPlanner:
+    """Recognize structured questions and answer them exactly."""
+
+    def __init__(self, data_loader: EmailDataLoader, org_intelligence: OrganizationalIntelligence):
+        """
+        Initialize the planner.
+
+        Args:
+            data_loader: EmailDataLoader instance (with sender/receiver indexes)
+            org_intelligence: OrganizationalIntelligence over the same data
+        """
+        self.data_loader = data_loader
+        self.org_intelligence = org_intelligence
+        # Most specific patterns first; each must match the whole question
+        self.intents: List[Tuple[str, re.Pattern, Callable[..., Optional[Dict[str, Any]]]]] = [
+            ("count_between", _question(
+                r"how many (?:e-?mails|messages) did " + _person("sender") +
+                r" (?:send|write) to " + _person("receiver")), self._count_between),
+            ("count_sent", _question(
+                r"how many (?:e-?mails|messages) (?:did|has) " + _person("person") +
+                r" (?:send|sent|write|written)"), self._count_sent),
+            ("count_received", _question(
+                r"how many (?:e-?mails|messages) (?:did|has) " + _person("person") +
+                r" (?:receive|received|get|got)"), self._count_received),
+            ("top_senders_to", _question(
+                r"who (?:e-?mails|emailed|writes to|wrote to|sends (?:the most )?(?:e-?mails )?to|messages|contacts) " +
+                _person("person") + r" (?:the )?most"), self._top_senders_to),
+            ("top_recipients_of", _question(
+                r"who (?:does|did) " + _person("person") +
+                r" (?:e-?mail|write to|send (?:the most )?(?:e-?mails )?to|message|contact) (?:the )?most"),
+                self._top_recipients_of),
+            # Top communicators and the total are over all time, so no period
+            ("top_communicators", _question(
+                r"(?:who are the (?:top|most active|biggest) (?:(?P<n>\d+) )?(?:communicators|emailers|senders)"
+                r"|(?:the )?top (?P<n2>\d+)? ?communicators)", period=False), self._top_communicators),
+            ("total_emails", _question(
+                r"(?:how many (?:e-?mails|messages) (?:are there|do we have)(?: in total)?"
+                r"|how many (?:e-?mails|messages) (?:are )?in (?:total|the (?:dataset|corpus|archive))"
+                r"|(?:what is )?(?:the )?total number of (?:e-?mails|messages))", period=False), self._total_emails),
+        ]
+
+    def _resolve_person(self, text: str) -> Optional[str]:
+        """
+        Resolve an address or a name fragment to a known email address.
+
+        Names match the local part of addresses (spaces read as dots); the
+        busiest matching address wins.
+        """
+        text = text.strip().strip("?.,'\"").lower()
+        if not text:
+            return None
+        senders = self.data_loader.sender_index
+        receivers = self.data_loader.receiver_index
+        if "@" in text:
+            return text if text in senders or text in receivers else None
+
+        fragment = re.sub(r"\s+", ".", text)
+        best, best_count = None, 0
+        for address in self.data_loader.get_all_addresses():
+            if fragment in address.split("@")[0]:
+                count = len(senders.get(address, [])) + len(receivers.get(address, []))
+                if count > best_count:
+                    best, best_count = address, count
+        return best
+
+    @staticmethod
+    def _period(question: str) -> Optional[Dict[str, int]]:
+        match = _PERIOD.search(question)
+        if not match:
+            return None
+        if match.group("month"):
+            period = {"month": _MONTHS[match.group("month").lower()]}
+            if match.group("month_year"):
+                period["year"] = int(match.group("month_year"))
+            return period
+        return {"year": int(match.group("year"))}
+
+    @staticmethod
+    def _describe_period(period: Optional[Dict[str, int]]) -> str:
+        if not period:
+            return ""
+        parts = []
+        if "month" in period:
+            parts.append(calendar.month_name[period["month"]])
+        if "year" in period:
+            parts.append(str(period["year"]))
+        return " in " + " ".join(parts)
+
+    def _in_period(self, positions: List[int], period: Optional[Dict[str, int]]) -> List[Dict[str, Any]]:
+        emails = [self.data_loader.emails[i] for i in positions]
+        if not period:
+            return emails
+        selected = []
+        for email in emails:
+            ts = email.get('parsed_timestamp')
+            if ts is None:
+                continue
+            if "month" in period and ts.month != period["month"]:
+                continue
+            if "year" in period and ts.year != period["year"]:
+                continue
+            selected.append(email)
+        return selected
+
+    def _count_between(self, question, match) -> Optional[Dict[str, Any]]:
+        sender = self._resolve_person(match.group("sender"))
+        receiver = self._resolve_person(match.group("receiver"))
+        if not sender or not receiver:
+            return None
+        period = self._period(question)
+        emails = self._in_period(self.data_loader.sender_index.get(sender, []), period)
+        count = sum(1 for e in emails if receiver in (r.lower() for r in e.get('receiver', [])))
+        return {
+            "answer": f"{sender} sent {count} emails to {receiver}{self._describe_period(period)}.",
+            "data": {"sender": sender, "receiver": receiver, "count": count, "period": period}
+        }
+
+    def _count_sent(self, question, match) -> Optional[Dict[str, Any]]:
+        person = self._resolve_person(match.group("person"))
+        if not person:
+            return None
+        period = self._period(question)
+        count = len(self._in_period(self.data_loader.sender_index.get(person, []), period))
+        return {
+            "answer": f"{person} sent {count} emails{self._describe_period(period)}.",
+            "data": {"person": person, "count": count, "period": period}
+        }
+
+    def _count_received(self, question, match) -> Optional[Dict[str, Any]]:
+        person = self._resolve_person(match.group("person"))
+        if not person:
+            return None
+        period = self._period(question)
+        count = len(self._in_period(self.data_loader.receiver_index.get(person, []), period))
+        return {
+            "answer": f"{person} received {count} emails{self._describe_period(period)}.",
+            "data": {"person": person, "count": count, "period": period}
+        }
+
+    def _top_senders_to(self, question, match) -> Optional[Dict[str, Any]]:
+        person = self._resolve_person(match.group("person"))
+        if not person:
+            return None
+        period = self._period(question)
+        counts = Counter(e.get('sender', '').lower() for e in
+                         self._in_period(self.data_loader.receiver_index.get(person, []), period)
+                         if e.get('sender'))
+        top = counts.most_common(5)
+        if not top:
+            return {"answer": f"Nobody emailed {person}{self._describe_period(period)}.",
+                    "data": {"person": person, "top": [], "period": period}}
+        lines = "\n".join(f"{i}. {sender}: {count} emails" for i, (sender, count) in enumerate(top, 1))
+        return {
+            "answer": f"People who email {person} the most{self._describe_period(period)}:\n{lines}",
+            "data": {"person": person, "top": top, "period": period}
+        }
+
+    def _top_recipients_of(self, question, match) -> Optional[Dict[str, Any]]:
+        person = self._resolve_person(match.group("person"))
+        if not person:
+            return None
+        period = self._period(question)
+        counts = Counter(r.lower() for e in
+                         self._in_period(self.data_loader.sender_index.get(person, []), period)
+                         for r in e.get('receiver', []) if r)
+        top = counts.most_common(5)
+        if not top:
+            return {"answer": f"{person} sent no emails{self._describe_period(period)}.",
+                    "data": {"person": person, "top": [], "period": period}}
+        lines = "\n".join(f"{i}. {receiver}: {count} emails" for i, (receiver, count) in enumerate(top, 1))
+        return {
+            "answer": f"People {person} emails the most{self._describe_period(period)}:\n{lines}",
+            "data": {"person": person, "top": top, "period": period}
+        }
+
+    def _top_communicators(self, question, match) -> Optional[Dict[str, Any]]:
+        top_n = int(match.group("n") or match.group("n2") or 10)
+        top = self.org_intelligence.get_top_communicators(top_n)
+        lines = "\n".join(f"{i}. {email}: {count} communications" for i, (email, count) in enumerate(top, 1))
+        return {"answer": f"Top {len(top)} communicators:\n{lines}", "data": {"top": top}}
+
+    def _total_emails(self, question, match) -> Optional[Dict[str, Any]]:
+        total = self.data_loader.get_email_count()
+        return {"answer": f"There are {total} emails in the dataset.", "data": {"count": total}}
+
+    def answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a structured question exactly.
+
+        Args:
+            question: User question
+
+        Returns:
+            Dictionary with "intent", "answer" text and structured "data",
+            or None if the question is not a recognized structured question
+        """
+        self.data_loader.load()
+        for intent, pattern, handler in self.intents:
+            match = pattern.fullmatch(question)
+            if not match:
+                continue
+            result = handler(question, match)
+            if result is not None:
+                result["intent"] = intent
+                return result
+        return None
@@ -0,0 +1,183 @@
+"""
+Hot reload of the email store without restarting the API.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+
+from src.app_state import AppState
+
+
+class StateReloader:
+    """
+    Rebuild the application state in the background and swap it in.
+
+    The new state (records, indexes, analytics graph) is built on a
+    background thread while requests keep being served from the current
+    one. It is then published in a single assignment. Requests already
+    running hold the old state's components and finish against them. The
+    new state continues the old data version, so everything keyed on the
+    version (HTTP and LLM caches) sees the change.
+
+    A reload is started by `reload()` (e.g. from an admin endpoint) or by the
+    file watcher when the source JSON file changes. Emails ingested into the
+    current state are journaled and replayed into the new one.
+    """
+
+    def __init__(self, get_state: Callable[[], AppState], swap_state: Callable[[AppState], AppState],
+                 watch_interval: float = 0.0, close_delay: float = 30.0):
+        """
+        Initialize the reloader.
+
+        Args:
+            get_state: Returns the current state
+            swap_state: Publishes a new state and returns the previous one
+            watch_interval: Seconds between checks of the source file (0 disables watching)
+            close_delay: Seconds to keep the previous state's connections open
+                for requests still using them
+        """
+        self.get_state = get_state
+        self.swap_state = swap_state
+        self.watch_interval = watch_interval
+        self.close_delay = close_delay
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._watch_pid: Optional[int] = None
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, get_state: Callable[[], AppState],
+                 swap_state: Callable[[AppState], AppState]) -> "StateReloader":
+        """Build a reloader watching the source file every RELOAD_WATCH_INTERVAL seconds."""
+        return cls(get_state, swap_state, watch_interval=float(os.getenv("RELOAD_WATCH_INTERVAL", 0)))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def reload(self, wait: bool = False, reason: str = "manual") -> bool:
+        """
+        Start a reload unless one is already running.
+
+        Args:
+            wait: Block until the new state is live
+            reason: Recorded in the reload status
+
+        Returns:
+            True if a reload was started
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self._reload, args=(reason,),
+                                            name="state-reload", daemon=True)
+            self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join()
+        return True
+
+    def _reload(self, reason: str):
+        start = time.perf_counter()
+        current = self.get_state()
+        self.last_error = None
+        try:
+            new_state = current.reloaded()
+            new_state.ensure_loaded()
+            analytics = new_state.graph_analytics
+            if analytics is not None:
+                analytics.graph.build_adjacency()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Warning: Reload failed, keeping the current data: {e}")
+            return
+
+        # Emails ingested into the current state while this one was built
+        new_state.replay_journal()
+        previous = self.swap_state(new_state)
+        # and those ingested between that replay and the swap
+        new_state.replay_journal()
+        self.last_reload = {
+            "reason": reason,
+            "finished": datetime.now().isoformat(),
+            "seconds": round(time.perf_counter() - start, 3),
+            "data_version": new_state.data_loader.data_version,
+            "emails": len(new_state.data_loader.emails),
+            "source": new_state.load_info.get("source")
+        }
+        print(f"Reloaded {self.last_reload['emails']} emails ({reason}) "
+              f"in {self.last_reload['seconds']}s")
+
+        # Let requests still running against the previous state finish first
+        timer = threading.Timer(self.close_delay, previous.close)
+        timer.daemon = True
+        timer.start()
+
+    def status(self) -> Dict[str, Any]:
+        """Current data version and the outcome of the last reload."""
+        state = self.get_state()
+        return {
+            "running": self.running,
+            "data_version": state.data_loader.data_version,
+            "watching": self.watch_interval > 0,
+            "last_reload": self.last_reload,
+            "last_error": self.last_error
+        }
+
+    def ensure_watching(self):
+        """
+        Start the file watcher in this process if it is enabled and not running.
+
+        Called per request rather than at import, so that each forked server
+        worker gets its own watcher thread.
+        """
+        if self.watch_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+            threading.Thread(target=self._watch, name="state-watch", daemon=True).start()
+
+    def _signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.get_state().json_file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _watch(self):
+        """
+        Reload once the source file has changed and stopped changing.
+
+        Also picks up emails other processes added to the ingestion journal,
+        so every server worker sees them.
+        """
+        seen = self._signature()
+        pending = None
+        while True:
+            time.sleep(self.watch_interval)
+            state = self.get_state()
+            if state.data_loader.loaded and not self.running:
+                try:
+                    state.replay_journal()
+                except Exception as e:
+                    print(f"Warning: Could not replay the ingestion journal: {e}")
+            signature = self._signature()
+            if signature is None or signature == seen:
+                pending = None
+                continue
+            if not state.data_loader.loaded:
+                # Not loaded (or evicted): the next load reads the new file anyway
+                seen, pending = signature, None
+                continue
+            # Wait one more interval so a file still being written is not loaded
+            if signature != pending:
+                pending = signature
+                continue
+            if self.reload(wait=True, reason="file changed"):
+                seen = signature
+            pending = None
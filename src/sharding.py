@@ -0,0 +1,424 @@
+"""
+Sharded email store with scatter-gather queries across worker processes.
+"""
+import heapq
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.data_loader import EmailDataLoader
+from src.metrics import span
+from src.organizational_intelligence import OrganizationalIntelligence
+from src.sketches import EmailSketches
+from src.topic_index import TopicIndex
+
+MANIFEST_NAME = "manifest.json"
+
+
+def sender_shard(email: Dict[str, Any], num_shards: int) -> int:
+    """Shard of an email under the sender scheme (a stable hash of the sender)."""
+    return zlib.crc32(email.get("sender", "").lower().encode("utf-8")) % num_shards
+
+
+def split_corpus(emails: List[Dict[str, Any]], num_shards: int, scheme: str = "sender") -> List[List[Dict[str, Any]]]:
+    """
+    Partition emails into shards.
+
+    Args:
+        emails: Loaded emails (with parsed timestamps for the time scheme)
+        num_shards: Number of shards
+        scheme: "sender" puts all emails of a sender on one shard; "time"
+            gives each shard an equally sized, contiguous time range
+
+    Returns:
+        Emails of each shard
+    """
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(num_shards)]
+    if scheme == "sender":
+        for email in emails:
+            shards[sender_shard(email, num_shards)].append(email)
+    elif scheme == "time":
+        ordered = sorted(emails, key=_time_key)
+        size = -(-len(ordered) // num_shards) if ordered else 0
+        for index in range(num_shards):
+            shards[index] = ordered[index * size:(index + 1) * size]
+    else:
+        raise ValueError(f"Unknown shard scheme: {scheme}. Use 'sender' or 'time'.")
+    return shards
+
+
+def _time_key(email: Dict[str, Any]) -> float:
+    # Undated emails sort first
+    timestamp = email.get("parsed_timestamp")
+    return timestamp.timestamp() if timestamp else float("-inf")
+
+
+def write_shards(data_loader: EmailDataLoader, directory: str, num_shards: int,
+                 scheme: str = "sender") -> Dict[str, Any]:
+    """
+    Split a corpus into shard JSON files and write their manifest.
+
+    Args:
+        data_loader: Loader of the full corpus
+        directory: Output directory (created if missing)
+        num_shards: Number of shards
+        scheme: "sender" or "time" (see split_corpus)
+
+    Returns:
+        The manifest: scheme and each shard's file, email count and date range
+    """
+    emails = data_loader.load()
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"scheme": scheme, "shards": []}
+    for index, shard in enumerate(split_corpus(emails, num_shards, scheme)):
+        name = f"shard_{index:03d}.json"
+        records = [{key: value for key, value in email.items() if key != "parsed_timestamp"} for email in shard]
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        dates = [e["parsed_timestamp"] for e in shard if e.get("parsed_timestamp")]
+        manifest["shards"].append({
+            "file": name,
+            "emails": len(shard),
+            "earliest": min(dates).isoformat() if dates else None,
+            "latest": max(dates).isoformat() if dates else None
+        })
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """Read the manifest written by write_shards()."""
+    with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ShardWorker:
+    """
+    Answers partial queries over one shard.
+
+    Every result is a mergeable partial: counters are summed, sets are
+    united and top-k lists are merged by the coordinator.
+    """
+
+    def __init__(self, json_file_path: str):
+        """
+        Initialize the worker.
+
+        Args:
+            json_file_path: Shard JSON file
+        """
+        self.data_loader = EmailDataLoader(json_file_path)
+        self.data_loader.load()
+        self.org_intel = OrganizationalIntelligence(self.data_loader)
+        self.topic_index = TopicIndex(self.data_loader)
+
+    def ping(self) -> int:
+        """Number of emails in the shard."""
+        return len(self.data_loader.emails)
+
+    def stats(self) -> Dict[str, Any]:
+        """Email count, distinct senders and receivers, and date range."""
+        earliest, latest = self.data_loader.get_date_range()
+        return {
+            "emails": len(self.data_loader.emails),
+            "senders": self.data_loader.senders,
+            "receivers": self.data_loader.receivers,
+            "earliest": earliest,
+            "latest": latest
+        }
+
+    def search(self, keyword: str, limit: int = 50) -> Dict[str, Any]:
+        """Number of emails matching a keyword and the most recent `limit` of them."""
+        matches = self.data_loader.get_emails_by_keyword(keyword)
+        return {"total": len(matches), "emails": heapq.nlargest(limit, matches, key=_time_key)}
+
+    def emails_by_sender(self, sender: str) -> List[Dict[str, Any]]:
+        """Emails sent by an address."""
+        return self.data_loader.get_emails_by_sender(sender)
+
+    def communication_counts(self) -> Counter:
+        """Sent plus received emails per address."""
+        return self.data_loader.communication_counts
+
+    def network(self) -> Dict[str, Dict[str, int]]:
+        """Sender -> receiver email counts."""
+        return self.org_intel.get_communication_network()
+
+    def involvement(self, topic: str) -> Dict[str, Any]:
+        """Emails matching a topic and how many of them each person sent or received."""
+        indexed = self.topic_index.involvement(topic)
+        if indexed is None:
+            # Only stopwords: scan instead
+            matches = self.data_loader.get_emails_by_keyword(topic)
+            involvement = Counter()
+            for email in matches:
+                if email.get("sender"):
+                    involvement[email["sender"]] += 1
+                involvement.update(email.get("receiver", []))
+            return {"total": len(matches), "involvement": involvement}
+        involvement, total = indexed
+        return {"total": total, "involvement": involvement}
+
+    def sketches(self) -> EmailSketches:
+        """Streaming sketches of the shard, merged by the coordinator."""
+        return self.org_intel.get_sketches()
+
+
+# Operations a shard server answers; anything else is rejected
+OPERATIONS = ("ping", "stats", "search", "emails_by_sender", "communication_counts", "network", "involvement",
+              "sketches")
+
+
+def serve_shard(json_file_path: str, address: Any, authkey: bytes, ready=None):
+    """
+    Load a shard and answer requests on a multiprocessing listener until shut down.
+
+    Each connection is served on its own thread; a request is an
+    (operation, kwargs) tuple and the reply ("ok", result) or ("error", message).
+
+    Args:
+        json_file_path: Shard JSON file
+        address: Listener address, e.g. ("127.0.0.1", 0) for any free port
+        authkey: Key clients must present
+        ready: Connection the bound address is sent on once the shard is loaded
+    """
+    worker = ShardWorker(json_file_path)
+    listener = Listener(address, authkey=authkey)
+    if ready is not None:
+        ready.send(listener.address)
+        ready.close()
+    print(f"Shard {json_file_path} ({worker.ping()} emails) listening on {listener.address}")
+
+    stopping = threading.Event()
+
+    def handle(conn):
+        with conn:
+            while True:
+                try:
+                    operation, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if operation == "shutdown":
+                    conn.send(("ok", None))
+                    stopping.set()
+                    # Wake the accept loop so it sees the flag
+                    Client(listener.address, authkey=authkey).close()
+                    return
+                if operation not in OPERATIONS:
+                    conn.send(("error", f"Unknown operation: {operation}"))
+                    continue
+                try:
+                    conn.send(("ok", getattr(worker, operation)(**kwargs)))
+                except Exception as e:
+                    conn.send(("error", str(e)))
+
+    while not stopping.is_set():
+        try:
+            conn = listener.accept()
+        except (OSError, multiprocessing.AuthenticationError) as e:
+            print(f"Warning: Rejected shard connection: {e}")
+            continue
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    listener.close()
+
+
+class ShardClient:
+    """Connection to one shard server; requests on it are serialized."""
+
+    def __init__(self, address: Any, authkey: bytes):
+        self.address = address
+        self._conn = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+
+    def call(self, operation: str, **kwargs) -> Any:
+        """Run an operation on the shard and return its result."""
+        with self._lock:
+            self._conn.send((operation, kwargs))
+            status, result = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Shard {self.address}: {result}")
+        return result
+
+    def close(self):
+        self._conn.close()
+
+
+class ShardedCorpus:
+    """
+    Query a corpus split over shard servers by scatter-gather.
+
+    Each query is sent to every shard in parallel, the shards compute
+    partial results over their own emails (in their own processes, so on
+    separate cores), and the partials are merged here: counters are summed,
+    distinct-address sets united and top-k lists merged with a heap. The
+    results equal those of a single loader over the whole corpus.
+
+    Shard servers are started locally with `start()`, or run anywhere with
+    shard_corpus.py serve and reached by address.
+    """
+
+    def __init__(self, addresses: List[Any], authkey: bytes, scheme: Optional[str] = None):
+        """
+        Connect to running shard servers.
+
+        Args:
+            addresses: Listener address of each shard, in shard order
+            authkey: Key of the shard servers
+            scheme: Shard scheme ("sender" routes sender lookups to one shard)
+        """
+        self.scheme = scheme
+        self.clients = [ShardClient(address, authkey) for address in addresses]
+        self._processes: List[multiprocessing.Process] = []
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.clients)),
+                                            thread_name_prefix="shard-query")
+
+    @classmethod
+    def start(cls, directory: str, authkey: Optional[bytes] = None) -> "ShardedCorpus":
+        """
+        Start one local worker process per shard of a sharded directory.
+
+        Args:
+            directory: Directory written by write_shards()
+            authkey: Key for the shard servers (random by default)
+        """
+        manifest = read_manifest(directory)
+        authkey = authkey or os.urandom(16)
+        # Spawned rather than forked, so workers do not inherit the caller's threads
+        context = multiprocessing.get_context("spawn")
+        processes, addresses = [], []
+        for shard in manifest["shards"]:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=serve_shard, daemon=True, name=f"shard-{shard['file']}",
+                                      args=(os.path.join(directory, shard["file"]), ("127.0.0.1", 0),
+                                            authkey, sender))
+            process.start()
+            sender.close()
+            processes.append((process, receiver))
+        for process, receiver in processes:
+            try:
+                addresses.append(receiver.recv())
+            except EOFError:
+                for other, _ in processes:
+                    other.terminate()
+                raise RuntimeError(f"Shard worker {process.name} failed to start")
+        corpus = cls(addresses, authkey, scheme=manifest.get("scheme"))
+        corpus._processes = [process for process, _ in processes]
+        return corpus
+
+    def scatter(self, operation: str, **kwargs) -> List[Any]:
+        """Run an operation on every shard in parallel and return the partial results."""
+        with span(f"shards.{operation}"):
+            return list(self._executor.map(lambda client: client.call(operation, **kwargs), self.clients))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Email count, distinct senders and receivers, and date range of the whole corpus."""
+        partials = self.scatter("stats")
+        senders, receivers = set(), set()
+        for partial in partials:
+            senders |= partial["senders"]
+            receivers |= partial["receivers"]
+        earliest = [p["earliest"] for p in partials if p["earliest"]]
+        latest = [p["latest"] for p in partials if p["latest"]]
+        return {
+            "shards": len(partials),
+            "emails": sum(p["emails"] for p in partials),
+            "shard_emails": [p["emails"] for p in partials],
+            "unique_senders": len(senders),
+            "unique_receivers": len(receivers),
+            "earliest": min(earliest) if earliest else None,
+            "latest": max(latest) if latest else None
+        }
+
+    def search(self, keyword: str, limit: int = 50) -> Dict[str, Any]:
+        """
+        Keyword search over all shards.
+
+        Returns:
+            Total number of matches and the most recent `limit` matching emails
+        """
+        partials = self.scatter("search", keyword=keyword, limit=limit)
+        emails = heapq.nlargest(limit, (e for p in partials for e in p["emails"]), key=_time_key)
+        return {"keyword": keyword, "total": sum(p["total"] for p in partials), "emails": emails}
+
+    def get_emails_by_sender(self, sender: str) -> List[Dict[str, Any]]:
+        """Emails of a sender; asks only the owning shard under the sender scheme."""
+        if self.scheme == "sender":
+            shard = sender_shard({"sender": sender}, len(self.clients))
+            return self.clients[shard].call("emails_by_sender", sender=sender)
+        return [email for partial in self.scatter("emails_by_sender", sender=sender) for email in partial]
+
+    def get_top_communicators(self, top_n: int = 10) -> List[Tuple[str, int]]:
+        """Top communicators by sent plus received emails."""
+        totals = Counter()
+        for partial in self.scatter("communication_counts"):
+            totals.update(partial)
+        return totals.most_common(top_n)
+
+    def get_communication_network(self) -> Dict[str, Dict[str, int]]:
+        """Sender -> receiver email counts over all shards."""
+        network: Dict[str, Dict[str, int]] = {}
+        for partial in self.scatter("network"):
+            for sender, receivers in partial.items():
+                merged = network.setdefault(sender, {})
+                for receiver, count in receivers.items():
+                    merged[receiver] = merged.get(receiver, 0) + count
+        return network
+
+    def get_stakeholders(self, topic: str, top_n: int = 10) -> Dict[str, Any]:
+        """
+        People most involved in a topic, like CoordinatorAgent.get_stakeholders(topic=...).
+
+        Returns:
+            Topic, stakeholders with their involvement, and the number of matching emails
+        """
+        partials = self.scatter("involvement", topic=topic)
+        involvement = Counter()
+        for partial in partials:
+            involvement.update(partial["involvement"])
+        top = heapq.nlargest(top_n, involvement.items(), key=lambda item: item[1])
+        return {
+            "topic": topic,
+            "stakeholders": [{"email": email, "involvement": count} for email, count in top],
+            "total_emails": sum(p["total"] for p in partials)
+        }
+
+    def get_sketches(self) -> EmailSketches:
+        """
+        Sketches of the whole corpus, merged from those of the shards.
+
+        Each shard sends fixed-size sketches (plus 256 bytes per person)
+        instead of its full counts;
+        call insights() on the result for approximate insights.
+        """
+        partials = self.scatter("sketches")
+        merged = partials[0]
+        for partial in partials[1:]:
+            merged.merge(partial)
+        return merged
+
+    def close(self, shutdown: bool = True):
+        """
+        Disconnect, and stop the shard servers.
+
+        Args:
+            shutdown: Also stop the servers (always done for locally started ones)
+        """
+        for client in self.clients:
+            if shutdown or self._processes:
+                try:
+                    client.call("shutdown")
+                except (OSError, EOFError, RuntimeError):
+                    pass
+            client.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,449 @@
+"""
+Mergeable streaming sketches for approximate email analytics.
+"""
+import hashlib
+import heapq
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+def _hash64(value: str) -> int:
+    """Stable 64-bit hash, equal in every process so sketches can be merged."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class SpaceSaving:
+    """
+    Heavy hitters with bounded memory (Space-Saving, Metwally et al.).
+
+    At most `capacity` items are counted. A new item arriving when the
+    summary is full replaces the item with the smallest count and inherits
+    that count as its possible overestimate. Every estimate is at most
+    total / capacity too high, and any item with a true count above that
+    is guaranteed to be tracked. Items are kept in buckets by count, so a
+    unit update is O(1).
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialize the summary.
+
+        Args:
+            capacity: Most items counted at once
+        """
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # Count -> items with that count (a dict keeps insertion order)
+        self._buckets: Dict[int, Dict[Hashable, None]] = {}
+        self._min = 0
+        # Bound on untracked items carried over from merged summaries
+        self._floor = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _bucket_add(self, item: Hashable, count: int):
+        self._buckets.setdefault(count, {})[item] = None
+
+    def _bucket_remove(self, item: Hashable, count: int) -> bool:
+        """Remove an item from its bucket; True if the bucket became empty."""
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+            return True
+        return False
+
+    def add(self, item: Hashable, count: int = 1):
+        """Count an occurrence (or `count` occurrences) of an item."""
+        self.total += count
+        current = self.counts.get(item)
+        if current is not None:
+            emptied = self._bucket_remove(item, current)
+            self.counts[item] = current + count
+            self._bucket_add(item, current + count)
+            if emptied and current == self._min:
+                # Every other count is above the old minimum
+                self._min = current + 1 if count == 1 else min(self._buckets)
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            self._bucket_add(item, count)
+            self._min = count if len(self.counts) == 1 else min(self._min, count)
+            return
+        # Replace an item with the smallest count
+        floor = self._min
+        victim = next(iter(self._buckets[floor]))
+        emptied = self._bucket_remove(victim, floor)
+        del self.counts[victim], self.errors[victim]
+        self.counts[item] = floor + count
+        self.errors[item] = floor
+        self._bucket_add(item, floor + count)
+        if emptied:
+            self._min = floor + 1 if count == 1 else min(self._buckets)
+
+    @property
+    def max_error(self) -> int:
+        """Largest possible overestimate, and the largest possible count of an untracked item."""
+        return max(self._min if len(self.counts) >= self.capacity else 0, self._floor)
+
+    def estimate(self, item: Hashable) -> Tuple[int, int]:
+        """
+        Estimated count of an item.
+
+        Returns:
+            (estimate, maximum overestimate); the true count lies between
+            estimate - overestimate and estimate
+        """
+        if item in self.counts:
+            return self.counts[item], self.errors[item]
+        return self.max_error, self.max_error
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """The n items with the highest estimates, as (item, estimate, maximum overestimate)."""
+        top = heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+        return [(item, count, self.errors[item]) for item, count in top]
+
+    def top_is_exact(self, n: int) -> bool:
+        """Whether the top n items are certainly the true top n (not their order)."""
+        top = self.top(n + 1)
+        outside = max(top[n][1] if len(top) > n else 0, self.max_error)
+        return all(count - error >= outside for _, count, error in top[:n])
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Add another summary's counts into this one (Agarwal et al.).
+
+        An item missing from one summary is counted with that summary's
+        maximum error, so the merged bounds stay valid.
+        """
+        # Every merged count is at least this, so it bounds untracked items
+        floor = self.max_error + other.max_error
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            count, error = self.estimate(item)
+            other_count, other_error = other.estimate(item)
+            counts[item] = count + other_count
+            errors[item] = error + other_error
+        self.capacity = max(self.capacity, other.capacity)
+        kept = heapq.nlargest(self.capacity, counts.items(), key=lambda item: item[1])
+        self.total += other.total
+        self.counts = dict(kept)
+        self.errors = {item: errors[item] for item in self.counts}
+        self._buckets = {}
+        for item, count in self.counts.items():
+            self._bucket_add(item, count)
+        self._min = min(self._buckets) if self._buckets else 0
+        self._floor = floor
+        return self
+
+
+class HyperLogLog:
+    """
+    Distinct count estimate in 2^precision bytes (Flajolet et al.).
+
+    The standard error is 1.04 / sqrt(2^precision): about 1.6% with the
+    default precision of 12 (4 KB). Sketches of the same precision merge
+    by taking the register-wise maximum.
+    """
+
+    def __init__(self, precision: int = 12):
+        """
+        Initialize the sketch.
+
+        Args:
+            precision: log2 of the number of registers (4 to 16)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str):
+        """Add a value."""
+        h = _hash64(value)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of count() relative to the true count."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def count(self) -> int:
+        """Estimated number of distinct values added."""
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Add another sketch's values into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+
+class TDigest:
+    """
+    Quantiles of a stream in bounded memory (merging t-digest, Dunning).
+
+    Values are buffered and merged into at most about `compression`
+    centroids, which are small near the tails, so extreme quantiles are
+    the most accurate. Digests merge by re-clustering their centroids.
+    """
+
+    def __init__(self, compression: int = 100):
+        """
+        Initialize the digest.
+
+        Args:
+            compression: Accuracy/size trade-off (centroids kept is about this)
+        """
+        self.compression = compression
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        # (mean, weight), sorted by mean
+        self._centroids: List[Tuple[float, float]] = []
+        self._buffer: List[Tuple[float, float]] = []
+
+    def add(self, value: float, weight: float = 1):
+        """Add a value; the buffer is merged in once it holds 5x compression values."""
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        # Scale function k1: centroids shrink toward q = 0 and q = 1
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        merged = []
+        mean, weight = points[0]
+        cumulative = 0.0
+        limit = self._k(0.0) + 1
+        for point_mean, point_weight in points[1:]:
+            if self._k((cumulative + weight + point_weight) / total) <= limit:
+                mean += (point_mean - mean) * point_weight / (weight + point_weight)
+                weight += point_weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                limit = self._k(cumulative / total) + 1
+                mean, weight = point_mean, point_weight
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q: float) -> Tuple[Optional[float], float]:
+        """
+        Estimated q-quantile.
+
+        Returns:
+            (value, rank error): the value's rank is within the rank error
+            (as a fraction of the count) of q; it is half the weight of the
+            centroid the quantile falls in
+        """
+        self._compress()
+        if not self._centroids:
+            return None, 0.0
+        target = q * self.count
+        cumulative = 0.0
+        previous_mean, previous_center = self.min, 0.0
+        for mean, weight in self._centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + (mean - previous_mean) * fraction, weight / 2 / self.count
+            cumulative += weight
+            previous_mean, previous_center = mean, center
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        last_weight = self._centroids[-1][1]
+        return previous_mean + (self.max - previous_mean) * fraction, last_weight / 2 / self.count
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Add another digest's values into this one."""
+        other._compress()
+        if other.count:
+            self._buffer.extend(other._centroids)
+            self.count += other.count
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self._compress()
+        return self
+
+    def summary(self, quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)) -> Dict[str, Any]:
+        """Count, range and selected quantiles with their rank errors."""
+        values = {}
+        for q in quantiles:
+            value, rank_error = self.quantile(q)
+            values[f"p{q * 100:g}"] = {"value": round(value, 2) if value is not None else None,
+                                       "rank_error": round(rank_error, 4)}
+        return {"count": self.count, "min": self.min, "max": self.max, "quantiles": values}
+
+
+class EmailSketches:
+    """
+    Approximate analytics of an email stream in memory that does not grow
+    with the number of emails.
+
+    Heavy hitters (communicators, sender-receiver pairs) use Space-Saving,
+    distinct counts (senders, receivers, each person's correspondents) use
+    HyperLogLog, and distributions (recipients per email, body length) use
+    t-digests. Each email is folded in once, and sketches of different
+    shards or time ranges merge into the sketches of their union.
+    """
+
+    def __init__(self, capacity: int = 1000, precision: int = 12, person_precision: int = 8,
+                 compression: int = 100):
+        """
+        Initialize empty sketches.
+
+        Args:
+            capacity: Communicators counted exactly enough to rank (pairs get 5x)
+            precision: HyperLogLog precision of the corpus-wide distinct counts
+            person_precision: HyperLogLog precision per person (8 = 256 bytes, ~6.5% error)
+            compression: t-digest compression
+        """
+        self.emails = 0
+        self.earliest: Optional[datetime] = None
+        self.latest: Optional[datetime] = None
+        self.communicators = SpaceSaving(capacity)
+        self.pairs = SpaceSaving(capacity * 5)
+        self.senders = HyperLogLog(precision)
+        self.receivers = HyperLogLog(precision)
+        # Senders of at least one email with receivers (the network's nodes with edges out)
+        self.network_senders = HyperLogLog(precision)
+        self.person_precision = person_precision
+        self.correspondents: Dict[str, HyperLogLog] = {}
+        self.recipients = TDigest(compression)
+        self.body_length = TDigest(compression)
+
+    @classmethod
+    def from_env(cls) -> "EmailSketches":
+        """Build sketches sized by SKETCH_CAPACITY, SKETCH_PRECISION and SKETCH_PERSON_PRECISION."""
+        return cls(
+            capacity=int(os.getenv("SKETCH_CAPACITY", 1000)),
+            precision=int(os.getenv("SKETCH_PRECISION", 12)),
+            person_precision=int(os.getenv("SKETCH_PERSON_PRECISION", 8))
+        )
+
+    def _correspondent(self, person: str, other: str):
+        sketch = self.correspondents.get(person)
+        if sketch is None:
+            sketch = self.correspondents[person] = HyperLogLog(self.person_precision)
+        sketch.add(other)
+
+    def update(self, email: Dict[str, Any]):
+        """Fold one email into the sketches."""
+        self.emails += 1
+        timestamp = email.get("parsed_timestamp")
+        if timestamp:
+            self.earliest = timestamp if self.earliest is None else min(self.earliest, timestamp)
+            self.latest = timestamp if self.latest is None else max(self.latest, timestamp)
+        sender = email.get("sender", "")
+        receivers = [r for r in email.get("receiver", []) if r]
+        if sender:
+            self.communicators.add(sender)
+            self.senders.add(sender)
+            if receivers:
+                self.network_senders.add(sender)
+        for receiver in receivers:
+            self.communicators.add(receiver)
+            self.receivers.add(receiver)
+            if sender:
+                self.pairs.add((sender, receiver))
+                self._correspondent(sender, receiver)
+                self._correspondent(receiver, sender)
+        self.recipients.add(len(receivers))
+        self.body_length.add(len(email.get("body") or ""))
+
+    def merge(self, other: "EmailSketches") -> "EmailSketches":
+        """Add another set of sketches (another shard or time range) into this one."""
+        self.emails += other.emails
+        for bound, pick in (("earliest", min), ("latest", max)):
+            values = [v for v in (getattr(self, bound), getattr(other, bound)) if v is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self.communicators.merge(other.communicators)
+        self.pairs.merge(other.pairs)
+        self.senders.merge(other.senders)
+        self.receivers.merge(other.receivers)
+        self.network_senders.merge(other.network_senders)
+        for person, sketch in other.correspondents.items():
+            if person in self.correspondents:
+                self.correspondents[person].merge(sketch)
+            else:
+                self.correspondents[person] = HyperLogLog(sketch.precision).merge(sketch)
+        self.recipients.merge(other.recipients)
+        self.body_length.merge(other.body_length)
+        return self
+
+    def distinct_correspondents(self, person: str) -> Dict[str, Any]:
+        """Estimated number of people a person exchanged email with, and its standard error."""
+        sketch = self.correspondents.get(person)
+        if sketch is None:
+            return {"person": person, "estimate": 0, "standard_error": 0}
+        estimate = sketch.count()
+        return {"person": person, "estimate": estimate,
+                "standard_error": round(estimate * sketch.relative_error, 1)}
+
+    def get_top_pairs(self, top_n: int = 10) -> List[Dict[str, Any]]:
+        """The heaviest sender-receiver pairs with their maximum overestimates."""
+        return [{"sender": sender, "receiver": receiver, "count": count, "max_overcount": error}
+                for (sender, receiver), count, error in self.pairs.top(top_n)]
+
+    def insights(self, top_n: int = 10) -> Dict[str, Any]:
+        """
+        Organizational insights in the format of
+        OrganizationalIntelligence.get_organizational_insights(), with error bounds.
+
+        Returns:
+            The usual insight fields, "approximate": True, the error bounds
+            of the counts, and the recipient and body length distributions
+        """
+        top = self.communicators.top(top_n)
+        return {
+            "total_emails": self.emails,
+            "unique_senders": self.senders.count(),
+            "unique_receivers": self.receivers.count(),
+            "date_range": {
+                "earliest": self.earliest.isoformat() if self.earliest else None,
+                "latest": self.latest.isoformat() if self.latest else None
+            },
+            "top_communicators": [(email, count) for email, count, _ in top],
+            "communication_network_size": self.network_senders.count(),
+            "approximate": True,
+            "error_bounds": {
+                # One standard error; about 95% of estimates are within twice this
+                "distinct_counts_relative_error": round(self.senders.relative_error, 4),
+                "top_communicators_max_overcount": [error for _, _, error in top],
+                "top_communicators_exact_set": self.communicators.top_is_exact(top_n)
+            },
+            "distributions": {
+                "recipients_per_email": self.recipients.summary(),
+                "body_length": self.body_length.summary()
+            }
+        }
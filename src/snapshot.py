@@ -0,0 +1,88 @@
+"""
+Warm-state snapshots of the loaded email data.
+
+A snapshot is a single pickle file holding the parsed email records, the
+loader indexes and precomputed analytics. Reading one is much faster than
+parsing the JSON export and every timestamp again. The file is memory-mapped
+while it is unpickled, so it is read through the page cache instead of
+being copied into a separate buffer first. When the state is loaded in a
+pre-fork server master, workers share its pages copy-on-write.
+
+Each snapshot records the size and modification time of the JSON file it
+was built from and is ignored once that file changes.
+"""
+import gc
+import mmap
+import os
+import pickle
+from typing import Dict, Any, Optional
+
+# Bump when the layout of the snapshot contents changes
+SNAPSHOT_FORMAT = 2
+
+
+def source_signature(json_file_path: str) -> Dict[str, Any]:
+    """Identify the current contents of the source JSON file."""
+    stat = os.stat(json_file_path)
+    return {
+        "path": os.path.abspath(json_file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+
+
+def write_snapshot(path: str, json_file_path: str, state: Dict[str, Any]):
+    """
+    Write a snapshot atomically.
+
+    Args:
+        path: Snapshot file path
+        json_file_path: Source JSON file the state was built from
+        state: Picklable state, keyed by component
+    """
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "source": source_signature(json_file_path),
+        "state": state
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, json_file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a snapshot if it exists and matches the source file.
+
+    Args:
+        path: Snapshot file path
+        json_file_path: Source JSON file the snapshot must have been built from
+
+    Returns:
+        The stored state, or None if the snapshot is missing, stale or unreadable
+    """
+    if not os.path.exists(path) or not os.path.exists(json_file_path):
+        return None
+
+    # Unpickling creates millions of container objects; collection passes
+    # during the load only slow it down
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            payload = pickle.loads(mapped)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+        print(f"Warning: Ignoring unreadable snapshot {path}: {e}")
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if payload.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if payload.get("source") != source_signature(json_file_path):
+        return None
+    return payload["state"]
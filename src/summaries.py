@@ -0,0 +1,261 @@
+"""
+Precomputed per-person and per-thread summaries.
+
+`BatchSummarizer` summarizes people and threads offline with bounded
+parallelism and stores the results in a `SummaryStore`. Each summary is
+keyed by a fingerprint of the emails it was built from, so a rerun only
+re-summarizes entities whose mail changed, and request-time code can tell
+whether a stored summary is still current.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.data_loader import EmailDataLoader, get_email_id
+from src.context_builder import ContextBuilder, clean_body
+
+_REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd)\s*:\s*)+", re.IGNORECASE)
+
+
+def thread_key(subject: str) -> str:
+    """Normalize a subject line into a thread key (drops Re:/Fw: prefixes)."""
+    return re.sub(r"\s+", " ", _REPLY_PREFIX.sub("", subject or "")).strip().lower()
+
+
+def fingerprint(emails: List[Dict[str, Any]]) -> str:
+    """Order-independent fingerprint of a set of emails."""
+    digest = hashlib.sha1()
+    for email_id in sorted(set(get_email_id(email) for email in emails)):
+        digest.update(email_id.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SummaryStore:
+    """
+    JSON file of summaries keyed by entity kind and entity id.
+
+    The file is read again when its modification time changes, so a
+    running server picks up summaries written by a batch run.
+    """
+
+    def __init__(self, path: str = "summaries.json"):
+        """
+        Initialize the summary store.
+
+        Args:
+            path: Path of the JSON file holding summaries
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = self._file_mtime()
+        self._dirty = False
+        self.data = self._load()
+
+    @classmethod
+    def from_env(cls) -> "SummaryStore":
+        """Build a store at SUMMARY_STORE_PATH (default: summaries.json)."""
+        return cls(os.getenv("SUMMARY_STORE_PATH", "summaries.json"))
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _reload_if_changed(self):
+        """Read the file again if it changed since it was read or saved."""
+        mtime = self._file_mtime()
+        if mtime == self._mtime or self._dirty:
+            return
+        with self._lock:
+            if mtime != self._mtime and not self._dirty:
+                self.data = self._load()
+                self._mtime = mtime
+
+    def _load(self) -> Dict[str, Any]:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {"data_version": None, "people": {}, "threads": {}}
+
+    def save(self):
+        """Write the store atomically."""
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._mtime = self._file_mtime()
+            self._dirty = False
+
+    def get(self, kind: str, entity: str,
+            current_fingerprint: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a stored summary.
+
+        Args:
+            kind: "people" or "threads"
+            entity: Email address or thread key
+            current_fingerprint: If given, only return the summary if it was
+                built from exactly this set of emails
+
+        Returns:
+            Summary record, or None if missing or stale
+        """
+        self._reload_if_changed()
+        record = self.data.get(kind, {}).get(entity)
+        if record is None:
+            return None
+        if current_fingerprint is not None and record.get("fingerprint") != current_fingerprint:
+            return None
+        return record
+
+    def put(self, kind: str, entity: str, summary: str, entity_fingerprint: str,
+            email_count: int):
+        """Store a summary for an entity."""
+        with self._lock:
+            self._dirty = True
+            self.data.setdefault(kind, {})[entity] = {
+                "summary": summary,
+                "fingerprint": entity_fingerprint,
+                "email_count": email_count,
+                "updated": datetime.now().isoformat()
+            }
+
+
+class BatchSummarizer:
+    """Summarize people and threads offline, skipping unchanged entities."""
+
+    def __init__(self, data_loader: EmailDataLoader, async_llm, store: SummaryStore,
+                 context_builder: Optional[ContextBuilder] = None):
+        """
+        Initialize the batch summarizer.
+
+        Args:
+            data_loader: EmailDataLoader instance
+            async_llm: AsyncLLMClient used to run completions in parallel
+            store: Where summaries are kept
+            context_builder: Token counting and budgeting (default: from env)
+        """
+        self.data_loader = data_loader
+        self.async_llm = async_llm
+        self.store = store
+        self.context_builder = context_builder or ContextBuilder.from_env()
+
+    def group_by_person(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Emails each person sent or received, keyed by lowercased address like the loader indexes."""
+        groups = defaultdict(list)
+        for email in self.data_loader.load():
+            people = set(r.lower() for r in email.get('receiver', []) if r)
+            if email.get('sender'):
+                people.add(email['sender'].lower())
+            for person in people:
+                groups[person].append(email)
+        return groups
+
+    def group_by_thread(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Emails grouped by normalized subject."""
+        groups = defaultdict(list)
+        for email in self.data_loader.load():
+            key = thread_key(email.get('subject', ''))
+            if key:
+                groups[key].append(email)
+        return groups
+
+    def _prompt(self, kind: str, entity: str, emails: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the summarization prompt for one entity within the token budget."""
+        ordered = sorted(emails, key=lambda e: e['parsed_timestamp'].timestamp()
+                         if e.get('parsed_timestamp') else 0.0)
+        lines = []
+        used = 0
+        for email in reversed(ordered):  # Most recent mail first
+            body = clean_body(email.get('body', ''))[:1000]
+            line = (f"- {email.get('timestamp', '')} | {email.get('sender', '')} -> "
+                    f"{', '.join(email.get('receiver', []))} | {email.get('subject', '')}\n  {body}")
+            cost = self.context_builder.count_tokens(line)
+            if used + cost > self.context_builder.token_budget:
+                break
+            lines.append(line)
+            used += cost
+
+        if kind == "people":
+            task = (f"Summarize the role, main topics, key relationships and recent activity of "
+                    f"{entity} based on these {len(emails)} emails (most recent shown first).")
+        else:
+            task = (f"Summarize the email thread \"{entity}\": participants, what was discussed, "
+                    f"decisions made and open questions.")
+
+        return [
+            {"role": "system", "content": "You summarize organizational email for an AI Chief of Staff. "
+                                          "Be factual and concise (at most 150 words)."},
+            {"role": "user", "content": task + "\n\n" + "\n".join(lines)}
+        ]
+
+    def stale_entities(self, kind: str, groups: Dict[str, List[Dict[str, Any]]],
+                       min_emails: int = 1) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+        """Entities whose stored summary is missing or was built from different mail."""
+        stale = []
+        for entity, emails in groups.items():
+            if len(emails) < min_emails:
+                continue
+            entity_fingerprint = fingerprint(emails)
+            if self.store.get(kind, entity, entity_fingerprint) is None:
+                stale.append((entity, entity_fingerprint, emails))
+        return stale
+
+    def run(self, kinds: Tuple[str, ...] = ("people", "threads"), min_emails: int = 3,
+            batch_size: int = 50, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Summarize every stale person and/or thread.
+
+        Args:
+            kinds: Which entity kinds to summarize
+            min_emails: Skip entities with fewer emails than this
+            batch_size: Entities submitted per batch; the store is saved after each
+            limit: Optional cap on entities summarized per kind (busiest first)
+
+        Returns:
+            Counts of summarized, unchanged and failed entities per kind
+        """
+        report = {}
+        for kind in kinds:
+            groups = self.group_by_person() if kind == "people" else self.group_by_thread()
+            eligible = sum(1 for emails in groups.values() if len(emails) >= min_emails)
+            stale = self.stale_entities(kind, groups, min_emails)
+            unchanged = eligible - len(stale)
+            stale.sort(key=lambda item: len(item[2]), reverse=True)
+            if limit is not None:
+                stale = stale[:limit]
+
+            summarized = failed = 0
+            for start in range(0, len(stale), batch_size):
+                batch = stale[start:start + batch_size]
+                responses = self.async_llm.run(self.async_llm.complete_many(
+                    [self._prompt(kind, entity, emails) for entity, _, emails in batch],
+                    temperature=0.3, max_tokens=300
+                ))
+                for (entity, entity_fingerprint, emails), response in zip(batch, responses):
+                    if isinstance(response, Exception):
+                        failed += 1
+                        continue
+                    self.store.put(kind, entity, response, entity_fingerprint, len(emails))
+                    summarized += 1
+                self.store.save()
+
+            report[kind] = {
+                "summarized": summarized,
+                "failed": failed,
+                "unchanged": unchanged
+            }
+
+        self.store.data["data_version"] = fingerprint(self.data_loader.load())
+        self.store.save()
+        return report
@@ -0,0 +1,282 @@
+"""
+Serving several email corpora (tenants) from one deployment.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from src.app_state import AppState
+from src.profiling import structure_sizes
+from src.reloader import StateReloader
+
+# Tenant name used when TENANTS_CONFIG is not set
+DEFAULT_TENANT = "default"
+
+
+class TenantRegistry:
+    """
+    Lazily loaded per-tenant states, kept in an LRU under a memory budget.
+
+    Every tenant has its own AppState: loader, indexes, analytics, agents
+    and LLM cache. A tenant's state is created on its first request and
+    loads its data on first use. When the loaded tenants together exceed the
+    memory budget (or the maximum count), the least recently used are
+    evicted. An evicted tenant comes back from its warm-state snapshot, plus
+    its ingestion journal, on its next request. Requests already running
+    keep the evicted state until they finish.
+
+    The data version of a tenant continues across evictions and reloads,
+    so responses cached for earlier data are never served again.
+    """
+
+    def __init__(self, tenants: Dict[str, Dict[str, Any]], default: Optional[str] = None,
+                 memory_budget_mb: float = 0, max_loaded: int = 0,
+                 watch_interval: float = 0.0, close_delay: float = 30.0):
+        """
+        Initialize the registry.
+
+        Args:
+            tenants: Tenant name -> AppState arguments (json_file_path,
+                snapshot_path, graph_backend, journal_path)
+            default: Tenant served to requests that name none (None rejects them)
+            memory_budget_mb: Approximate memory for loaded tenants (0 = unlimited)
+            max_loaded: Most tenants loaded at once (0 = unlimited)
+            watch_interval: Seconds between source file checks per tenant (0 disables)
+            close_delay: Seconds before an evicted state's connections are closed
+        """
+        self.tenants = tenants
+        self.default = default
+        self.memory_budget_mb = memory_budget_mb
+        self.max_loaded = max_loaded
+        self.watch_interval = watch_interval
+        self.close_delay = close_delay
+        self._states: "OrderedDict[str, AppState]" = OrderedDict()
+        self._sizes: Dict[str, float] = {}
+        # Tenant -> data version its size was measured at
+        self._measured_versions: Dict[str, int] = {}
+        self._measuring = set()
+        self._versions: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._reloaders: Dict[str, StateReloader] = {}
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "TenantRegistry":
+        """
+        Build the registry from TENANTS_CONFIG, or a single tenant from the
+        usual JSON_FILE_PATH / STATE_SNAPSHOT_PATH settings.
+
+        TENANTS_CONFIG names a JSON file mapping tenant names to their
+        settings, e.g. {"acme": {"json_file_path": "data/acme.json"}}. A
+        tenant without a snapshot_path or journal_path gets them next to its
+        JSON file, so it can be evicted and reloaded quickly without losing
+        ingested emails.
+        """
+        budget = float(os.getenv("TENANT_MEMORY_BUDGET_MB", 0))
+        max_loaded = int(os.getenv("TENANT_MAX_LOADED", 0))
+        watch_interval = float(os.getenv("RELOAD_WATCH_INTERVAL", 0))
+        config_path = os.getenv("TENANTS_CONFIG")
+        if not config_path:
+            single = AppState.from_env()
+            return cls({DEFAULT_TENANT: {
+                "json_file_path": single.json_file_path,
+                "snapshot_path": single.snapshot_path,
+                "graph_backend": single.graph_backend,
+                "journal_path": single.journal.path if single.journal else None
+            }}, default=DEFAULT_TENANT, memory_budget_mb=budget, max_loaded=max_loaded,
+                watch_interval=watch_interval)
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        graph_backend = os.getenv("GRAPH_BACKEND", "neo4j")
+        tenants = {}
+        for name, settings in config.items():
+            json_file_path = settings["json_file_path"]
+            base = os.path.splitext(json_file_path)[0]
+            tenants[name] = {
+                "json_file_path": json_file_path,
+                "snapshot_path": settings.get("snapshot_path") or f"{base}.snapshot.pkl",
+                "graph_backend": settings.get("graph_backend", graph_backend),
+                "journal_path": settings.get("journal_path") or f"{base}.journal.jsonl"
+            }
+        return cls(tenants, default=os.getenv("DEFAULT_TENANT") or None, memory_budget_mb=budget,
+                   max_loaded=max_loaded, watch_interval=watch_interval)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tenants
+
+    def get(self, name: str) -> AppState:
+        """
+        The state of a tenant, creating it if it is not loaded.
+
+        Args:
+            name: Tenant name
+
+        Returns:
+            The tenant's AppState (its data loads on first use)
+        """
+        with self._lock:
+            state = self._states.get(name)
+            if state is None:
+                state = self._new_state(name)
+                self._states[name] = state
+            self._states.move_to_end(name)
+            self._last_used[name] = time.time()
+            return state
+
+    def _new_state(self, name: str) -> AppState:
+        if name not in self.tenants:
+            raise KeyError(f"Unknown tenant: {name}")
+        state = AppState(**self.tenants[name])
+        if name in self._versions:
+            # Past the evicted state's version, so its cached responses are not
+            # served before this state has loaded (its source may have changed)
+            state.data_loader.data_version = self._versions[name] + 1
+        return state
+
+    def peek(self, name: str) -> AppState:
+        """The loaded state of a tenant, or an unloaded one that is not kept."""
+        with self._lock:
+            return self._states.get(name) or self._new_state(name)
+
+    def swap(self, name: str, new_state: AppState) -> AppState:
+        """Replace a tenant's state (after a reload) and return the previous one."""
+        with self._lock:
+            previous = self._states.get(name) or self.peek(name)
+            self._states[name] = new_state
+            self._sizes.pop(name, None)
+            self._measured_versions.pop(name, None)
+            return previous
+
+    def reloader(self, name: str) -> StateReloader:
+        """The hot reloader of a tenant."""
+        with self._lock:
+            if name not in self._reloaders:
+                self._reloaders[name] = StateReloader(
+                    lambda: self.peek(name), lambda new_state: self.swap(name, new_state),
+                    watch_interval=self.watch_interval, close_delay=self.close_delay)
+            return self._reloaders[name]
+
+    def enforce_budget(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Measure tenants whose data changed since they were last measured,
+        and evict the least recently used ones while the budget is exceeded.
+
+        Measuring walks a tenant's structures, so it runs outside the
+        registry lock; requests for other tenants are not held up by it.
+
+        Args:
+            keep: Tenant never evicted (the one serving the current request)
+
+        Returns:
+            Names of the evicted tenants
+        """
+        if not self.memory_budget_mb and not self.max_loaded:
+            return []
+        with self._lock:
+            # Claimed so that concurrent requests do not measure them again
+            to_measure = [(name, state, state.data_loader.data_version)
+                          for name, state in self._states.items()
+                          if state.data_loader.loaded and name not in self._measuring
+                          and self._measured_versions.get(name) != state.data_loader.data_version]
+            self._measuring.update(name for name, _, _ in to_measure)
+        for name, state, version in to_measure:
+            try:
+                size = self._measure(state)
+            except Exception as e:
+                print(f"Warning: Could not measure tenant {name}: {e}")
+                size = None
+            with self._lock:
+                self._measuring.discard(name)
+                # Skip tenants evicted or reloaded while being measured
+                if size is not None and self._states.get(name) is state:
+                    self._sizes[name] = size
+                    self._measured_versions[name] = version
+
+        evicted = []
+        with self._lock:
+            while len(self._states) > 1:
+                over_count = self.max_loaded and len(self._states) > self.max_loaded
+                over_budget = self.memory_budget_mb and sum(self._sizes.values()) > self.memory_budget_mb
+                if not over_count and not over_budget:
+                    break
+                victim = next((name for name in self._states if name != keep), None)
+                if victim is None:
+                    break
+                self.evict(victim)
+                evicted.append(victim)
+        return evicted
+
+    @staticmethod
+    def _measure(state: AppState) -> float:
+        """Approximate memory of a tenant's loaded structures in MB."""
+        report = structure_sizes(state.memory_structures(), sample=200)
+        return round(sum(item["size_mb"] for item in report["structures"]), 1)
+
+    def evict(self, name: str):
+        """
+        Unload a tenant.
+
+        Its snapshot was written when it was first loaded from JSON, and
+        ingested emails are in its journal, so nothing needs saving here.
+        """
+        with self._lock:
+            state = self._states.pop(name, None)
+            self._sizes.pop(name, None)
+            self._measured_versions.pop(name, None)
+            if state is None:
+                return
+            self._versions[name] = state.data_loader.data_version
+            self.evictions += 1
+        print(f"Evicted tenant {name}")
+        timer = threading.Timer(self.close_delay, state.close)
+        timer.daemon = True
+        timer.start()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configured and loaded tenants with their approximate sizes."""
+        with self._lock:
+            loaded = [{
+                "tenant": name,
+                "emails": len(state.data_loader.emails),
+                "data_loaded": state.data_loader.loaded,
+                "size_mb": self._sizes.get(name),
+                "last_used": self._last_used.get(name)
+            } for name, state in reversed(self._states.items())]
+        return {
+            "tenants": sorted(self.tenants),
+            "default": self.default,
+            "loaded": loaded,
+            "memory_budget_mb": self.memory_budget_mb or None,
+            "max_loaded": self.max_loaded or None,
+            "evictions": self.evictions
+        }
+
+
+class TenantPathMiddleware:
+    """
+    WSGI middleware routing /t/<tenant>/... requests.
+
+    The prefix is removed from the path, so the normal routes serve the
+    request, and the tenant is passed on in the WSGI environ.
+    """
+
+    ENVIRON_KEY = "cos.tenant"
+
+    def __init__(self, wsgi_app, prefix: str = "/t/"):
+        self.wsgi_app = wsgi_app
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(self.prefix):
+            tenant, _, rest = path[len(self.prefix):].partition("/")
+            if tenant:
+                environ[self.ENVIRON_KEY] = tenant
+                environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + self.prefix + tenant
+                environ["PATH_INFO"] = "/" + rest
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,217 @@
+"""
+Inverted index from words to emails and the people involved in them.
+"""
+import heapq
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.data_loader import EmailDataLoader
+from src.metrics import span
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Fields searched, as in EmailDataLoader.get_emails_by_keyword
+SEARCH_FIELDS = ('subject', 'body')
+
+
+class TopicIndex:
+    """
+    Word -> email postings used to answer keyword searches for stakeholders.
+
+    A topic matches the same emails as EmailDataLoader.get_emails_by_keyword():
+    those whose subject or body contains it as a substring, ignoring case.
+    Every email's subject and body are split into lowercase words once, and
+    each word's posting list records the positions of the emails containing
+    it. The words of a topic narrow the candidates: a word in the middle of
+    the topic must appear whole, the first may end a longer word, the last
+    may begin one, and a one-word topic may be part of any word. The
+    candidates are then checked with the substring test, so answering costs
+    time proportional to the candidate emails rather than to the corpus.
+
+    The involvement counts (emails sent or received per person) of broad
+    topics are kept precomputed and updated with new emails, so ranking
+    their stakeholders is a top-k over that counter. The index is built on
+    first use and folds in appended emails on the next query, like the
+    other loader-derived aggregates.
+    """
+
+    def __init__(self, data_loader: EmailDataLoader, materialize_at: int = 200,
+                 max_materialized: int = 256):
+        """
+        Initialize the index.
+
+        Args:
+            data_loader: EmailDataLoader instance
+            materialize_at: Matching emails from which a topic's involvement
+                counts are kept precomputed
+            max_materialized: Most topics kept precomputed (least recently
+                used are dropped)
+        """
+        self.data_loader = data_loader
+        self.materialize_at = materialize_at
+        self.max_materialized = max_materialized
+        self._postings: Dict[str, array] = {}
+        # Lowercased topic -> (involvement, matching emails)
+        self._materialized: "OrderedDict[str, Tuple[Counter, int]]" = OrderedDict()
+        self._epoch = None
+        self._folded = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _add_involvement(involvement: Counter, email: Dict):
+        if email.get('sender'):
+            involvement[email['sender']] += 1
+        for receiver in email.get('receiver', []):
+            involvement[receiver] += 1
+
+    @staticmethod
+    def _matches(keyword: str, email: Dict) -> bool:
+        """The substring test of get_emails_by_keyword()."""
+        return any(field in email and keyword in str(email[field]).lower() for field in SEARCH_FIELDS)
+
+    def _sync(self):
+        """Index emails appended since the last call; call with _lock held."""
+        loader = self.data_loader
+        loader.load()
+        if self._epoch != loader.epoch:
+            self._postings = {}
+            self._materialized = OrderedDict()
+            self._epoch = loader.epoch
+            self._folded = 0
+        emails = loader.emails
+        end = len(emails)
+        if self._folded == end:
+            return
+        with span("topic_index.update"):
+            postings = self._postings
+            for position in range(self._folded, end):
+                email = emails[position]
+                words = set()
+                for field in SEARCH_FIELDS:
+                    if field in email:
+                        words.update(_WORD.findall(str(email[field]).lower()))
+                for word in words:
+                    posting = postings.get(word)
+                    if posting is None:
+                        posting = postings[word] = array("I")
+                    posting.append(position)
+                for keyword, (involvement, total) in self._materialized.items():
+                    if self._matches(keyword, email):
+                        self._add_involvement(involvement, email)
+                        self._materialized[keyword] = (involvement, total + 1)
+        self._folded = end
+
+    def refresh(self):
+        """Index the loaded emails now rather than on the next query."""
+        with self._lock:
+            self._sync()
+
+    def _expand(self, word: str, bounded_left: bool, bounded_right: bool) -> List[str]:
+        """Indexed words that a word of a topic can be part of."""
+        if bounded_left and bounded_right:
+            return [word] if word in self._postings else []
+        if bounded_left:
+            return [w for w in self._postings if w.startswith(word)]
+        if bounded_right:
+            return [w for w in self._postings if w.endswith(word)]
+        return [w for w in self._postings if word in w]
+
+    def _candidates(self, keyword: str) -> List[int]:
+        """Positions of emails that may contain the keyword, in email order."""
+        runs = list(_WORD.finditer(keyword))
+        candidate_sets = []
+        for match in runs:
+            words = self._expand(match.group(), match.start() > 0, match.end() < len(keyword))
+            positions = set()
+            for word in words:
+                positions.update(self._postings[word])
+            if not positions:
+                return []
+            candidate_sets.append(positions)
+        candidate_sets.sort(key=len)
+        candidates = candidate_sets[0]
+        for positions in candidate_sets[1:]:
+            candidates = candidates & positions
+            if not candidates:
+                return []
+        return sorted(candidates)
+
+    def _involvement_for(self, keyword: str) -> Tuple[Counter, int]:
+        """Involvement counter and matching email count; call with _lock held."""
+        if keyword in self._materialized:
+            self._materialized.move_to_end(keyword)
+            return self._materialized[keyword]
+        involvement = Counter()
+        total = 0
+        emails = self.data_loader.emails
+        for position in self._candidates(keyword):
+            email = emails[position]
+            if self._matches(keyword, email):
+                self._add_involvement(involvement, email)
+                total += 1
+        if total >= self.materialize_at:
+            # Kept up to date by _sync() from now on
+            self._materialized[keyword] = (involvement, total)
+            if len(self._materialized) > self.max_materialized:
+                self._materialized.popitem(last=False)
+        return involvement, total
+
+    @staticmethod
+    def _keyword(topic: str) -> Optional[str]:
+        """The lowercased topic, or None if it has no letters or digits to look up."""
+        if not topic or not isinstance(topic, str) or not topic.strip():
+            return None
+        keyword = topic.lower()
+        return keyword if _WORD.search(keyword) else None
+
+    def involvement(self, topic: str) -> Optional[Tuple[Dict[str, int], int]]:
+        """
+        How many emails about a topic each person sent or received.
+
+        Args:
+            topic: Keyword or phrase, matched like get_emails_by_keyword()
+
+        Returns:
+            (person -> email count, number of matching emails), or None if
+            the topic has no letters or digits to look up
+        """
+        keyword = self._keyword(topic)
+        if keyword is None:
+            return None
+        with self._lock:
+            self._sync()
+            involvement, total = self._involvement_for(keyword)
+            return dict(involvement), total
+
+    def top_stakeholders(self, topic: str, top_n: int = 10) -> Optional[Tuple[List[Tuple[str, int]], int]]:
+        """
+        The people most involved in a topic.
+
+        Args:
+            topic: Keyword or phrase, matched like get_emails_by_keyword()
+            top_n: Number of people to return
+
+        Returns:
+            ([(person, email count)], number of matching emails), or None
+            if the topic has no letters or digits to look up
+        """
+        keyword = self._keyword(topic)
+        if keyword is None:
+            return None
+        with self._lock:
+            self._sync()
+            involvement, total = self._involvement_for(keyword)
+            return heapq.nlargest(top_n, involvement.items(), key=lambda item: item[1]), total
+
+    def get_stats(self) -> Dict[str, int]:
+        """Indexed emails, distinct words, postings and precomputed topics."""
+        with self._lock:
+            return {
+                "emails": self._folded,
+                "words": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+                "materialized_topics": len(self._materialized)
+            }
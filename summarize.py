@@ -0,0 +1,62 @@
+"""
+Precompute per-person and per-thread summaries offline.
+
+Only people and threads whose emails changed since the last run are
+re-summarized. Run it after process_emails.py (or on a schedule) so that
+person profiles and queries can use the stored summaries.
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+from src.data_loader import EmailDataLoader
+from src.async_llm import AsyncLLMClient
+from src.summaries import SummaryStore, BatchSummarizer
+
+load_dotenv()
+
+
+def main():
+    """Summarize stale people and threads into the summary store."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kind", choices=["people", "threads", "all"], default="all",
+                        help="Which entities to summarize (default: all)")
+    parser.add_argument("--min-emails", type=int, default=3,
+                        help="Skip people/threads with fewer emails (default: 3)")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="Entities per parallel batch; the store is saved after each")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Summarize at most this many entities per kind, busiest first")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Batch Summarization")
+    print("=" * 60)
+    print()
+
+    json_file = os.getenv("JSON_FILE_PATH", "emails.json")
+    data_loader = EmailDataLoader(json_file)
+    print(f"Loading emails from {json_file}...")
+    print(f"Loaded {len(data_loader.load())} emails")
+
+    store = SummaryStore.from_env()
+    async_llm = AsyncLLMClient.from_env()
+    print(f"Summary store: {store.path}")
+    print(f"Parallel workers: {async_llm.max_concurrency}")
+    print()
+
+    kinds = ("people", "threads") if args.kind == "all" else (args.kind,)
+    try:
+        report = BatchSummarizer(data_loader, async_llm, store).run(
+            kinds=kinds, min_emails=args.min_emails,
+            batch_size=args.batch_size, limit=args.limit
+        )
+    finally:
+        async_llm.close()
+
+    for kind, counts in report.items():
+        print(f"{kind.capitalize()}: {counts['summarized']} summarized, "
+              f"{counts['unchanged']} unchanged, {counts['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Incrementally sync the email data into Neo4j.
+
+Only emails added since the last sync are written, in batches, so keeping
+the graph fresh costs time proportional to the new mail. Each email is
+recorded by id, so re-running a sync never counts an email twice.
+
+    python sync_graph.py                  # apply new emails once
+    python sync_graph.py --interval 300   # keep syncing every 5 minutes
+    python sync_graph.py --reset          # clear the graph and rebuild it
+
+The emails are read like the API reads them: from JSON_FILE_PATH (or the
+warm-state snapshot) plus the ingestion journal (INGEST_JOURNAL_PATH).
+"""
+import argparse
+import sys
+import time
+from dotenv import load_dotenv
+from src.app_state import AppState
+from src.neo4j_graph import Neo4jGraphDB
+from src.snapshot import source_signature
+
+load_dotenv()
+
+
+def sync_once(neo4j: Neo4jGraphDB, state: AppState, batch_size: int):
+    """Apply the emails of the state that are past the watermark."""
+    start = time.perf_counter()
+    emails = state.data_loader.emails
+    result = neo4j.sync(emails, batch_size=batch_size)
+    if result["rescanned"]:
+        print("Source changed since the last sync; checked every email again")
+    print(f"Applied {result['applied']} new emails "
+          f"(emails {result['start']}-{result['position']} of {len(emails)}) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    """Sync once or on an interval."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Seconds between syncs; 0 syncs once and exits (default: 0)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Emails per transaction (default: 500)")
+    parser.add_argument("--reset", action="store_true", help="Clear the graph and rebuild it from all emails")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Incremental Neo4j Sync")
+    print("=" * 60)
+    print()
+
+    state = AppState.from_env()
+    state.ensure_loaded()
+    signature = source_signature(state.json_file_path)
+
+    try:
+        neo4j = Neo4jGraphDB()
+        print("Connected to Neo4j")
+        if args.reset:
+            print("Clearing existing data...")
+            neo4j.clear_database()
+        elif neo4j.is_legacy_graph():
+            print("The graph was loaded without email ids, so its counts cannot be synced incrementally.")
+            print("Run once with --reset to rebuild it.")
+            neo4j.close()
+            sys.exit(1)
+        neo4j.ensure_schema()
+        print()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        print("Check NEO4J_URI, NEO4J_USER and NEO4J_PASSWORD in your .env file.")
+        sys.exit(1)
+
+    try:
+        while True:
+            sync_once(neo4j, state, args.batch_size)
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+            # A rewritten JSON file is loaded again; otherwise only the journal is read
+            current = source_signature(state.json_file_path)
+            if current != signature:
+                state, signature = state.reloaded(), current
+                state.ensure_loaded()
+            else:
+                state.replay_journal()
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        neo4j.close()
+
+
+if __name__ == "__main__":
+    main()
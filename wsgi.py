@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+See gunicorn.conf.py for the worker and preload settings.
+"""
+from src.api import app
+
+# Some servers look for "application" by default
+application = app